@@ -9,9 +9,10 @@ import time
 from sklearn.preprocessing import LabelEncoder
 
 # 導入配置
-from config.settings import MODEL_PATH, THRESHOLD
+from config.settings import MODEL_PATH
 from utils.data_processor import preprocess_customer_data
-from services.prediction_service import make_prediction, get_feature_importance, get_model_metrics
+from services.prediction_service import (make_prediction, make_batch_prediction, get_feature_importance,
+                                        get_model_metrics, get_cache_stats, get_threshold)
 from services.data_service import DataService
 
 prediction_bp = Blueprint('prediction', __name__, url_prefix='/api')
@@ -74,6 +75,56 @@ class BatchPredictionRequest(BaseModel):
     customers: List[CustomerData]
 
 
+# 模型參數說明
+MODEL_PARAMS_DESC = {
+    'learning_rate': '學習率 - 每次迭代對權重的調整幅度，較小的值可能需要更多迭代但有助於避免過擬合',
+    'max_depth': '最大深度 - 樹的最大深度，增加深度可以提高模型複雜性',
+    'n_estimators': '樹的數量 - 設置較大的值通常會提高性能，但也會增加計算開銷',
+    'subsample': '子採樣率 - 每棵樹使用的訓練數據比例，小於1可以減少過擬合',
+    'colsample_bytree': '特徵採樣率 - 每棵樹使用的特徵比例，小於1可以減少過擬合',
+    'min_child_weight': '最小子權重 - 控制樹分裂的難度，較大的值可以減少過擬合',
+    'scale_pos_weight': '正樣本權重比例 - 處理類別不平衡問題，增加少數類的權重',
+    'threshold': '決策閾值 - 將概率轉換為二元預測的閾值，調整可以平衡精確率和召回率'
+}
+
+
+def build_prediction_result(probability, prediction, features_importance):
+    """
+    構建單一客戶預測的響應內容
+
+    Args:
+        probability: 預測概率
+        prediction: 預測結果
+        features_importance: 特徵重要性
+
+    Returns:
+        dict: JSON 可序列化的響應內容
+    """
+    threshold = float(get_threshold())
+
+    # 當前模型參數
+    current_model_params = {
+        'learning_rate': 0.1,
+        'max_depth': 8,
+        'n_estimators': 200,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'min_child_weight': 2,
+        'scale_pos_weight': 2,
+        'threshold': threshold
+    }
+
+    # 確保所有數值都是 JSON 可序列化的
+    return {
+        'prediction': int(prediction),
+        'probability': float(probability),
+        'threshold': threshold,
+        'features_importance': features_importance,
+        'current_model_params': current_model_params,
+        'model_params_desc': MODEL_PARAMS_DESC
+    }
+
+
 # 路由
 @prediction_bp.route('/predict', methods=['POST'])
 def predict_single():
@@ -113,42 +164,8 @@ def predict_single():
         
         # 獲取當前模型參數
         model_metrics = get_model_metrics()
-        
-        # 模型參數說明
-        model_params_desc = {
-            'learning_rate': '學習率 - 每次迭代對權重的調整幅度，較小的值可能需要更多迭代但有助於避免過擬合',
-            'max_depth': '最大深度 - 樹的最大深度，增加深度可以提高模型複雜性',
-            'n_estimators': '樹的數量 - 設置較大的值通常會提高性能，但也會增加計算開銷',
-            'subsample': '子採樣率 - 每棵樹使用的訓練數據比例，小於1可以減少過擬合',
-            'colsample_bytree': '特徵採樣率 - 每棵樹使用的特徵比例，小於1可以減少過擬合',
-            'min_child_weight': '最小子權重 - 控制樹分裂的難度，較大的值可以減少過擬合',
-            'scale_pos_weight': '正樣本權重比例 - 處理類別不平衡問題，增加少數類的權重',
-            'threshold': '決策閾值 - 將概率轉換為二元預測的閾值，調整可以平衡精確率和召回率'
-        }
-        
-        # 當前模型參數
-        current_model_params = {
-            'learning_rate': 0.1,
-            'max_depth': 8,
-            'n_estimators': 200,
-            'subsample': 0.8,
-            'colsample_bytree': 0.8,
-            'min_child_weight': 2,
-            'scale_pos_weight': 2,
-            'threshold': float(THRESHOLD)
-        }
 
-        # 確保所有數值都是 JSON 可序列化的
-        result = {
-            'prediction': int(prediction),
-            'probability': float(probability),
-            'threshold': float(THRESHOLD),
-            'features_importance': features_importance,
-            'current_model_params': current_model_params,
-            'model_params_desc': model_params_desc
-        }
-        
-        return jsonify(result)
+        return jsonify(build_prediction_result(probability, prediction, features_importance))
 
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -184,31 +201,52 @@ def predict_batch():
         # 驗證輸入數據
         batch_request = BatchPredictionRequest(**data)
 
-        results = []
-        success_count = 0
+        results = [None] * len(batch_request.customers)
+        processed_rows = []
+        processed_ids = []
 
         for i, customer in enumerate(batch_request.customers):
             try:
                 # 預處理數據
-                processed_data = preprocess_customer_data(customer.dict())
+                processed_rows.append(preprocess_customer_data(customer.dict()))
+                processed_ids.append(i)
 
-                # 進行預測
-                probability, prediction = make_prediction(processed_data)
-
-                results.append({
+            except Exception as e:
+                # 記錄錯誤但繼續處理其他數據
+                results[i] = {
                     'id': i,
-                    'prediction': int(prediction),
-                    'probability': float(probability)
-                })
+                    'error': str(e)
+                }
 
-                success_count += 1
+        # 整批查詢緩存並評分，Redis 只需一次批量讀取和一次管道寫入
+        try:
+            predictions = make_batch_prediction(processed_rows)
+        except Exception as e:
+            # 整批評分失敗時逐行重新評分，只有出錯的客戶返回錯誤
+            print(f"批量評分失敗，改為逐行評分: {str(e)}")
+            predictions = []
+            for data in processed_rows:
+                try:
+                    predictions.append(make_prediction(data))
+                except Exception as row_error:
+                    predictions.append(row_error)
 
-            except Exception as e:
+        success_count = 0
+        for i, outcome in zip(processed_ids, predictions):
+            if isinstance(outcome, Exception):
                 # 記錄錯誤但繼續處理其他數據
-                results.append({
+                results[i] = {
                     'id': i,
-                    'error': str(e)
-                })
+                    'error': str(outcome)
+                }
+                continue
+            probability, prediction = outcome
+            results[i] = {
+                'id': i,
+                'prediction': int(prediction),
+                'probability': float(probability)
+            }
+            success_count += 1
 
         return jsonify({
             'predictions': results,
@@ -256,6 +294,26 @@ def get_model_metrics():
         return jsonify({'error': f'獲取模型指標失敗: {str(e)}'}), 500
 
 
+@prediction_bp.route('/predict/cache-stats', methods=['GET'])
+def get_prediction_cache_stats():
+    """
+    獲取進程內預測緩存的統計信息
+    ---
+    tags:
+      - prediction
+    responses:
+      200:
+        description: 緩存容量、命中/未命中次數和命中率
+      500:
+        description: 服務器錯誤
+    """
+    try:
+        return jsonify(get_cache_stats())
+
+    except Exception as e:
+        return jsonify({'error': f'獲取緩存統計失敗: {str(e)}'}), 500
+
+
 @prediction_bp.route('/model/feature-importance', methods=['GET'])
 def get_model_feature_importance():
     """
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, send_file
 import os
 import pandas as pd
 from typing import Dict, Any, List
@@ -6,6 +6,10 @@ import logging
 from werkzeug.utils import secure_filename
 from services.data_service import DataService
 from services.model_service import ModelService
+from services import warmup
+from services.job_queue import JobStore, JobQueue
+from utils.columnar_io import COLUMNAR_FORMATS, write_frame
+from config.settings import JOB_DIR, JOB_WORKERS, JOB_CHUNK_SIZE, JOB_POLL_INTERVAL, JOB_STALE_TIMEOUT
 
 # 設置日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,8 +22,25 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 data_service = DataService()
 model_service = ModelService()
 
+# 批量預測任務隊列，任務記錄保存在本地 SQLite 中，由各 worker 進程的後台線程領取處理
+job_queue = JobQueue(
+    JobStore(os.path.join(JOB_DIR, 'jobs.db')),
+    JOB_DIR,
+    model_service.iter_csv_predictions,
+    n_workers=JOB_WORKERS,
+    chunksize=JOB_CHUNK_SIZE,
+    poll_interval=JOB_POLL_INTERVAL,
+    stale_timeout=JOB_STALE_TIMEOUT
+)
+
+@api_bp.before_request
+def refresh_model():
+    """其他 worker 重新訓練或更新閾值後，本進程在處理請求前重新加載模型（未變化時只做 os.stat）"""
+    model_service.reload_if_changed()
+
+
 # 允許的文件類型
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_EXTENSIONS = {'csv', 'parquet', 'pq', 'arrow', 'feather', 'ipc'}
 
 
 def allowed_file(filename):
@@ -27,6 +48,37 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def job_response(job):
+    """將任務記錄轉換為接口返回的格式，不暴露服務器上的文件路徑"""
+    total = job['total_rows']
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "total_rows": total,
+        "processed_rows": job['processed_rows'],
+        "progress": round(job['processed_rows'] / total, 4) if total else None,
+        "error": job['error'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at']
+    }
+
+
+def submit_batch_job(data):
+    """根據請求中的 file_path 或 data 提交批量預測任務，返回 (響應, 狀態碼)"""
+    threshold = data.get('threshold')
+    if data.get('file_path'):
+        if not os.path.exists(data['file_path']):
+            return jsonify({"error": f"文件不存在: {data['file_path']}"}), 400
+        job = job_queue.submit_file(data['file_path'], threshold)
+    elif data.get('data'):
+        job = job_queue.submit_records(data['data'], threshold)
+    else:
+        return jsonify({"error": "請提供file_path或data"}), 400
+
+    return jsonify(job_response(job)), 202
+
+
 @api_bp.route('/data/stats', methods=['GET'])
 def get_data_stats():
     """獲取數據統計信息"""
@@ -49,71 +101,139 @@ def get_model_metrics():
         return jsonify({"error": str(e)}), 500
 
 
+# 單一預測請求中的客戶特徵
+CUSTOMER_FEATURE_KEYS = [
+    'gender', 'age', 'driving_license', 'region_code',
+    'previously_insured', 'vehicle_age', 'vehicle_damage',
+    'annual_premium', 'policy_sales_channel', 'vintage'
+]
+
+# 單一預測請求中可臨時調整的模型參數
+MODEL_PARAM_KEYS = [
+    'learning_rate', 'max_depth', 'n_estimators',
+    'subsample', 'colsample_bytree', 'min_child_weight',
+    'scale_pos_weight', 'threshold'
+]
+
+# 模型參數說明
+MODEL_PARAMS_DESC = {
+    'learning_rate': '學習率 - 每次迭代對權重的調整幅度，較小的值可能需要更多迭代但有助於避免過擬合',
+    'max_depth': '最大深度 - 樹的最大深度，增加深度可以提高模型複雜性',
+    'n_estimators': '樹的數量 - 設置較大的值通常會提高性能，但也會增加計算開銷',
+    'subsample': '子採樣率 - 每棵樹使用的訓練數據比例，小於1可以減少過擬合',
+    'colsample_bytree': '特徵採樣率 - 每棵樹使用的特徵比例，小於1可以減少過擬合',
+    'min_child_weight': '最小子權重 - 控制樹分裂的難度，較大的值可以減少過擬合',
+    'scale_pos_weight': '正樣本權重比例 - 處理類別不平衡問題，增加少數類的權重',
+    'threshold': '決策閾值 - 將概率轉換為二元預測的閾值，調整可以平衡精確率和召回率'
+}
+
+
+def predict_single_result(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    執行單一預測，並附加模型參數說明和當前參數值（WSGI 和 ASGI 入口共用）
+
+    Args:
+        data: 請求數據，包含客戶特徵和可選的模型參數
+
+    Returns:
+        預測結果
+    """
+    # 區分客戶特徵和模型參數
+    data = data or {}
+    customer_features = {key: data[key] for key in CUSTOMER_FEATURE_KEYS if key in data}
+    model_params = {key: data[key] for key in MODEL_PARAM_KEYS if key in data}
+
+    # 執行預測 (傳入模型參數)
+    result = model_service.predict(customer_features, model_params=model_params)
+
+    # 添加模型參數說明
+    result['model_params_desc'] = MODEL_PARAMS_DESC
+
+    # 添加當前使用的模型參數值
+    result['current_model_params'] = {
+        'learning_rate': model_service.get_param('learning_rate', 0.1),
+        'max_depth': model_service.get_param('max_depth', 8),
+        'n_estimators': model_service.get_param('n_estimators', 200),
+        'subsample': model_service.get_param('subsample', 0.8),
+        'colsample_bytree': model_service.get_param('colsample_bytree', 0.8),
+        'min_child_weight': model_service.get_param('min_child_weight', 2),
+        'scale_pos_weight': model_service.get_param('scale_pos_weight', 2),
+        'threshold': model_service.threshold
+    }
+
+    return result
+
+
+def is_json_batch_request(data: Dict[str, Any]) -> bool:
+    """判斷批量預測請求是否直接返回 JSON 結果（非後台任務，也不是流式或列式文件輸出）"""
+    return not data.get('async') and not (data.get('file_path') and data.get('output_format'))
+
+
+def batch_predict_result(data: Dict[str, Any]):
+    """
+    執行返回 JSON 結果的批量預測（file_path 或 data），WSGI 和 ASGI 入口共用
+
+    Args:
+        data: 請求數據
+
+    Returns:
+        (響應數據, HTTP 狀態碼)
+    """
+    # 檢查是否提供了文件路徑
+    if data.get('file_path'):
+        file_path = data['file_path']
+
+        # 驗證文件是否存在
+        if not os.path.exists(file_path):
+            return {"error": f"文件不存在: {file_path}"}, 400
+
+        # 讀取文件（CSV、Parquet 或 Arrow IPC），只讀取預測所需的列
+        df = model_service.read_batch_file(file_path)
+
+    # 檢查是否提供了數據列表
+    elif data.get('data'):
+        # 從JSON數據創建數據框
+        df = pd.DataFrame(data['data'])
+
+    else:
+        return {"error": "請提供file_path或data"}, 400
+
+    # 執行批量預測
+    return model_service.batch_predict(df, parallel=data.get('parallel')), 200
+
+
+def health_status(warmup_enabled: bool = True):
+    """
+    返回健康檢查的響應數據，模型預熱完成前或預熱失敗時為 503（WSGI 和 ASGI 入口共用）
+
+    Args:
+        warmup_enabled: 是否啟用了啟動預熱，未啟用時直接視為就緒
+
+    Returns:
+        (響應數據, HTTP 狀態碼)
+    """
+    warmup_status = warmup.get_status()
+    ready = warmup_status["ready"] or not warmup_enabled
+    if ready:
+        status, message = "ok", "API 服務正常運行"
+    elif warmup_status["state"] == "failed":
+        status, message = "error", "模型預熱失敗"
+    else:
+        status, message = "starting", "模型預熱中"
+    return {
+        "status": status,
+        "message": message,
+        "ready": ready,
+        "model_loaded": model_service.model is not None,
+        "warmup": warmup_status
+    }, 200 if ready else 503
+
+
 @api_bp.route('/predict/single', methods=['POST'])
 def predict_single():
     """單一客戶預測"""
     try:
-        # 獲取請求數據
-        data = request.json
-
-        # 提取客戶特徵和模型參數
-        customer_features = {}
-        model_params = {}
-
-        # 區分客戶特徵和模型參數
-        if data:
-            # 基本客戶特徵
-            customer_features_keys = [
-                'gender', 'age', 'driving_license', 'region_code',
-                'previously_insured', 'vehicle_age', 'vehicle_damage',
-                'annual_premium', 'policy_sales_channel', 'vintage'
-            ]
-
-            # 提取客戶特徵
-            for key in customer_features_keys:
-                if key in data:
-                    customer_features[key] = data[key]
-
-            # 提取模型參數 (如果存在)
-            model_params_keys = [
-                'learning_rate', 'max_depth', 'n_estimators',
-                'subsample', 'colsample_bytree', 'min_child_weight',
-                'scale_pos_weight', 'threshold'
-            ]
-
-            # 創建模型參數字典
-            for key in model_params_keys:
-                if key in data:
-                    model_params[key] = data[key]
-
-        # 執行預測 (傳入模型參數)
-        result = model_service.predict(customer_features, model_params=model_params)
-
-        # 添加模型參數說明
-        result['model_params_desc'] = {
-            'learning_rate': '學習率 - 每次迭代對權重的調整幅度，較小的值可能需要更多迭代但有助於避免過擬合',
-            'max_depth': '最大深度 - 樹的最大深度，增加深度可以提高模型複雜性',
-            'n_estimators': '樹的數量 - 設置較大的值通常會提高性能，但也會增加計算開銷',
-            'subsample': '子採樣率 - 每棵樹使用的訓練數據比例，小於1可以減少過擬合',
-            'colsample_bytree': '特徵採樣率 - 每棵樹使用的特徵比例，小於1可以減少過擬合',
-            'min_child_weight': '最小子權重 - 控制樹分裂的難度，較大的值可以減少過擬合',
-            'scale_pos_weight': '正樣本權重比例 - 處理類別不平衡問題，增加少數類的權重',
-            'threshold': '決策閾值 - 將概率轉換為二元預測的閾值，調整可以平衡精確率和召回率'
-        }
-
-        # 添加當前使用的模型參數值
-        result['current_model_params'] = {
-            'learning_rate': model_service.get_param('learning_rate', 0.1),
-            'max_depth': model_service.get_param('max_depth', 8),
-            'n_estimators': model_service.get_param('n_estimators', 200),
-            'subsample': model_service.get_param('subsample', 0.8),
-            'colsample_bytree': model_service.get_param('colsample_bytree', 0.8),
-            'min_child_weight': model_service.get_param('min_child_weight', 2),
-            'scale_pos_weight': model_service.get_param('scale_pos_weight', 2),
-            'threshold': model_service.threshold
-        }
-
-        return jsonify(result), 200
+        return jsonify(predict_single_result(request.json)), 200
     except Exception as e:
         logger.error(f"單一預測失敗: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -126,44 +246,131 @@ def predict_batch():
         # 獲取請求數據
         data = request.json
 
-        # 檢查是否提供了文件路徑
-        if data.get('file_path'):
-            # 從文件中讀取數據
+        # 異步模式：提交後台任務並立即返回任務 ID
+        if data.get('async'):
+            return submit_batch_job(data)
+
+        output_format = data.get('output_format')
+        if data.get('file_path') and output_format:
             file_path = data['file_path']
 
             # 驗證文件是否存在
             if not os.path.exists(file_path):
                 return jsonify({"error": f"文件不存在: {file_path}"}), 400
 
-            # 讀取文件
-            df = pd.read_csv(file_path)
+            # 列式輸出：結果數組直接寫為 Parquet 或 Arrow IPC 文件，不逐行轉換為 JSON
+            if output_format in COLUMNAR_FORMATS:
+                df = model_service.read_batch_file(file_path)
+                results = model_service.batch_predict_frame(
+                    df,
+                    threshold=data.get('threshold'),
+                    parallel=data.get('parallel')
+                )
+                return Response(
+                    write_frame(results, output_format),
+                    mimetype=COLUMNAR_FORMATS[output_format],
+                    headers={'Content-Disposition': f'attachment; filename=predictions.{output_format}'}
+                )
+
+            # 流式模式：按塊讀取並逐塊輸出，內存佔用與文件大小無關
+            if output_format not in ModelService.STREAM_FORMATS:
+                return jsonify({"error": f"不支持的輸出格式: {output_format}"}), 400
+
+            stream = model_service.stream_predict_csv(
+                file_path,
+                output_format=output_format,
+                threshold=data.get('threshold'),
+                chunksize=data.get('chunksize')
+            )
+            return Response(stream_with_context(stream), mimetype=ModelService.STREAM_FORMATS[output_format])
+
+        results, status = batch_predict_result(data)
+        return jsonify(results), status
 
-            # 執行批量預測
-            results = model_service.batch_predict(df)
+    except Exception as e:
+        logger.error(f"批量預測失敗: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-            return jsonify(results), 200
 
-        # 檢查是否提供了數據列表
-        elif data.get('data'):
-            # 從JSON數據創建數據框
-            df = pd.DataFrame(data['data'])
+@api_bp.route('/jobs/batch', methods=['POST'])
+def create_batch_job():
+    """提交批量預測任務，立即返回任務 ID"""
+    try:
+        return submit_batch_job(request.json or {})
+    except Exception as e:
+        logger.error(f"提交批量預測任務失敗: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-            # 執行批量預測
-            results = model_service.batch_predict(df)
 
-            return jsonify(results), 200
+@api_bp.route('/jobs', methods=['GET'])
+def list_batch_jobs():
+    """列出最近的批量預測任務"""
+    try:
+        job_queue.ensure_started()
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify([job_response(job) for job in job_queue.store.list(limit)]), 200
+    except Exception as e:
+        logger.error(f"獲取任務列表失敗: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        else:
-            return jsonify({"error": "請提供file_path或data"}), 400
 
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """查詢批量預測任務的狀態和進度"""
+    try:
+        job_queue.ensure_started()
+        job = job_queue.store.get(job_id)
+        if job is None:
+            return jsonify({"error": f"任務不存在: {job_id}"}), 404
+        return jsonify(job_response(job)), 200
     except Exception as e:
-        logger.error(f"批量預測失敗: {str(e)}")
+        logger.error(f"查詢任務失敗: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>/results', methods=['GET'])
+def get_batch_job_results(job_id):
+    """分頁讀取批量預測任務已完成部分的結果，任務運行中也可以讀取"""
+    try:
+        job = job_queue.store.get(job_id)
+        if job is None:
+            return jsonify({"error": f"任務不存在: {job_id}"}), 404
+
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', 1000, type=int)), 10000)
+        results = job_queue.read_results(job, offset, limit)
+
+        return jsonify({
+            **job_response(job),
+            "offset": offset,
+            "count": len(results),
+            "results": results.to_dict(orient='records')
+        }), 200
+    except Exception as e:
+        logger.error(f"讀取任務結果失敗: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>/download', methods=['GET'])
+def download_batch_job(job_id):
+    """下載已完成任務的完整結果CSV文件"""
+    try:
+        job = job_queue.store.get(job_id)
+        if job is None:
+            return jsonify({"error": f"任務不存在: {job_id}"}), 404
+        if job['status'] != JobStore.COMPLETED:
+            return jsonify({"error": "任務尚未完成", **job_response(job)}), 409
+
+        return send_file(job['output_path'], mimetype='text/csv', as_attachment=True,
+                         download_name=f"predictions-{job_id}.csv")
+    except Exception as e:
+        logger.error(f"下載任務結果失敗: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
 @api_bp.route('/upload/csv', methods=['POST'])
 def upload_csv():
-    """上傳CSV文件"""
+    """上傳CSV、Parquet或Arrow文件"""
     try:
         # 檢查是否有文件
         if 'file' not in request.files:
@@ -190,7 +397,7 @@ def upload_csv():
             return jsonify({"file_path": file_path}), 200
 
         else:
-            return jsonify({"error": "不支持的文件類型，僅支持CSV文件"}), 400
+            return jsonify({"error": "不支持的文件類型，僅支持CSV、Parquet和Arrow文件"}), 400
 
     except Exception as e:
         logger.error(f"上傳文件失敗: {str(e)}")
@@ -223,6 +430,9 @@ def train_model():
         # 獲取特徵重要性
         feature_importance = model_service_new.get_feature_importance()
 
+        # 模型文件已更新，同類型的接口模型服務立即重新加載，其他 worker 在下一次請求時發現文件變化
+        model_service.reload_if_changed()
+
         # 返回結果
         response = {
             "message": f"{model_service.MODEL_TYPES[model_type]}模型訓練完成",
@@ -255,19 +465,8 @@ def set_threshold():
             threshold = model_service.find_optimal_threshold(metric)
             message = f"已自動找到最佳閾值: {threshold:.2f}，基於指標: {metric}"
         else:
-            # 手動設置閾值
-            model_service.threshold = float(threshold)
-
-            # 保存更新後的配置
-            config_path = os.path.join(model_service.model_dir, f"{model_service.model_type}_config.pkl")
-            import joblib
-            config = {
-                'feature_names': model_service.feature_names,
-                'threshold': model_service.threshold,
-                'model_type': model_service.model_type
-            }
-            joblib.dump(config, config_path)
-
+            # 手動設置閾值，保存到配置文件，其他 worker 在下一次請求時重新加載
+            threshold = model_service.set_threshold(threshold)
             message = f"已手動設置閾值: {threshold:.2f}"
 
         # 獲取新閾值下的指標
@@ -288,13 +487,10 @@ def set_threshold():
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """API 健康檢查"""
+    """API 健康檢查，模型預熱完成前或預熱失敗時返回 503"""
     try:
-        return jsonify({
-            "status": "ok",
-            "message": "API 服務正常運行",
-            "model_loaded": model_service.model is not None
-        }), 200
+        status, code = health_status(current_app.config.get('WARMUP_ENABLED', True))
+        return jsonify(status), code
     except Exception as e:
         logger.error(f"健康檢查失敗: {str(e)}")
         return jsonify({"error": str(e)}), 500
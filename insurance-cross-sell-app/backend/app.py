@@ -36,9 +36,21 @@ def create_app(config_name=None):
     CORS(app, resources={r"/api/*": {"origins": CORS_CONFIG['ORIGINS']}})
 
     # 註冊藍圖
-    from api.routes import api_bp
+    from api.routes import api_bp, job_queue
     app.register_blueprint(api_bp)
 
+    # 啟動批量預測任務的後台線程，排隊的任務不需要等到有請求訪問任務接口才被處理
+    if app.config.get('JOB_WORKERS_AUTOSTART', True):
+        job_queue.ensure_started()
+
+    # 預加載模型並執行合成預測，避免首個請求承擔冷啟動開銷；後台預熱時完成前 /api/health 返回 503
+    if app.config.get('WARMUP_ENABLED', True):
+        from services.warmup import warm_up, start_warm_up
+        if app.config.get('WARMUP_BACKGROUND', True):
+            start_warm_up(app, n_samples=app.config.get('WARMUP_SAMPLES', 3))
+        else:
+            warm_up(app, n_samples=app.config.get('WARMUP_SAMPLES', 3))
+
     # 首頁路由
     @app.route('/')
     def index():
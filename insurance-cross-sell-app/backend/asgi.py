@@ -0,0 +1,148 @@
+"""
+ASGI 入口
+
+提供與 WSGI 入口（api/routes.py）完全相同的接口和請求/響應格式：
+- 單一預測、JSON 結果的批量預測、模型指標和健康檢查在事件循環中處理，
+  模型調用在有界線程池中執行，並發的單筆評分仍由微批合併器合併為一次模型調用
+- 其餘接口（後台任務、流式和列式文件輸出、上傳、訓練、閾值、數據統計等）
+  直接轉交同一個 Flask 應用處理，與 WSGI 入口的行為一致
+響應使用 Flask 應用的 JSON 序列化，兩個入口返回的內容逐字節一致。
+這些接口的模型調用和文件讀取都是同步的，與 WSGI 入口共用同一套實現，全部在線程池中執行，
+事件循環本身不做阻塞 I/O。
+單個進程即可保持大量空閒的長連接，不再受限於 worker 線程數。
+
+模型加載、預熱和參考數據預加載與 WSGI 入口相同（在 lifespan 中調用 create_app）。
+
+使用方式：uvicorn asgi:app --app-dir backend --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from api.routes import (model_service, predict_single_result, is_json_batch_request, batch_predict_result,
+                        health_status)
+from config.settings import ASGI_SCORING_THREADS, ASGI_MAX_PENDING_SCORES
+
+logger = logging.getLogger(__name__)
+
+# 評分線程池、並發上限、Flask 應用及其 ASGI 包裝，在 lifespan 中創建
+_executor = None
+_pending = None
+_flask_app = None
+_wsgi_app = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """啟動時創建線程池並在其中創建 Flask 應用（按配置啟動預熱），關閉時釋放線程池"""
+    global _executor, _pending, _flask_app, _wsgi_app
+    _executor = ThreadPoolExecutor(max_workers=ASGI_SCORING_THREADS, thread_name_prefix='scoring')
+    _pending = asyncio.Semaphore(ASGI_MAX_PENDING_SCORES)
+
+    # create_app 讀取配置並執行與 WSGI 入口相同的預熱
+    from app import create_app
+    _flask_app = await asyncio.get_running_loop().run_in_executor(_executor, create_app)
+    _wsgi_app = WSGIMiddleware(_flask_app)
+
+    yield
+
+    _executor.shutdown(wait=False)
+
+
+def _json_response(payload, status_code: int = 200) -> Response:
+    """使用 Flask 應用的 JSON 序列化構建響應，與 jsonify 的輸出一致"""
+    flask_response = _flask_app.json.response(payload)
+    return Response(flask_response.get_data(), status_code=status_code, media_type=flask_response.mimetype)
+
+
+def _call_model(fn, *args):
+    """處理請求前檢查模型文件是否被其他 worker 更新（與 WSGI 入口的 before_request 一致），再執行模型調用"""
+    model_service.reload_if_changed()
+    return fn(*args)
+
+
+async def _run(fn, *args):
+    """在有界線程池中執行模型調用，排隊的請求數超過上限時在事件循環中等待"""
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_executor, _call_model, fn, *args)
+
+
+async def flask_app(scope, receive, send):
+    """將請求轉交 Flask 應用處理"""
+    await _wsgi_app(scope, receive, send)
+
+
+async def predict_single(request: Request):
+    """單一客戶預測"""
+    try:
+        return _json_response(await _run(predict_single_result, await request.json()))
+    except Exception as e:
+        logger.error(f"單一預測失敗: {str(e)}")
+        return _json_response({"error": str(e)}, 500)
+
+
+class PredictBatch:
+    """
+    批量預測
+
+    返回 JSON 結果的請求在線程池中評分；後台任務、流式和列式文件輸出轉交 Flask 應用處理
+    """
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        try:
+            # 讀取請求體後由 Request 緩存，轉交 Flask 應用時重新提供給它
+            body = await request.body()
+            data = await request.json()
+            if not is_json_batch_request(data):
+                async def replay():
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+
+                await flask_app(scope, replay, send)
+                return
+
+            results, status_code = await _run(batch_predict_result, data)
+            response = _json_response(results, status_code)
+        except Exception as e:
+            logger.error(f"批量預測失敗: {str(e)}")
+            response = _json_response({"error": str(e)}, 500)
+        await response(scope, receive, send)
+
+
+async def model_metrics(request: Request):
+    """獲取模型評估指標"""
+    try:
+        return _json_response(await _run(model_service.evaluate))
+    except Exception as e:
+        logger.error(f"獲取模型評估指標失敗: {str(e)}")
+        return _json_response({"error": str(e)}, 500)
+
+
+async def health_check(request: Request):
+    """API 健康檢查，模型預熱完成前或預熱失敗時返回 503"""
+    try:
+        status, status_code = health_status(_flask_app.config.get('WARMUP_ENABLED', True))
+        return _json_response(status, status_code)
+    except Exception as e:
+        logger.error(f"健康檢查失敗: {str(e)}")
+        return _json_response({"error": str(e)}, 500)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/predict/single', predict_single, methods=['POST']),
+        Route('/api/predict/batch', PredictBatch(), methods=['POST']),
+        Route('/api/model/metrics', model_metrics, methods=['GET']),
+        Route('/api/health', health_check, methods=['GET']),
+        Mount('/', app=flask_app)
+    ],
+    lifespan=lifespan
+)
@@ -34,6 +34,18 @@ MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file_
 MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(MODEL_DIR, 'xgboost_model.pkl'))
 THRESHOLD = float(os.environ.get('PREDICTION_THRESHOLD', '0.45'))  # 預設閾值
 
+# 啟動預熱：在 create_app 中預加載模型並執行合成預測，完成前 /api/health 返回 503
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'True') == 'True'
+WARMUP_SAMPLES = int(os.environ.get('WARMUP_SAMPLES', '3'))
+# 在後台線程中預熱，應用立即接收請求；gunicorn.conf.py 開啟 preload_app 時默認關閉，預熱完成後再 fork
+WARMUP_BACKGROUND = os.environ.get('WARMUP_BACKGROUND', 'True') == 'True'
+
+# 在 create_app 中啟動批量預測任務的後台線程；gunicorn.conf.py 開啟 preload_app 時默認關閉，改為在每個 worker 的 post_fork 中啟動
+JOB_WORKERS_AUTOSTART = os.environ.get('JOB_WORKERS_AUTOSTART', 'True') == 'True'
+
+# 啟動時預加載參考數據集，gunicorn.conf.py 開啟 preload_app 時默認啟用
+PRELOAD_DATA = os.environ.get('PRELOAD_DATA', 'False') == 'True'
+
 # 上傳目錄
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'uploads')
 
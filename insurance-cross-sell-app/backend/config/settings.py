@@ -18,7 +18,11 @@ CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
 # 模型設置
 MODEL_DIR = os.path.join(BASE_DIR.parent, 'models')
 MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(MODEL_DIR, 'lgbm_model.pkl'))
+# 訓練腳本保存的標籤編碼器，預測服務按其類別順序編碼輸入
+LABEL_ENCODERS_PATH = os.environ.get('LABEL_ENCODERS_PATH', os.path.join(MODEL_DIR, 'label_encoders.joblib'))
 THRESHOLD = float(os.environ.get('PREDICTION_THRESHOLD', '0.45'))  # 預設閾值
+# 預測服務發佈的閾值，所有 worker 根據該文件和模型文件的修改時間判斷是否需要重新加載
+SERVING_STATE_PATH = os.environ.get('SERVING_STATE_PATH', f"{os.path.splitext(MODEL_PATH)[0]}_serving.json")
 
 # Redis 設置
 REDIS_ENABLED = os.environ.get('REDIS_ENABLED', 'True') == 'True'
@@ -27,6 +31,48 @@ REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
 REDIS_DB = int(os.environ.get('REDIS_DB', '0'))
 REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD', None)  # 如果無密碼則為 None
 REDIS_TTL = int(os.environ.get('REDIS_TTL', '3600'))  # 默認緩存時間：1小時
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', '5'))  # 命令超時秒數
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', '1'))  # 建立連接的超時秒數
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', '50'))  # 連接池大小
+
+# Redis 熔斷器設置：連續失敗 N 次後停止訪問 Redis，按指數退避重試
+REDIS_BREAKER_FAILURES = int(os.environ.get('REDIS_BREAKER_FAILURES', '3'))
+REDIS_BREAKER_RESET_TIMEOUT = float(os.environ.get('REDIS_BREAKER_RESET_TIMEOUT', '5'))  # 首次重試等待秒數
+REDIS_BREAKER_MAX_RESET_TIMEOUT = float(os.environ.get('REDIS_BREAKER_MAX_RESET_TIMEOUT', '60'))  # 退避上限秒數
+
+# 進程內預測緩存設置（位於 Redis 之前，按 LRU 淘汰）
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))  # 最大條目數，0 表示禁用
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', '300'))  # 條目存活秒數，0 表示不過期
+
+# Redis 後台寫入隊列設置：預測結果先放入有界隊列，由後台線程批量寫入，隊列滿時丟棄
+CACHE_WRITE_QUEUE_SIZE = int(os.environ.get('CACHE_WRITE_QUEUE_SIZE', '10000'))  # 隊列最多緩衝的條目數
+CACHE_WRITE_BATCH_SIZE = int(os.environ.get('CACHE_WRITE_BATCH_SIZE', '500'))  # 每次管道寫入的最大條目數
+CACHE_WRITE_FLUSH_INTERVAL = float(os.environ.get('CACHE_WRITE_FLUSH_INTERVAL', '0.05'))  # 批次未滿時最多等待秒數
+
+# 單筆預測微批合併設置：窗口內到達的並發請求合併為一次模型調用，窗口為 0 時不合併
+PREDICTION_BATCH_WINDOW_MS = float(os.environ.get('PREDICTION_BATCH_WINDOW_MS', '2'))  # 收集窗口（毫秒）
+PREDICTION_BATCH_MAX_SIZE = int(os.environ.get('PREDICTION_BATCH_MAX_SIZE', '64'))  # 每批最多行數
+
+# 多進程批量評分設置：行數達到下限時，特徵矩陣按分片交給進程池並行評分
+# 進程池只在服務進程首次處理大批量時創建，大小即分配給批量評分的核心預算，默認為全部 CPU 核心；
+# 不按服務進程數平分（gunicorn 的 2n+1 個 worker 有意超額訂閱核心，平分後進程池永遠只有 1 個進程）
+BATCH_PARALLEL_WORKERS = int(os.environ.get('BATCH_PARALLEL_WORKERS', str(os.cpu_count() or 1)))  # 工作進程數，1 表示禁用
+BATCH_PARALLEL_MIN_ROWS = int(os.environ.get('BATCH_PARALLEL_MIN_ROWS', '200000'))  # 啟用並行評分的最少行數
+BATCH_PARALLEL_SHARD_SIZE = int(os.environ.get('BATCH_PARALLEL_SHARD_SIZE', '100000'))  # 每個任務的行數
+
+# 批量預測任務隊列設置：任務記錄保存在本地 SQLite 中，結果按塊寫入 JOB_DIR
+JOB_DIR = os.environ.get('JOB_DIR', os.path.join(BASE_DIR.parent, 'jobs'))  # 任務數據庫、輸入和結果文件目錄
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))  # 每個進程中處理任務的線程數
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', '10000'))  # 每塊評分的行數
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '1'))  # 空閒時輪詢隊列的間隔秒數
+JOB_STALE_TIMEOUT = float(os.environ.get('JOB_STALE_TIMEOUT', '300'))  # 運行中任務無心跳多少秒後重新排隊
+
+# ASGI 入口設置：模型評分在有界線程池中執行，超出並發上限的請求在事件循環中排隊等待
+ASGI_SCORING_THREADS = int(os.environ.get('ASGI_SCORING_THREADS', str(os.cpu_count() or 4)))  # 評分線程數
+ASGI_MAX_PENDING_SCORES = int(os.environ.get('ASGI_MAX_PENDING_SCORES', '256'))  # 同時處理的預測請求上限
+
+# 參考數據快照設置：類型化後的訓練和測試數據以 Feather 格式緩存，CSV內容未變時跳過解析；為空時禁用
+DATA_SNAPSHOT_DIR = os.environ.get('DATA_SNAPSHOT_DIR', os.path.join(BASE_DIR.parent, 'data_cache'))
 
 # 日誌設置
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -0,0 +1,51 @@
+"""
+gunicorn 配置文件
+
+模型和參考數據集只在 master 進程中加載一次（preload_app），fork 出的 worker 通過寫時複製共享這些內存頁：
+- 原生樹集成以只讀內存映射方式加載，joblib 模型中的 NumPy 數組同樣以只讀方式映射
+- 參考數據集的字符串列轉換為類別型，避免訪問時修改大量 Python 對象的引用計數
+- fork 前凍結垃圾回收器跟蹤的對象，worker 中的垃圾回收不再遍歷和改寫這些對象所在的頁
+
+使用方式：gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+"""
+
+import gc
+import os
+import multiprocessing
+
+# 後端目錄加入模塊搜索路徑，使 config、services 等頂層包可以直接導入
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# 批量評分進程池的大小由 BATCH_PARALLEL_WORKERS 配置（見 config/settings.py），不按 worker 數平分
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+# 每個 worker 的請求線程數；大於 1 時使用 gthread worker，同一進程內的並發單筆預測才能被微批合併
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# 在 master 中加載應用，完成模型預熱和參考數據預加載後再 fork worker
+preload_app = True
+os.environ.setdefault('PRELOAD_DATA', 'True')
+os.environ.setdefault('WARMUP_BACKGROUND', 'False')
+
+# master 中不啟動批量預測任務的後台線程（fork 不會複製線程），由每個 worker 在 post_fork 中啟動
+os.environ.setdefault('JOB_WORKERS_AUTOSTART', 'False')
+
+# 加載期間關閉垃圾回收，避免回收在已分配的頁中留下空洞，fork 後這些頁會被 worker 寫入
+gc.disable()
+
+
+def pre_fork(server, worker):
+    """fork 前將 master 中的所有對象移入永久代，worker 的垃圾回收不會再觸碰它們"""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """worker 中重新啟用垃圾回收，只處理 fork 之後新分配的對象，並啟動批量預測任務的後台線程"""
+    gc.enable()
+    server.log.info(f"Worker {worker.pid} 已啟動，共享 {gc.get_freeze_count()} 個凍結對象")
+
+    from api.routes import job_queue
+    job_queue.ensure_started()
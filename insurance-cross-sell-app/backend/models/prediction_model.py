@@ -3,6 +3,17 @@ import joblib
 import numpy as np
 import pandas as pd
 from flask import current_app
+from services.array_predictor import ArrayPredictor
+from services.tree_ensemble import load_model, native_model_path
+from utils.feature_encoder import FeatureEncoder, label_encoder_maps
+from utils.data_processor import create_sample_data
+
+# 訓練腳本（step_5）中特徵的默認順序，模型未保存特徵名時使用
+TRAINING_FEATURES = [
+    'Gender', 'Age', 'Driving_License', 'Region_Code', 'Previously_Insured',
+    'Vehicle_Age', 'Vehicle_Damage', 'Annual_Premium', 'Policy_Sales_Channel',
+    'Vintage', 'Annual_Premium_Log', 'Age_Group'
+]
 
 
 class InsurancePredictionModel:
@@ -14,6 +25,8 @@ class InsurancePredictionModel:
         self.model = None
         self.label_encoders = None
         self.threshold = None
+        self.encoder = None
+        self.predictor = None
         self.is_loaded = False
 
     def load(self):
@@ -29,16 +42,19 @@ class InsurancePredictionModel:
             encoders_path = current_app.config['LABEL_ENCODERS_PATH']
             self.threshold = current_app.config['PREDICTION_THRESHOLD']
 
-            # 檢查文件是否存在
-            if not os.path.exists(model_path):
+            # 檢查文件是否存在（原生樹集成目錄和 joblib 文件有一個即可）
+            if not os.path.exists(model_path) and not os.path.isdir(native_model_path(model_path)):
                 raise FileNotFoundError(f"模型文件不存在: {model_path}")
 
             if not os.path.exists(encoders_path):
                 raise FileNotFoundError(f"編碼器文件不存在: {encoders_path}")
 
-            # 加載模型和編碼器
-            self.model = joblib.load(model_path)
+            # 加載模型和編碼器，優先使用原生樹集成，服務時無需導入 lightgbm
+            self.model = load_model(model_path)
             self.label_encoders = joblib.load(encoders_path)
+
+            # 特徵順序和名稱校驗只在加載時執行一次
+            self._build_fast_path()
             self.is_loaded = True
 
             print(f"✅ 模型加載成功: {model_path}")
@@ -48,38 +64,33 @@ class InsurancePredictionModel:
             print(f"❌ 模型加載失敗: {str(e)}")
             raise
 
+    def _build_fast_path(self):
+        """
+        根據已加載的模型和標籤編碼器構建特徵編碼器和數組預測器
+        """
+        feature_names = list(getattr(self.model, 'feature_name_', None) or
+                             getattr(self.model, 'feature_names', None) or TRAINING_FEATURES)
+
+        # 將 LabelEncoder 的類別順序轉換為查找表
+        category_maps, age_group_codes = label_encoder_maps(self.label_encoders)
+
+        self.encoder = FeatureEncoder(
+            features=feature_names,
+            derived_features=[],
+            category_maps=category_maps,
+            age_group_codes=age_group_codes
+        )
+        self.predictor = ArrayPredictor(self.model, feature_names)
+
     def preprocess(self, data):
         """
-        預處理輸入數據
+        預處理輸入數據，直接編碼為模型特徵順序的 float32 數組
         """
         # 確保模型已加載
         if not self.is_loaded:
             self.load()
 
-        # 轉換為DataFrame
-        df = pd.DataFrame([data])
-
-        # 特徵工程：年齡分組
-        def age_group(age):
-            if age < 25:
-                return "青年"
-            elif age < 40:
-                return "中年"
-            elif age < 60:
-                return "中老年"
-            else:
-                return "老年"
-
-        # 添加特徵
-        df["Age_Group"] = df["Age"].apply(age_group)
-        df["Annual_Premium_Log"] = np.log1p(df["Annual_Premium"])
-
-        # 編碼類別特徵
-        for col in df.select_dtypes(include=["object"]):
-            if col in self.label_encoders:
-                df[col] = self.label_encoders[col].transform(df[col].astype(str))
-
-        return df
+        return self.encoder.encode_row(data).reshape(1, -1)
 
     def predict(self, data):
         """
@@ -93,7 +104,7 @@ class InsurancePredictionModel:
         processed_data = self.preprocess(data)
 
         # 預測概率
-        probability = self.model.predict_proba(processed_data)[0, 1]
+        probability = self.predictor.predict_one(processed_data)
 
         # 根據閾值判斷結果
         prediction = bool(probability > self.threshold)
@@ -105,6 +116,15 @@ class InsurancePredictionModel:
             "interest_level": self.interpret_probability(probability)
         }
 
+    def warm_up(self, n_samples=3):
+        """
+        加載模型和編碼器，並用合成數據預測幾次
+        """
+        self.load()
+        sample = create_sample_data()
+        for i in range(n_samples):
+            self.predict(dict(sample, age=sample['age'] + 10 * i))
+
     def interpret_probability(self, probability):
         """
         解釋預測概率
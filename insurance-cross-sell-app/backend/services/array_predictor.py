@@ -0,0 +1,126 @@
+import re
+import logging
+import warnings
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from .tree_ensemble import TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+# LightGBM / XGBoost 在無特徵名訓練時自動生成的名稱
+_AUTO_FEATURE_NAME = re.compile(r'^(Column_|f)\d+$')
+
+
+class ArrayPredictor:
+    """
+    低延遲預測器，直接以固定特徵順序的 NumPy 數組調用模型底層的 booster
+
+    特徵名校驗和列重排索引只在加載時計算一次，每次預測不再構建 DataFrame，
+    也不再觸發 sklearn 包裝層的逐次特徵名檢查。
+    """
+
+    def __init__(self, model: Any, input_features: List[str]):
+        """
+        初始化預測器
+
+        Args:
+            model: 已訓練的模型（LightGBM / XGBoost / sklearn 分類器）
+            input_features: 調用方傳入數組的列順序
+
+        Raises:
+            ValueError: 模型所需特徵不在 input_features 中，或特徵數量不一致
+        """
+        self.model = model
+        self.input_features = list(input_features)
+        self.model_features = self._get_model_features(model)
+
+        # 一次性計算列重排索引，順序一致時不做任何拷貝
+        self._columns = self._resolve_columns()
+        self._predict = self._resolve_predict_fn(model)
+
+    @staticmethod
+    def _get_model_features(model: Any) -> Optional[List[str]]:
+        """讀取模型訓練時的特徵名，沒有有效特徵名時返回 None"""
+        names = None
+        if hasattr(model, 'feature_names_in_'):
+            names = list(model.feature_names_in_)
+        elif hasattr(model, 'feature_name_'):
+            names = list(model.feature_name_)
+        elif hasattr(model, 'get_booster'):
+            names = model.get_booster().feature_names
+
+        if not names or all(_AUTO_FEATURE_NAME.match(str(name)) for name in names):
+            return None
+        return [str(name) for name in names]
+
+    def _resolve_columns(self) -> Optional[np.ndarray]:
+        """校驗特徵名並返回列重排索引，無需重排時返回 None"""
+        if self.model_features is None:
+            n_expected = getattr(self.model, 'n_features_in_', len(self.input_features))
+            if n_expected != len(self.input_features):
+                raise ValueError(f"模型需要 {n_expected} 個特徵，但輸入有 {len(self.input_features)} 個")
+            return None
+
+        lookup = {name.lower(): i for i, name in enumerate(self.input_features)}
+        missing = [name for name in self.model_features if name.lower() not in lookup]
+        if missing:
+            raise ValueError(f"輸入缺少模型所需的特徵: {', '.join(missing)}")
+
+        columns = np.array([lookup[name.lower()] for name in self.model_features], dtype=np.intp)
+        if np.array_equal(columns, np.arange(len(self.input_features))):
+            return None
+        return columns
+
+    @staticmethod
+    def _resolve_predict_fn(model: Any) -> Callable[[np.ndarray], np.ndarray]:
+        """根據模型類型選擇最直接的預測入口，返回正類概率函數"""
+        # 原生樹集成：直接計算正類概率
+        if isinstance(model, TreeEnsemble):
+            return model.predict_positive
+
+        # LightGBM：二分類 booster.predict 直接返回正類概率
+        booster = getattr(model, 'booster_', None)
+        if booster is not None and hasattr(booster, 'predict'):
+            return lambda X: booster.predict(X)
+
+        # XGBoost：inplace_predict 跳過 DMatrix 構建
+        if hasattr(model, 'get_booster'):
+            xgb_booster = model.get_booster()
+            if getattr(model, 'n_classes_', 2) == 2:
+                return lambda X: xgb_booster.inplace_predict(X)
+
+        # 其他 sklearn 模型：特徵名已在加載時校驗，忽略逐次的特徵名警告
+        if hasattr(model, 'predict_proba'):
+            def predict_proba(X):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', UserWarning)
+                    return model.predict_proba(X)[:, 1]
+            return predict_proba
+
+        if hasattr(model, 'decision_function'):
+            # 歸一化決策函數輸出為概率值
+            return lambda X: 1 / (1 + np.exp(-model.decision_function(X)))
+
+        return lambda X: np.asarray(model.predict(X), dtype=np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        預測正類概率
+
+        Args:
+            X: 形狀為 (行數, 特徵數) 的數組，列順序與 input_features 一致
+
+        Returns:
+            正類概率數組
+        """
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self._columns is not None:
+            X = X[:, self._columns]
+        return self._predict(np.ascontiguousarray(X))
+
+    def predict_one(self, row: np.ndarray) -> float:
+        """預測單行數據的正類概率"""
+        return float(self.predict_proba(row)[0])
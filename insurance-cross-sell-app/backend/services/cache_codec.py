@@ -0,0 +1,76 @@
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 編碼格式版本，格式變更時遞增；版本不符的條目（包括舊的 pickle 條目）一律視為未命中
+CODEC_VERSION = 1
+
+# 預測結果：版本(uint8) + 概率(float32) + 預測類別(uint8)，共 6 字節
+_PREDICTION = struct.Struct('<BfB')
+
+# 向量頭部：版本(uint8) + 元素個數(uint32)，之後是小端 float32 數組
+_VECTOR_HEADER = struct.Struct('<BI')
+_VECTOR_DTYPE = np.dtype('<f4')
+
+
+def encode_prediction(probability: float, prediction: int) -> bytes:
+    """
+    將預測結果編碼為定長字節串
+
+    Args:
+        probability: 預測概率
+        prediction: 預測類別（0 或 1）
+
+    Returns:
+        6 字節的編碼結果
+    """
+    return _PREDICTION.pack(CODEC_VERSION, probability, int(prediction))
+
+
+def decode_prediction(raw: Optional[bytes]) -> Optional[Tuple[float, int]]:
+    """
+    解碼預測結果
+
+    Args:
+        raw: encode_prediction 生成的字節串
+
+    Returns:
+        (probability, prediction) 元組；為空、長度不符或版本不符時返回 None
+    """
+    if not raw or len(raw) != _PREDICTION.size or raw[0] != CODEC_VERSION:
+        return None
+    _, probability, prediction = _PREDICTION.unpack(raw)
+    return probability, prediction
+
+
+def encode_vector(values) -> bytes:
+    """
+    將一維數值向量（例如特徵重要性）編碼為 float32 字節串
+
+    Args:
+        values: 一維數組或列表
+
+    Returns:
+        編碼結果
+    """
+    array = np.ascontiguousarray(values, dtype=_VECTOR_DTYPE).ravel()
+    return _VECTOR_HEADER.pack(CODEC_VERSION, len(array)) + array.tobytes()
+
+
+def decode_vector(raw: Optional[bytes]) -> Optional[np.ndarray]:
+    """
+    解碼 float32 向量，直接引用字節串的內存，不做拷貝
+
+    Args:
+        raw: encode_vector 生成的字節串
+
+    Returns:
+        只讀的 float32 數組；為空、長度不符或版本不符時返回 None
+    """
+    if not raw or len(raw) < _VECTOR_HEADER.size or raw[0] != CODEC_VERSION:
+        return None
+    _, count = _VECTOR_HEADER.unpack_from(raw)
+    if len(raw) != _VECTOR_HEADER.size + count * _VECTOR_DTYPE.itemsize:
+        return None
+    return np.frombuffer(raw, dtype=_VECTOR_DTYPE, count=count, offset=_VECTOR_HEADER.size)
@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 緩存鍵使用 xxhash 的 XXH3-128（requirements.txt 中的依賴）；僅在未安裝 xxhash 的環境中回退到標準庫的 blake2b，
+# 後者是加密哈希，同樣輸出 128 位但明顯更慢
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Redis 中預測結果鍵的前綴
+KEY_PREFIX = 'prediction'
+
+# 特徵值量化的小數位數，數值上相等的輸入（1 與 1.0、float32 與 float64 表示）得到相同的鍵
+QUANTIZE_DECIMALS = 6
+_QUANTIZE_SCALE = float(10 ** QUANTIZE_DECIMALS)
+
+
+def quantize(features: np.ndarray) -> np.ndarray:
+    """
+    將編碼後的特徵量化為規範的定點整數
+
+    乘以 10^QUANTIZE_DECIMALS 後取整，比 np.round 快，且 0.0 與 -0.0 自然得到同一結果
+
+    Args:
+        features: 一維特徵行或二維特徵矩陣，列順序固定
+
+    Returns:
+        C 連續的 int64 數組，形狀與輸入一致
+    """
+    return np.rint(np.multiply(features, _QUANTIZE_SCALE, dtype=np.float64)).astype(np.int64)
+
+
+def digest(data: bytes) -> str:
+    """
+    計算 128 位非加密哈希
+
+    Args:
+        data: 原始字節
+
+    Returns:
+        32 位十六進制字符串
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _new_hasher():
+    """創建增量哈希對象，與 digest() 使用同一算法"""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def model_fingerprint(model_path: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    計算模型指紋：模型文件（或原生樹集成目錄下所有文件）的內容哈希，加上服務配置
+
+    重新訓練後文件內容變化、或閾值等配置變化時指紋隨之變化；所有緩存鍵都以指紋為前綴，
+    舊模型的條目不會再被命中。
+
+    Args:
+        model_path: 模型文件或原生樹集成目錄路徑
+        config: 影響預測結果的配置，例如 {'threshold': 0.45}
+
+    Returns:
+        16 位十六進制字符串；路徑不存在時只對配置計算
+    """
+    if os.path.isdir(model_path):
+        files = [os.path.join(model_path, name) for name in sorted(os.listdir(model_path))]
+    elif os.path.exists(model_path):
+        files = [model_path]
+    else:
+        files = []
+
+    hasher = _new_hasher()
+    for file_path in files:
+        hasher.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(chunk)
+    hasher.update(json.dumps(config or {}, sort_keys=True).encode())
+    return hasher.hexdigest()[:16]
+
+
+def model_key(fingerprint: str, name: str) -> str:
+    """
+    生成模型級別數據（特徵重要性、指標等）的緩存鍵
+
+    Args:
+        fingerprint: 模型指紋
+        name: 數據名稱
+
+    Returns:
+        model:<指紋>:<名稱>
+    """
+    return f"model:{fingerprint}:{name}"
+
+
+def fingerprint_patterns(fingerprint: str) -> List[str]:
+    """
+    返回某個指紋下所有緩存鍵的匹配模式，用於回收舊模型的鍵
+
+    Args:
+        fingerprint: 模型指紋
+
+    Returns:
+        SCAN MATCH 模式列表
+    """
+    return [f"{KEY_PREFIX}:{fingerprint}:*", f"model:{fingerprint}:*"]
+
+
+def prediction_keys(features: np.ndarray, fingerprint: str) -> Tuple[List[bytes], List[str]]:
+    """
+    為一行或一批特徵生成緩存鍵
+
+    Args:
+        features: 一維特徵行或形狀為 (行數, 特徵數) 的特徵矩陣，列順序固定
+        fingerprint: 模型指紋
+
+    Returns:
+        (進程內緩存鍵列表, Redis 緩存鍵列表)；進程內鍵是指紋加量化後特徵行的原始字節
+    """
+    quantized = quantize(features)
+    rows = [quantized.tobytes()] if quantized.ndim == 1 else [row.tobytes() for row in quantized]
+    prefix = fingerprint.encode() + b':'
+    local_keys = [prefix + row for row in rows]
+    redis_keys = [f"{KEY_PREFIX}:{fingerprint}:{digest(row)}" for row in rows]
+    return local_keys, redis_keys
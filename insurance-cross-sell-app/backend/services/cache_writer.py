@@ -0,0 +1,155 @@
+import os
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindCache:
+    """
+    Redis 緩存的後台寫入隊列
+
+    請求線程只把待寫入的鍵值放入有界隊列後立即返回；專用的後台線程從隊列中取出條目，
+    按批次通過一個管道寫入 Redis。隊列已滿時直接丟棄新的寫入，不會阻塞請求。
+    """
+
+    def __init__(self, get_client: Callable[[], Optional[Any]], ttl: int, maxsize: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 0.05):
+        """
+        初始化寫入隊列
+
+        Args:
+            get_client: 返回 ResilientRedis 客戶端的函數，不可用（未啟用或熔斷）時返回 None
+            ttl: 寫入條目的過期秒數
+            maxsize: 隊列最多緩衝的條目數
+            batch_size: 每次管道寫入的最大條目數
+            flush_interval: 批次未滿時最多等待多少秒再寫入
+        """
+        self._get_client = get_client
+        self.ttl = ttl
+        self.maxsize = int(maxsize)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_started(self) -> None:
+        """按需啟動後台線程；fork 後子進程中沒有該線程，檢測到進程號變化時重新創建"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), daemon=True,
+                                            name='cache-write-behind')
+            self._thread.start()
+
+    def submit(self, items: Dict[Any, bytes]) -> int:
+        """
+        提交待寫入的條目，不等待寫入完成
+
+        Args:
+            items: 鍵到已編碼值的映射
+
+        Returns:
+            實際放入隊列的條目數，隊列已滿時其餘條目被丟棄
+        """
+        if not items:
+            return 0
+
+        self._ensure_started()
+        accepted = 0
+        for item in items.items():
+            try:
+                self._queue.put_nowait(item)
+                accepted += 1
+            except queue.Full:
+                break
+
+        with self._stats_lock:
+            self.submitted += accepted
+            self.dropped += len(items) - accepted
+        return accepted
+
+    def _run(self, work_queue: queue.Queue) -> None:
+        """後台線程：收集一批條目後通過管道寫入"""
+        while True:
+            batch = {}
+            key, value = work_queue.get()
+            batch[key] = value
+            # 同一個鍵可能被提交多次，只保留最後的值，但每個取出的條目都要調用一次 task_done
+            dequeued = 1
+
+            # 批次未滿時在 flush_interval 內繼續收集
+            while dequeued < self.batch_size:
+                try:
+                    key, value = work_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                batch[key] = value
+                dequeued += 1
+
+            try:
+                self._flush(batch)
+            finally:
+                for _ in range(dequeued):
+                    work_queue.task_done()
+
+    def _flush(self, batch: Dict[Any, bytes]) -> None:
+        """將一批條目寫入 Redis，Redis 不可用時丟棄；任何異常都只記錄，不會終止後台線程"""
+        try:
+            client = self._get_client()
+            if client is None:
+                with self._stats_lock:
+                    self.dropped += len(batch)
+                return
+
+            client.setex_many(batch, self.ttl)
+            with self._stats_lock:
+                self.written += len(batch)
+        except Exception as e:
+            with self._stats_lock:
+                self.failed += len(batch)
+            logger.warning(f"後台寫入 Redis 緩存失敗（{len(batch)} 條）: {str(e)}")
+
+    def flush(self, timeout: float = None) -> None:
+        """
+        等待隊列中已提交的條目全部處理完（主要用於測試和關閉前）
+
+        Args:
+            timeout: 最多等待的秒數，為 None 時一直等待
+        """
+        if self._queue is None or self._pid != os.getpid():
+            return
+        if timeout is None:
+            self._queue.join()
+            return
+
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回隊列統計信息"""
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'maxsize': self.maxsize,
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
@@ -1,14 +1,46 @@
+import io
 import os
+import copy
+import json
+import hashlib
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Tuple, Optional
 import logging
 
+from config.settings import DATA_SNAPSHOT_DIR, GENDER_MAP, VEHICLE_AGE_MAP, VEHICLE_DAMAGE_MAP
+from utils.feature_engineering import add_derived_features
+from .data_stats import DatasetStats
+
+# pyarrow 是可選依賴：未安裝時不使用二進制快照，每次解析CSV；處理後的數據只能保存為CSV
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
 # 設置日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+class _ByteRange(io.RawIOBase):
+    """只讀取文件到 end 字節為止，按文件版本讀取時不會讀到之後追加的內容"""
+
+    def __init__(self, f, end: int):
+        self._f = f
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        remaining = self._end - self._f.tell()
+        if remaining <= 0:
+            return 0
+        return self._f.readinto(memoryview(buffer)[:remaining])
+
+
 class DataService:
     """
     數據服務類，負責數據的讀取、預處理和統計分析
@@ -20,12 +52,42 @@ class DataService:
     4. 劃分訓練集和測試集
     """
 
-    def __init__(self, data_dir: str = None):
+    # 處理後的數據按文件路徑在進程內共享，同一進程中的多個 DataService 實例只保留一份；
+    # 在 gunicorn master 中預加載後，fork 出的 worker 直接共享這些內存頁。
+    # 每項記錄讀取時文件的大小、修改時間和內容哈希：{'size', 'mtime_ns', 'sha256', 'frame'}
+    _shared_frames: Dict[str, Dict[str, Any]] = {}
+
+    # 數據集統計信息按文件路徑在進程內共享，與處理後的數據一樣在 master 中預加載
+    # 每項為 {'size', 'mtime_ns', 'sha256', 'stats'}
+    _shared_stats: Dict[str, Dict[str, Any]] = {}
+
+    # 原始數據各列的類型：類別列使用固定類別（編碼與 config.settings 中的映射一致，內部為 int8 編碼），
+    # 0/1 標誌使用 int8，其餘整數列使用能容納取值範圍的最小整數類型，浮點列使用 float32（數據均為整數值，轉換無損）
+    RAW_DTYPES = {
+        'id': np.int32,
+        'Gender': pd.CategoricalDtype(sorted(GENDER_MAP, key=GENDER_MAP.get)),
+        'Age': np.int16,
+        'Driving_License': np.int8,
+        'Region_Code': np.float32,
+        'Previously_Insured': np.int8,
+        'Vehicle_Age': pd.CategoricalDtype(sorted(VEHICLE_AGE_MAP, key=VEHICLE_AGE_MAP.get)),
+        'Vehicle_Damage': pd.CategoricalDtype(sorted(VEHICLE_DAMAGE_MAP, key=VEHICLE_DAMAGE_MAP.get)),
+        'Annual_Premium': np.float32,
+        'Policy_Sales_Channel': np.float32,
+        'Vintage': np.int16,
+        'Response': np.int8
+    }
+
+    # 快照格式版本，RAW_DTYPES 變化時遞增，使舊快照失效
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, data_dir: str = None, snapshot_dir: str = None):
         """
         初始化數據服務
         
         Args:
             data_dir: 數據目錄路徑，默認使用相對路徑
+            snapshot_dir: 二進制快照目錄，默認使用 DATA_SNAPSHOT_DIR，為空字符串時不使用快照
         """
         # 獲取基礎目錄
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -37,14 +99,11 @@ class DataService:
         # 數據文件路徑
         self.train_path = os.path.join(self.data_dir, 'train.csv')
         self.test_path = os.path.join(self.data_dir, 'test.csv')
+        self.snapshot_dir = DATA_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir
 
         # 驗證數據文件是否存在
         self._validate_data_files()
 
-        # 緩存處理後的數據
-        self._train_df = None
-        self._test_df = None
-
     def _validate_data_files(self) -> None:
         """驗證數據文件是否存在"""
         if not os.path.exists(self.train_path):
@@ -57,11 +116,162 @@ class DataService:
 
     def get_raw_train_data(self) -> pd.DataFrame:
         """獲取原始訓練數據"""
-        return pd.read_csv(self.train_path)
+        return self._read_raw(self.train_path)
 
     def get_raw_test_data(self) -> pd.DataFrame:
         """獲取原始測試數據"""
-        return pd.read_csv(self.test_path)
+        return self._read_raw(self.test_path)
+
+    @staticmethod
+    def _file_digest(path: str, limit: int = None) -> str:
+        """按塊計算文件內容的 SHA-256，指定 limit 時只計算前 limit 個字節"""
+        digest = hashlib.sha256()
+        remaining = limit
+        with open(path, 'rb') as f:
+            while remaining is None or remaining > 0:
+                block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                if remaining is not None:
+                    remaining -= len(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _appended_digest(path: str, size: int, digest: str, end: int) -> Optional[str]:
+        """
+        判斷文件是否只在前 size 個字節（SHA-256 為 digest）之後追加了完整的新行
+        
+        前綴和新增部分在同一次順序讀取中累加到同一個哈希，不需要再讀一遍整個文件
+        
+        Args:
+            path: 文件路徑
+            size: 原內容的字節數
+            digest: 原內容的 SHA-256
+            end: 當前文件版本的字節數
+            
+        Returns:
+            是追加時返回前 end 個字節的 SHA-256，否則返回 None
+        """
+        if size <= 0 or end <= size:
+            return None
+
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            remaining = size
+            while remaining > 0:
+                block = f.read(min(1 << 20, remaining))
+                if not block:
+                    return None
+                hasher.update(block)
+                remaining -= len(block)
+            # 原內容必須未被修改，且以換行符結尾（新增內容從新行開始）
+            if hasher.hexdigest() != digest or not block.endswith(b'\n'):
+                return None
+            remaining = end - size
+            while remaining > 0:
+                block = f.read(min(1 << 20, remaining))
+                if not block:
+                    return None
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher.hexdigest()
+
+    def _read_csv(self, path: str, end: int = None) -> pd.DataFrame:
+        """按 RAW_DTYPES 解析CSV（指定 end 時只解析前 end 個字節），文件中不存在的列（例如測試數據沒有 Response）忽略"""
+        if end is None:
+            return pd.read_csv(path, dtype=self.RAW_DTYPES)
+        with open(path, 'rb') as f:
+            return pd.read_csv(io.BufferedReader(_ByteRange(f, end)), dtype=self.RAW_DTYPES)
+
+    def _read_raw(self, path: str) -> pd.DataFrame:
+        """
+        讀取類型化的原始數據
+        
+        Args:
+            path: CSV文件路徑
+            
+        Returns:
+            原始數據，每次返回新的數據框
+        """
+        if not self.snapshot_dir or pyarrow is None:
+            return self._read_csv(path)
+        return self._read_raw_version(path)[0]
+
+    def _read_raw_version(self, path: str) -> Tuple[pd.DataFrame, os.stat_result, str]:
+        """
+        讀取類型化的原始數據，同時返回所讀取的文件版本
+        
+        優先讀取二進制快照（Feather），跳過CSV解析。快照以CSV內容的 SHA-256 為鍵，旁邊的元數據文件記錄
+        CSV的大小和修改時間：兩者未變時直接使用快照，不重新計算哈希；修改時間變化但內容未變時只更新元數據；
+        內容變化、快照格式版本變化或快照損壞時重新解析CSV並寫入新快照。
+        只讀取 os.stat 時的前 st_size 個字節，讀取期間追加的內容留給下一次增量更新。
+        
+        Args:
+            path: CSV文件路徑
+            
+        Returns:
+            (原始數據, 讀取時的文件狀態, 所讀內容的 SHA-256)
+        """
+        stat = os.stat(path)
+        if not self.snapshot_dir or pyarrow is None:
+            return self._read_csv(path, end=stat.st_size), stat, self._file_digest(path, limit=stat.st_size)
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        meta_path = os.path.join(self.snapshot_dir, f"{name}.json")
+
+        meta = None
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = None
+        if meta is not None and meta.get('version') != self.SNAPSHOT_VERSION:
+            meta = None
+
+        unchanged = meta is not None and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns
+        digest = meta['sha256'] if unchanged else self._file_digest(path, limit=stat.st_size)
+        snapshot_path = os.path.join(self.snapshot_dir, f"{name}-{digest[:16]}.feather")
+
+        if meta is not None and meta['sha256'] == digest and os.path.exists(snapshot_path):
+            try:
+                df = pd.read_feather(snapshot_path)
+                if not unchanged:
+                    self._write_snapshot_meta(meta_path, stat, digest)
+                return df, stat, digest
+            except Exception as e:
+                logger.warning(f"讀取數據快照失敗，重新解析CSV: {str(e)}")
+
+        df = self._read_csv(path, end=stat.st_size)
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, snapshot_path)
+            stale = meta['sha256'][:16] if meta is not None else None
+            self._write_snapshot_meta(meta_path, stat, digest)
+            if stale and stale != digest[:16]:
+                stale_path = os.path.join(self.snapshot_dir, f"{name}-{stale}.feather")
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            logger.info(f"數據快照已寫入: {snapshot_path}")
+        except OSError as e:
+            # 快照只是加速手段，目錄不可寫時繼續使用解析結果
+            logger.warning(f"寫入數據快照失敗: {str(e)}")
+        return df, stat, digest
+
+    def _write_snapshot_meta(self, meta_path: str, stat: os.stat_result, digest: str) -> None:
+        """原子地寫入快照元數據"""
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': self.SNAPSHOT_VERSION,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest
+            }, f)
+        os.replace(tmp_path, meta_path)
 
     def _preprocess_data(self, df: pd.DataFrame, is_train: bool = True) -> pd.DataFrame:
         """
@@ -69,31 +279,17 @@ class DataService:
         
         參考原始代碼 step_1_2_训练集数据预处理.py 和 step_1_3_测试用数据预处理.py
         
+        直接在傳入的數據框上添加派生列，不複製數據；調用方傳入新讀取的數據
+        
         Args:
-            df: 原始數據
+            df: 原始數據，會被原地修改
             is_train: 是否為訓練數據
             
         Returns:
             處理後的數據
         """
-        # 創建數據的副本，避免修改原始數據
-        processed_df = df.copy()
-
-        # 1. 添加 Annual_Premium_Log 特徵（對數轉換保費）
-        processed_df["annual_premium_log"] = np.log1p(processed_df["Annual_Premium"])
-
-        # 2. 添加 Age_Group 特徵（年齡段分類）
-        def age_group(age):
-            if age < 25:
-                return "青年"
-            elif age < 40:
-                return "中年"
-            elif age < 60:
-                return "中老年"
-            else:
-                return "老年"
-
-        processed_df["age_group"] = processed_df["Age"].apply(age_group)
+        # 1-2. 添加 annual_premium_log（對數轉換保費）和 age_group（年齡段分類）特徵
+        processed_df = add_derived_features(df, age_column='Age', premium_column='Annual_Premium')
 
         # 3. 特徵名稱標準化（全部小寫並使用下劃線分隔）
         processed_df.columns = [col.lower().replace(' ', '_') for col in processed_df.columns]
@@ -101,99 +297,199 @@ class DataService:
         logger.info(f"數據預處理完成，{'訓練' if is_train else '測試'}數據共 {len(processed_df)} 行")
         return processed_df
 
+    @staticmethod
+    def _share_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        將處理後的數據轉換為適合跨進程共享的形式
+        
+        字符串列轉換為類別型，數據只保存在整數編碼數組中，而不是數十萬個 Python 字符串對象；
+        否則 fork 後的 worker 每次訪問都會修改對象引用計數，觸發寫時複製，共享的內存頁逐漸被複製一份
+        
+        Args:
+            df: 處理後的數據
+            
+        Returns:
+            共享用的數據
+        """
+        for column in df.select_dtypes(include=['object']).columns:
+            df[column] = df[column].astype('category')
+        return df
+
+    def _get_shared_frame(self, path: str, is_train: bool) -> pd.DataFrame:
+        """
+        讀取並預處理數據文件，結果在進程內按路徑共享
+        
+        每次訪問只用一次 os.stat 比較文件的大小和修改時間，未變時直接返回緩存；
+        文件只在末尾追加了行時只讀取和預處理新增部分並拼接，內容未變時只更新版本，其餘變化重新讀取
+        """
+        stat = os.stat(path)
+        cached = self._shared_frames.get(path)
+        if cached is not None and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['frame']
+
+        df = None
+        if cached is not None:
+            digest = self._appended_digest(path, cached['size'], cached['sha256'], stat.st_size)
+            if digest is not None:
+                tail = list(self._iter_processed_chunks(path, is_train, offset=cached['size'], end=stat.st_size))
+                df = self._share_frame(pd.concat([cached['frame'], *tail], ignore_index=True))
+                logger.info(f"數據文件新增 {len(df) - len(cached['frame'])} 行，已增量加載")
+            elif cached['size'] == stat.st_size and self._file_digest(path, limit=stat.st_size) == cached['sha256']:
+                df, digest = cached['frame'], cached['sha256']
+
+        if df is None:
+            raw, stat, digest = self._read_raw_version(path)
+            df = self._share_frame(self._preprocess_data(raw, is_train=is_train))
+
+        self._shared_frames[path] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'frame': df
+        }
+        return df
+
+    def _iter_processed_chunks(self, path: str, is_train: bool, offset: int = 0, end: int = None,
+                               chunksize: int = 100000):
+        """
+        按塊讀取並預處理CSV，從 offset 字節處開始讀取時使用文件表頭中的列名
+        
+        Args:
+            path: CSV文件路徑
+            is_train: 是否為訓練數據
+            offset: 起始字節位置（必須位於行首），為 0 時從頭讀取
+            end: 結束字節位置，為 None 時讀到文件末尾
+            chunksize: 每塊行數
+            
+        Yields:
+            處理後的數據塊
+        """
+        header = {} if offset == 0 else {'header': None, 'names': pd.read_csv(path, nrows=0).columns.tolist()}
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            source = f if end is None else io.BufferedReader(_ByteRange(f, end))
+            for chunk in pd.read_csv(source, dtype=self.RAW_DTYPES, chunksize=chunksize, **header):
+                yield self._preprocess_data(chunk, is_train=is_train)
+
+    def _get_dataset_stats(self, path: str, is_train: bool) -> DatasetStats:
+        """
+        獲取數據文件的統計信息，結果在進程內按路徑共享
+        
+        每次訪問只用一次 os.stat 比較文件的大小和修改時間，未變時直接返回緩存。
+        文件變化後，以進程內緩存（沒有時以快照目錄中持久化的記錄）為基礎：內容未變只更新版本；
+        只在末尾追加了行（原內容的哈希一致）時複製已有統計並只掃描新增部分；其餘情況重新計算。
+        統計信息（包括相關係數累計量）以CSV內容的 SHA-256 為版本保存在快照目錄中，其他進程可以直接使用
+        """
+        stat = os.stat(path)
+        cached = self._shared_stats.get(path)
+        if cached is not None and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['stats']
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        stats_path = os.path.join(self.snapshot_dir, f"{name}-stats.json") if self.snapshot_dir else None
+
+        record = None
+        if stats_path and os.path.exists(stats_path):
+            try:
+                with open(stats_path, 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                record = None
+        if record is not None and record.get('format') != DatasetStats.FORMAT_VERSION:
+            record = None
+
+        stats = None
+        if record is not None and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            # 其他進程已按當前版本計算並保存
+            digest = record['sha256']
+            stats = DatasetStats.from_dict(record['stats'])
+        else:
+            base = cached
+            if base is None and record is not None:
+                base = dict(record, stats=DatasetStats.from_dict(record['stats']))
+
+            digest = None
+            if base is not None:
+                digest = self._appended_digest(path, base['size'], base['sha256'], stat.st_size)
+                if digest is not None:
+                    # 緩存中的統計可能正被其他線程讀取，在副本上合併新增部分
+                    stats = copy.deepcopy(base['stats'])
+                    for chunk in self._iter_processed_chunks(path, is_train, offset=base['size'], end=stat.st_size):
+                        stats.update(chunk)
+                    logger.info(f"數據文件新增 {stats.rows - base['stats'].rows} 行，統計信息已增量更新")
+
+            if digest is None:
+                digest = self._file_digest(path, limit=stat.st_size)
+                if base is not None and base['size'] == stat.st_size and base['sha256'] == digest:
+                    stats = base['stats']
+                else:
+                    stats = DatasetStats.from_chunks(self._iter_processed_chunks(path, is_train, end=stat.st_size))
+                    logger.info(f"數據統計信息已重新計算，共 {stats.rows} 行")
+
+        if stats_path and (record is None or record['sha256'] != digest or record['mtime_ns'] != stat.st_mtime_ns):
+            try:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                tmp_path = f"{stats_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({
+                        'format': DatasetStats.FORMAT_VERSION,
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns,
+                        'sha256': digest,
+                        'stats': stats.to_dict()
+                    }, f)
+                os.replace(tmp_path, stats_path)
+            except OSError as e:
+                logger.warning(f"保存數據統計信息失敗: {str(e)}")
+
+        self._shared_stats[path] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'stats': stats
+        }
+        return stats
+
     def get_processed_train_data(self) -> pd.DataFrame:
         """獲取處理後的訓練數據（帶緩存）"""
-        if self._train_df is None:
-            raw_df = self.get_raw_train_data()
-            self._train_df = self._preprocess_data(raw_df, is_train=True)
-        return self._train_df
+        return self._get_shared_frame(self.train_path, is_train=True)
 
     def get_processed_test_data(self) -> pd.DataFrame:
         """獲取處理後的測試數據（帶緩存）"""
-        if self._test_df is None:
-            raw_df = self.get_raw_test_data()
-            self._test_df = self._preprocess_data(raw_df, is_train=False)
-        return self._test_df
+        return self._get_shared_frame(self.test_path, is_train=False)
+
+    def preload(self) -> None:
+        """
+        預加載處理後的訓練和測試數據
+        
+        在 gunicorn master 中（preload_app）調用，數據只讀取和預處理一次，之後由所有 worker 共享
+        """
+        self.get_processed_train_data()
+        self.get_processed_test_data()
+        self._get_dataset_stats(self.train_path, is_train=True)
+        logger.info("參考數據集已預加載")
 
     def get_data_stats(self) -> Dict[str, Any]:
         """
         獲取數據統計信息
         
+        統計信息按數據版本預先計算並持久化，中位數來自可合併的分位數草圖；同一進程中重複調用直接返回緩存結果
+        
         Returns:
             包含數據統計的字典
         """
-        train_df = self.get_processed_train_data()
-
-        # 基本統計信息
-        stats = {
-            "total_records": len(train_df),
-            "features_stats": {},
-        }
-
-        # 數值型特徵統計
-        numeric_features = train_df.select_dtypes(include=['int64', 'float64']).columns
-        for feature in numeric_features:
-            stats["features_stats"][feature] = {
-                "min": float(train_df[feature].min()),
-                "max": float(train_df[feature].max()),
-                "mean": float(train_df[feature].mean()),
-                "median": float(train_df[feature].median()),
-                "std": float(train_df[feature].std()),
-                "type": "numeric"
-            }
-
-        # 類別型特徵統計
-        categorical_features = train_df.select_dtypes(include=['object']).columns
-        for feature in categorical_features:
-            value_counts = train_df[feature].value_counts().to_dict()
-            stats["features_stats"][feature] = {
-                "unique_values": len(value_counts),
-                "distribution": {str(k): int(v) for k, v in value_counts.items()},
-                "type": "categorical"
-            }
-
-        # 目標變量分佈（如果存在）
-        if 'response' in train_df.columns:
-            stats["target_distribution"] = train_df['response'].value_counts().to_dict()
-
-        logger.info("數據統計生成完成")
-        return stats
+        return self._get_dataset_stats(self.train_path, is_train=True).summary()
 
     def get_correlation_matrix(self) -> Dict[str, Any]:
         """
         獲取數值特徵之間的相關性矩陣
         
+        相關係數與數據統計信息在同一次掃描中累計並按數據版本持久化，同一進程中重複調用直接返回緩存結果
+        
         Returns:
             包含相關性矩陣的字典
         """
-        train_df = self.get_processed_train_data()
-
-        # 只選擇數值型特徵
-        numeric_features = train_df.select_dtypes(include=['int64', 'float64']).columns
-        numeric_df = train_df[numeric_features]
-
-        # 計算相關性矩陣
-        corr_matrix = numeric_df.corr().round(3)
-
-        # 轉換為適合前端使用的格式
-        features = corr_matrix.columns.tolist()
-        corr_data = []
-
-        for i, feature1 in enumerate(features):
-            for j, feature2 in enumerate(features):
-                corr_data.append({
-                    'feature1': feature1,
-                    'feature2': feature2,
-                    'correlation': float(corr_matrix.iloc[i, j])
-                })
-
-        result = {
-            'features': features,
-            'correlations': corr_data
-        }
-
-        logger.info("相關性矩陣生成完成")
-        return result
+        return self._get_dataset_stats(self.train_path, is_train=True).correlation_matrix()
 
     def split_train_validation(self, test_size: float = 0.2, random_state: int = 42) -> Tuple[
         pd.DataFrame, pd.DataFrame]:
@@ -220,28 +516,41 @@ class DataService:
         logger.info(f"數據已劃分為訓練集 ({len(train_data)} 行) 和驗證集 ({len(val_data)} 行)")
         return train_data, val_data
 
-    def save_processed_data(self, output_dir: str = None) -> Dict[str, str]:
+    def save_processed_data(self, output_dir: str = None, file_format: str = None,
+                            chunksize: int = 100000) -> Dict[str, str]:
         """
         保存處理後的數據到文件
         
+        按塊讀取原始CSV、計算派生特徵並逐塊追加到輸出文件，峰值內存只與塊大小有關，可以處理大於內存的數據集；
+        列順序來自CSV表頭（原始列在前，派生列在後）
+        
         Args:
             output_dir: 輸出目錄，默認為data_dir/processed
+            file_format: 'parquet' 或 'csv'，默認在安裝了 pyarrow 時使用 'parquet'
+            chunksize: 每塊行數
             
         Returns:
             保存的文件路徑字典
         """
+        if file_format is None:
+            file_format = 'parquet' if pyarrow is not None else 'csv'
+        if file_format not in ('parquet', 'csv'):
+            raise ValueError(f"不支持的輸出格式: {file_format}，可選值為: ['parquet', 'csv']")
+        if file_format == 'parquet' and pyarrow is None:
+            raise ValueError("保存 parquet 文件需要安裝 pyarrow")
+
         if output_dir is None:
             output_dir = os.path.join(self.data_dir, 'processed')
 
         os.makedirs(output_dir, exist_ok=True)
 
         # 保存處理後的訓練數據
-        train_output_path = os.path.join(output_dir, 'train_processed.csv')
-        self.get_processed_train_data().to_csv(train_output_path, index=False)
+        train_output_path = os.path.join(output_dir, f'train_processed.{file_format}')
+        self._write_processed(self.train_path, train_output_path, True, file_format, chunksize)
 
         # 保存處理後的測試數據
-        test_output_path = os.path.join(output_dir, 'test_processed.csv')
-        self.get_processed_test_data().to_csv(test_output_path, index=False)
+        test_output_path = os.path.join(output_dir, f'test_processed.{file_format}')
+        self._write_processed(self.test_path, test_output_path, False, file_format, chunksize)
 
         logger.info(f"處理後的數據已保存到 {output_dir}")
 
@@ -249,3 +558,51 @@ class DataService:
             "train_processed": train_output_path,
             "test_processed": test_output_path
         }
+
+    def _write_processed(self, path: str, output_path: str, is_train: bool, file_format: str,
+                         chunksize: int) -> int:
+        """
+        將一個CSV文件逐塊預處理並追加寫入輸出文件，先寫入臨時文件，完成後再替換
+        
+        Returns:
+            寫入的行數
+        """
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        rows = 0
+        try:
+            if file_format == 'parquet':
+                writer = None
+                try:
+                    for chunk in self._iter_processed_chunks(path, is_train, chunksize=chunksize):
+                        if writer is None:
+                            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                            writer = pq.ParquetWriter(tmp_path, table.schema, compression='snappy')
+                        else:
+                            # 按第一塊的結構轉換，保證各塊的列類型一致
+                            table = pyarrow.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                        writer.write_table(table)
+                        rows += len(chunk)
+                    if writer is None:
+                        # 只有表頭的文件：寫入只包含列結構的空表
+                        empty = self._preprocess_data(pd.read_csv(path, nrows=0, dtype=self.RAW_DTYPES), is_train)
+                        pq.write_table(pyarrow.Table.from_pandas(empty, preserve_index=False), tmp_path)
+                finally:
+                    if writer is not None:
+                        writer.close()
+            else:
+                with open(tmp_path, 'w', newline='') as f:
+                    header = True
+                    for chunk in self._iter_processed_chunks(path, is_train, chunksize=chunksize):
+                        chunk.to_csv(f, index=False, header=header)
+                        header = False
+                        rows += len(chunk)
+                    if header:
+                        empty = self._preprocess_data(pd.read_csv(path, nrows=0, dtype=self.RAW_DTYPES), is_train)
+                        empty.to_csv(f, index=False)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        logger.info(f"已寫入 {rows} 行處理後的數據: {output_path}")
+        return rows
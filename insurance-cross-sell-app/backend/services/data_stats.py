@@ -0,0 +1,473 @@
+import math
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    可合併的分位數草圖
+
+    取值種類較少時（不超過 max_exact 個）精確記錄每個值的出現次數，分位數與 pandas 的線性插值結果一致；
+    超過後轉換為 DDSketch：按 γ = (1 + α) / (1 - α) 的對數區間計數，任意分位數的相對誤差不超過 α。
+    兩種形式都只保存計數，分塊計算的草圖可以直接合併，結果與一次性計算相同。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_exact: int = 2048):
+        """
+        初始化草圖
+
+        Args:
+            relative_accuracy: 分位數的相對誤差上限 α
+            max_exact: 精確計數的最大取值種類數
+        """
+        self.relative_accuracy = float(relative_accuracy)
+        self.max_exact = int(max_exact)
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.count = 0
+        self.exact: Optional[Dict[float, int]] = {}
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        加入一批值（不含缺失值）
+
+        Args:
+            values: 一維數值數組
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        uniques, counts = np.unique(values, return_counts=True)
+        self.count += int(counts.sum())
+
+        if self.exact is not None:
+            for value, count in zip(uniques.tolist(), counts.tolist()):
+                self.exact[value] = self.exact.get(value, 0) + count
+            if len(self.exact) > self.max_exact:
+                self._to_buckets()
+            return
+
+        self._add_buckets(uniques, counts)
+
+    def _add_buckets(self, values: np.ndarray, counts: np.ndarray) -> None:
+        """按對數區間累加計數"""
+        self.zero_count += int(counts[values == 0].sum())
+        for store, mask, sign in ((self.positive, values > 0, 1.0), (self.negative, values < 0, -1.0)):
+            if not mask.any():
+                continue
+            keys = np.ceil(np.log(sign * values[mask]) / self._log_gamma).astype(np.int64)
+            uniques, inverse = np.unique(keys, return_inverse=True)
+            totals = np.bincount(inverse, weights=counts[mask])
+            for key, total in zip(uniques.tolist(), totals.tolist()):
+                store[key] = store.get(key, 0) + int(total)
+
+    def _to_buckets(self) -> None:
+        """將精確計數轉換為對數區間計數"""
+        exact, self.exact = self.exact, None
+        if exact:
+            self._add_buckets(np.fromiter(exact.keys(), dtype=np.float64, count=len(exact)),
+                              np.fromiter(exact.values(), dtype=np.int64, count=len(exact)))
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """合併另一個相同參數的草圖"""
+        self.count += other.count
+        if self.exact is not None and other.exact is not None:
+            for value, count in other.exact.items():
+                self.exact[value] = self.exact.get(value, 0) + count
+            if len(self.exact) > self.max_exact:
+                self._to_buckets()
+            return
+
+        if self.exact is not None:
+            self._to_buckets()
+        if other.exact is not None:
+            if other.exact:
+                self._add_buckets(np.fromiter(other.exact.keys(), dtype=np.float64, count=len(other.exact)),
+                                  np.fromiter(other.exact.values(), dtype=np.int64, count=len(other.exact)))
+            return
+        self.zero_count += other.zero_count
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估計分位數
+
+        Args:
+            q: 分位點，0 到 1 之間
+
+        Returns:
+            分位數估計值，草圖為空時返回 None
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        if self.exact is not None:
+            values = sorted(self.exact)
+            cumulative = np.cumsum([self.exact[value] for value in values])
+            lower = values[int(np.searchsorted(cumulative, math.floor(rank), side='right'))]
+            upper = values[int(np.searchsorted(cumulative, math.ceil(rank), side='right'))]
+            return lower + (upper - lower) * (rank - math.floor(rank))
+
+        # 從最小值開始按區間順序累計：負數區間按絕對值從大到小，然後是零，最後是正數區間
+        buckets = [(-self._bucket_value(key), count) for key, count in sorted(self.negative.items(), reverse=True)]
+        buckets.append((0.0, self.zero_count))
+        buckets += [(self._bucket_value(key), count) for key, count in sorted(self.positive.items())]
+
+        seen = 0
+        for value, count in buckets:
+            seen += count
+            if seen > rank:
+                return value
+        return buckets[-1][0]
+
+    def _bucket_value(self, key: int) -> float:
+        """區間 (γ^(k-1), γ^k] 的代表值，與區間內任意值的相對誤差不超過 α"""
+        return 2.0 * self.gamma ** key / (self.gamma + 1.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為可 JSON 序列化的字典"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_exact': self.max_exact,
+            'count': self.count,
+            'exact': [[value, count] for value, count in self.exact.items()] if self.exact is not None else None,
+            'positive': [[key, count] for key, count in self.positive.items()],
+            'negative': [[key, count] for key, count in self.negative.items()],
+            'zero_count': self.zero_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        """從 to_dict 的結果恢復草圖"""
+        sketch = cls(data['relative_accuracy'], data['max_exact'])
+        sketch.count = data['count']
+        sketch.exact = {value: count for value, count in data['exact']} if data['exact'] is not None else None
+        sketch.positive = {key: count for key, count in data['positive']}
+        sketch.negative = {key: count for key, count in data['negative']}
+        sketch.zero_count = data['zero_count']
+        return sketch
+
+
+class NumericSummary:
+    """
+    數值列的可合併匯總：計數、最小值、最大值、均值、離差平方和（Chan 並行合併公式）和中位數草圖
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch = QuantileSketch()
+
+    def update(self, values: np.ndarray) -> None:
+        """加入一批值，缺失值忽略"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        self._combine(n, float(values.min()), float(values.max()), mean, m2)
+        self.sketch.update(values)
+
+    def _combine(self, n: int, minimum: float, maximum: float, mean: float, m2: float) -> None:
+        """合併另一組數據的矩"""
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def merge(self, other: 'NumericSummary') -> None:
+        """合併另一個匯總"""
+        if other.count == 0:
+            return
+        self._combine(other.count, other.min, other.max, other.mean, other.m2)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Dict[str, Any]:
+        """返回與接口一致的統計信息"""
+        return {
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.mean if self.count else None,
+            "median": self.sketch.quantile(0.5),
+            "std": math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            "type": "numeric"
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為可 JSON 序列化的字典"""
+        return {
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'mean': self.mean,
+            'm2': self.m2,
+            'sketch': self.sketch.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NumericSummary':
+        """從 to_dict 的結果恢復匯總"""
+        summary = cls()
+        summary.count = data['count']
+        if summary.count:
+            summary.min = data['min']
+            summary.max = data['max']
+        summary.mean = data['mean']
+        summary.m2 = data['m2']
+        summary.sketch = QuantileSketch.from_dict(data['sketch'])
+        return summary
+
+
+class CorrelationAccumulator:
+    """
+    可流式更新的相關係數矩陣
+
+    每批數據按批內均值中心化後轉為 float32，用一次矩陣乘法得到該批的離差乘積矩陣，
+    再以 float64 按 Chan 公式與之前的累計量合併；只保存行數、均值向量和離差乘積矩陣，大小與行數無關。
+    含缺失值的行整行忽略。
+    """
+
+    def __init__(self, columns: List[str] = None):
+        """
+        初始化累計器
+
+        Args:
+            columns: 參與計算的列，為 None 時使用第一批數據的所有列
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.count = 0
+        self.mean = None
+        self.comoment = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        加入一批數據
+
+        Args:
+            df: 包含 columns 各列的數值數據框
+        """
+        if self.columns is None:
+            self.columns = list(df.columns)
+        X = df[self.columns].to_numpy(dtype=np.float32)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) == 0:
+            return
+        mean = X.mean(axis=0, dtype=np.float64)
+        centered = (X - mean).astype(np.float32)
+        self._combine(len(X), mean, (centered.T @ centered).astype(np.float64))
+
+    def _combine(self, n: int, mean: np.ndarray, comoment: np.ndarray) -> None:
+        """合併另一組數據的均值向量和離差乘積矩陣"""
+        if self.count == 0:
+            self.count, self.mean, self.comoment = n, mean, comoment
+            return
+        total = self.count + n
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.count * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.count = total
+
+    def merge(self, other: 'CorrelationAccumulator') -> None:
+        """合併另一個相同列的累計器"""
+        if other.count == 0:
+            return
+        if self.columns is None:
+            self.columns = list(other.columns)
+        self._combine(other.count, other.mean, other.comoment)
+
+    def correlation(self) -> np.ndarray:
+        """返回皮爾遜相關係數矩陣，方差為 0 的列對應 NaN"""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.comoment / np.outer(std, std)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為可 JSON 序列化的字典"""
+        return {
+            'columns': self.columns,
+            'count': self.count,
+            'mean': self.mean.tolist() if self.count else None,
+            'comoment': self.comoment.tolist() if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CorrelationAccumulator':
+        """從 to_dict 的結果恢復累計器"""
+        accumulator = cls(data['columns'])
+        accumulator.count = data['count']
+        if accumulator.count:
+            accumulator.mean = np.asarray(data['mean'], dtype=np.float64)
+            accumulator.comoment = np.asarray(data['comoment'], dtype=np.float64)
+        return accumulator
+
+
+class DatasetStats:
+    """
+    數據集統計信息
+
+    按塊單次掃描計算：數值列維護可合併的矩、中位數草圖和相關係數累計量，類別列維護取值計數。
+    追加數據時只需用新行調用 update，不必重新掃描整個數據集；匯總結果緩存到下次更新為止，讀取為 O(1)。
+    """
+
+    # 持久化格式版本，統計內容變化時遞增，舊文件會被重新計算
+    FORMAT_VERSION = 2
+
+    def __init__(self, target: str = 'response'):
+        """
+        初始化統計信息
+
+        Args:
+            target: 目標變量列名，除數值統計外還記錄其取值分佈
+        """
+        self.target = target
+        self.rows = 0
+        self.numeric: Dict[str, NumericSummary] = {}
+        self.categorical: Dict[str, Dict[str, int]] = {}
+        self.target_counts: Dict[Any, int] = {}
+        self.correlation = CorrelationAccumulator()
+        self._summary = None
+        self._correlation_matrix = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        加入一批處理後的數據
+
+        Args:
+            df: 處理後的數據（列名已標準化）
+        """
+        self.rows += len(df)
+        numeric_columns = df.select_dtypes(include='number').columns
+        for column in numeric_columns:
+            self.numeric.setdefault(column, NumericSummary()).update(df[column].to_numpy(dtype=np.float64))
+        self.correlation.update(df[numeric_columns])
+
+        for column in df.select_dtypes(include=['object', 'category']).columns:
+            # 類別型列的所有類別（包括本批未出現的）都會記錄，與 value_counts 的輸出一致
+            counts = self.categorical.setdefault(column, {})
+            for value, count in df[column].value_counts().items():
+                counts[str(value)] = counts.get(str(value), 0) + int(count)
+
+        if self.target in df.columns:
+            for value, count in df[self.target].value_counts().items():
+                value = value.item() if hasattr(value, 'item') else value
+                self.target_counts[value] = self.target_counts.get(value, 0) + int(count)
+
+        self._summary = None
+        self._correlation_matrix = None
+
+    def merge(self, other: 'DatasetStats') -> None:
+        """合併另一份統計信息（例如分別計算的兩部分數據）"""
+        self.rows += other.rows
+        for column, summary in other.numeric.items():
+            self.numeric.setdefault(column, NumericSummary()).merge(summary)
+        for column, other_counts in other.categorical.items():
+            counts = self.categorical.setdefault(column, {})
+            for value, count in other_counts.items():
+                counts[value] = counts.get(value, 0) + count
+        for value, count in other.target_counts.items():
+            self.target_counts[value] = self.target_counts.get(value, 0) + count
+        self.correlation.merge(other.correlation)
+        self._summary = None
+        self._correlation_matrix = None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        返回 /api/data/stats 的結果，計算一次後緩存
+
+        Returns:
+            包含數據統計的字典
+        """
+        if self._summary is not None:
+            return self._summary
+
+        stats = {
+            "total_records": self.rows,
+            "features_stats": {},
+        }
+        for column, summary in self.numeric.items():
+            stats["features_stats"][column] = summary.summary()
+        for column, counts in self.categorical.items():
+            stats["features_stats"][column] = {
+                "unique_values": len(counts),
+                "distribution": self._by_count(counts),
+                "type": "categorical"
+            }
+        if self.target_counts:
+            stats["target_distribution"] = self._by_count(self.target_counts)
+
+        self._summary = stats
+        return stats
+
+    def correlation_matrix(self) -> Dict[str, Any]:
+        """
+        返回 /api/data/correlation 的結果（數值特徵之間的相關係數，保留三位小數），計算一次後緩存
+
+        Returns:
+            包含特徵列表和相關係數列表的字典
+        """
+        if self._correlation_matrix is not None:
+            return self._correlation_matrix
+
+        features = list(self.correlation.columns or [])
+        values = np.round(self.correlation.correlation(), 3).ravel().tolist() if self.correlation.count else []
+        self._correlation_matrix = {
+            'features': features,
+            'correlations': [
+                {'feature1': feature1, 'feature2': feature2, 'correlation': value}
+                for (feature1, feature2), value in zip(product(features, repeat=2), values)
+            ]
+        }
+        return self._correlation_matrix
+
+    @staticmethod
+    def _by_count(counts: Dict[Any, int]) -> Dict[Any, int]:
+        """按計數從大到小排列，與 value_counts 的順序一致"""
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為可 JSON 序列化的字典"""
+        return {
+            'target': self.target,
+            'rows': self.rows,
+            'numeric': {column: summary.to_dict() for column, summary in self.numeric.items()},
+            'categorical': self.categorical,
+            'target_counts': [[value, count] for value, count in self.target_counts.items()],
+            'correlation': self.correlation.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DatasetStats':
+        """從 to_dict 的結果恢復統計信息"""
+        stats = cls(data['target'])
+        stats.rows = data['rows']
+        stats.numeric = {column: NumericSummary.from_dict(item) for column, item in data['numeric'].items()}
+        stats.categorical = data['categorical']
+        stats.target_counts = {value: count for value, count in data['target_counts']}
+        stats.correlation = CorrelationAccumulator.from_dict(data['correlation'])
+        return stats
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame], target: str = 'response') -> 'DatasetStats':
+        """按塊單次掃描計算統計信息"""
+        stats = cls(target)
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
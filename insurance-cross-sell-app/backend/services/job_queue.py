@@ -0,0 +1,316 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from utils.columnar_io import count_rows, detect_format
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """
+    基於 SQLite 的批量預測任務存儲
+
+    任務狀態、進度和結果文件路徑都保存在一個 SQLite 文件中，同一主機上的多個 worker 進程共享同一個隊列，
+    不需要外部消息中間件。每次操作使用獨立的連接，領取任務在 IMMEDIATE 事務中完成，同一任務只會被一個線程領取。
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            input_path TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            threshold REAL,
+            total_rows INTEGER,
+            processed_rows INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            updated_at REAL,
+            finished_at REAL
+        )
+    """
+
+    def __init__(self, db_path: str):
+        """
+        初始化任務存儲
+
+        Args:
+            db_path: SQLite 數據庫文件路徑，不存在時自動創建
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(self._SCHEMA)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """創建新連接；等待其他進程釋放寫鎖最多 30 秒"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, job_id: str, input_path: str, output_path: str, threshold: float = None,
+               total_rows: int = None) -> Dict[str, Any]:
+        """
+        新建排隊中的任務
+
+        Args:
+            job_id: 任務 ID
+            input_path: 輸入 CSV 文件路徑
+            output_path: 結果 CSV 文件路徑
+            threshold: 決策閾值，為 None 時使用模型當前閾值
+            total_rows: 輸入的數據行數，用於計算進度
+
+        Returns:
+            任務信息
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, input_path, output_path, threshold, total_rows, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, self.QUEUED, input_path, output_path, threshold, total_rows, time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查詢任務
+
+        Args:
+            job_id: 任務 ID
+
+        Returns:
+            任務信息，不存在時返回 None
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        按創建時間倒序列出任務
+
+        Args:
+            limit: 最多返回的任務數
+
+        Returns:
+            任務信息列表
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, stale_timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        領取最早的排隊任務；運行中但超過 stale_timeout 秒沒有更新的任務（處理它的進程已退出）也會被重新領取
+
+        Args:
+            stale_timeout: 運行中任務的心跳超時秒數
+
+        Returns:
+            領取到的任務信息，沒有可領取的任務時返回 None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? OR (status = ? AND updated_at < ?) '
+                'ORDER BY created_at LIMIT 1',
+                (self.QUEUED, self.RUNNING, now - stale_timeout)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, processed_rows = 0, error = NULL, started_at = ?, updated_at = ? '
+                'WHERE id = ?',
+                (self.RUNNING, now, now, row['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return self.get(row['id'])
+
+    def set_total_rows(self, job_id: str, total_rows: int) -> None:
+        """記錄輸入的數據行數（由處理任務的後台線程統計），用於計算進度"""
+        with closing(self._connect()) as conn:
+            conn.execute('UPDATE jobs SET total_rows = ?, updated_at = ? WHERE id = ?',
+                         (total_rows, time.time(), job_id))
+
+    def update_progress(self, job_id: str, processed_rows: int) -> None:
+        """記錄已寫入結果文件的行數，同時作為心跳"""
+        with closing(self._connect()) as conn:
+            conn.execute('UPDATE jobs SET processed_rows = ?, updated_at = ? WHERE id = ?',
+                         (processed_rows, time.time(), job_id))
+
+    def finish(self, job_id: str, error: str = None) -> None:
+        """將任務標記為完成或失敗"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? WHERE id = ?',
+                         (self.FAILED if error else self.COMPLETED, error, now, now, job_id))
+
+
+class JobQueue:
+    """
+    批量預測任務隊列
+
+    提交任務只寫入一條記錄並立即返回任務 ID；後台線程從 SQLite 中領取任務，按塊評分並追加寫入結果文件，
+    每塊寫完後更新進度。請求延遲與批量大小無關，也不會觸發 gunicorn 的請求超時。
+    """
+
+    def __init__(self, store: JobStore, results_dir: str,
+                 predict_chunks: Callable[[str, Optional[float], int], Iterator[pd.DataFrame]],
+                 n_workers: int = 1, chunksize: int = 10000, poll_interval: float = 1.0,
+                 stale_timeout: float = 300.0):
+        """
+        初始化任務隊列
+
+        Args:
+            store: 任務存儲
+            results_dir: 輸入和結果文件目錄
+            predict_chunks: 按塊預測文件的函數，參數為 (文件路徑, 閾值, 每塊行數)，
+                例如 ModelService.iter_csv_predictions
+            n_workers: 每個進程中的後台線程數
+            chunksize: 每塊行數
+            poll_interval: 空閒時輪詢隊列的間隔秒數
+            stale_timeout: 運行中任務的心跳超時秒數，超時後由其他線程重新領取
+        """
+        self.store = store
+        self.results_dir = results_dir
+        self._predict_chunks = predict_chunks
+        self.n_workers = max(1, int(n_workers))
+        self.chunksize = max(1, int(chunksize))
+        self.poll_interval = float(poll_interval)
+        self.stale_timeout = float(stale_timeout)
+
+        os.makedirs(results_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pid = None
+
+    def ensure_started(self) -> None:
+        """按需啟動後台線程；fork 後子進程中沒有這些線程，檢測到進程號變化時重新創建"""
+        if self._threads and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wakeup = threading.Event()
+            self._threads = [
+                threading.Thread(target=self._run, daemon=True, name=f'batch-job-{i}')
+                for i in range(self.n_workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def submit_file(self, input_path: str, threshold: float = None) -> Dict[str, Any]:
+        """
+        提交文件的批量預測任務
+
+        只檢查文件格式並寫入任務記錄，行數由處理任務的後台線程統計，請求中不讀取文件內容
+
+        Args:
+            input_path: 輸入文件路徑（CSV、Parquet 或 Arrow IPC）
+            threshold: 決策閾值，為 None 時使用模型當前閾值
+
+        Returns:
+            任務信息
+        """
+        detect_format(input_path)
+        job_id = uuid.uuid4().hex
+        output_path = os.path.join(self.results_dir, f"{job_id}.csv")
+        job = self.store.create(job_id, input_path, output_path, threshold)
+
+        self.ensure_started()
+        self._wakeup.set()
+        return job
+
+    def submit_records(self, records: List[Dict[str, Any]], threshold: float = None) -> Dict[str, Any]:
+        """
+        提交JSON記錄的批量預測任務，記錄先寫入任務目錄下的CSV文件
+
+        Args:
+            records: 客戶數據列表
+            threshold: 決策閾值，為 None 時使用模型當前閾值
+
+        Returns:
+            任務信息
+        """
+        input_path = os.path.join(self.results_dir, f"{uuid.uuid4().hex}-input.csv")
+        pd.DataFrame(records).to_csv(input_path, index=False)
+        return self.submit_file(input_path, threshold)
+
+    def read_results(self, job: Dict[str, Any], offset: int = 0, limit: int = 1000) -> pd.DataFrame:
+        """
+        讀取已寫入結果文件的部分結果，任務運行中也可以讀取
+
+        Args:
+            job: 任務信息
+            offset: 起始行（不含表頭）
+            limit: 最多返回的行數
+
+        Returns:
+            結果數據框
+        """
+        available = job['processed_rows'] - offset
+        if available <= 0 or not os.path.exists(job['output_path']):
+            return pd.DataFrame()
+        return pd.read_csv(job['output_path'], skiprows=range(1, offset + 1), nrows=min(limit, available))
+
+    def _run(self) -> None:
+        """後台線程：領取並處理任務，隊列為空時等待喚醒或輪詢"""
+        while True:
+            try:
+                job = self.store.claim(self.stale_timeout)
+            except Exception as e:
+                logger.error(f"領取批量預測任務失敗: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._process(job)
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        """統計輸入行數後逐塊評分並追加寫入結果文件，每塊寫完後更新進度"""
+        job_id = job['id']
+        logger.info(f"開始處理批量預測任務 {job_id}")
+        processed = 0
+        try:
+            self.store.set_total_rows(job_id, count_rows(job['input_path']))
+            with open(job['output_path'], 'w', newline='') as f:
+                for i, result in enumerate(self._predict_chunks(job['input_path'], job['threshold'], self.chunksize)):
+                    result.to_csv(f, index=False, header=(i == 0))
+                    f.flush()
+                    processed += len(result)
+                    self.store.update_progress(job_id, processed)
+            self.store.finish(job_id)
+            logger.info(f"批量預測任務 {job_id} 完成，共 {processed} 行")
+        except Exception as e:
+            logger.error(f"批量預測任務 {job_id} 失敗: {str(e)}")
+            self.store.finish(job_id, error=str(e))
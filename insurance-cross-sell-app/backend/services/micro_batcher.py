@@ -0,0 +1,143 @@
+import os
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    單筆預測請求的微批合併器
+
+    並發的單筆預測各自把特徵行放入隊列後等待；專用的後台線程收集一個時間窗口內
+    （或達到最大行數前）到達的請求，拼成一個矩陣只調用一次模型，再把每一行的結果交還給對應的調用方。
+    每次模型調用的固定開銷由整批請求分攤，單個請求最多多等待一個窗口的時間；
+    取出第一個請求時隊列中沒有其他請求（沒有並發）則立即評分，不等待窗口。
+
+    合併只在同一進程內有並發請求時生效，例如 gunicorn 的 gthread worker（threads > 1）。
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], window_ms: float = 2.0,
+                 max_batch_size: int = 64, name: str = 'micro-batcher'):
+        """
+        初始化合併器
+
+        Args:
+            predict_fn: 對特徵矩陣評分的函數，返回每行的正類概率；每批調用時才解析，模型替換後自動生效
+            window_ms: 收到第一個請求後最多等待多少毫秒收集同批請求，小於等於 0 時不合併
+            max_batch_size: 每批最多的行數，達到後立即評分
+            name: 後台線程名稱
+        """
+        self._predict_fn = predict_fn
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否啟用合併"""
+        return self.window > 0 and self.max_batch_size > 1
+
+    def _ensure_started(self) -> None:
+        """按需啟動後台線程；fork 後子進程中沒有該線程，檢測到進程號變化時重新創建"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), daemon=True, name=self.name)
+            self._thread.start()
+
+    def predict_one(self, row: np.ndarray) -> float:
+        """
+        對單筆特徵行評分，與同一窗口內的其他請求合併為一次模型調用
+
+        Args:
+            row: 一維特徵行，列順序與 predict_fn 的輸入一致
+
+        Returns:
+            正類概率
+
+        Raises:
+            Exception: predict_fn 拋出的異常原樣傳給該批的所有調用方
+        """
+        if not self.enabled:
+            return float(self._predict_fn(row.reshape(1, -1))[0])
+
+        self._ensure_started()
+        future = Future()
+        self._queue.put((row, future))
+        return future.result()
+
+    def _collect(self, work_queue: queue.Queue) -> List[Tuple[np.ndarray, Future]]:
+        """阻塞等待第一個請求；隊列中還有其他請求時在窗口內繼續收集，直到窗口結束或達到最大行數"""
+        batch = [work_queue.get()]
+
+        # 沒有其他請求排隊時立即評分，無並發的請求不承擔窗口延遲
+        try:
+            batch.append(work_queue.get_nowait())
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(work_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, work_queue: queue.Queue) -> None:
+        """後台線程：逐批收集、評分並分發結果"""
+        while True:
+            batch = self._collect(work_queue)
+            try:
+                probabilities = self._predict_fn(np.stack([row for row, _ in batch]))
+            except Exception as e:
+                logger.warning(f"微批評分失敗（{len(batch)} 行）: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), probability in zip(batch, probabilities):
+                future.set_result(float(probability))
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回合併統計信息"""
+        with self._stats_lock:
+            requests, batches, max_batch_seen = self.requests, self.batches, self.max_batch_seen
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_batch_size': self.max_batch_size,
+            'requests': requests,
+            'batches': batches,
+            'avg_batch_size': requests / batches if batches else 0.0,
+            'max_batch_seen': max_batch_seen
+        }
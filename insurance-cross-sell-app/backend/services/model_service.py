@@ -1,8 +1,10 @@
 import os
+import shutil
+import threading
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Tuple, Optional, Union
+from typing import Dict, Any, List, Tuple, Optional, Union, Iterator
 import logging
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.metrics import (
@@ -11,6 +13,16 @@ from sklearn.metrics import (
 )
 import xgboost as xgb
 from .data_service import DataService
+from .array_predictor import ArrayPredictor
+from .micro_batcher import MicroBatcher
+from .parallel_scoring import ParallelScorer
+from .tree_ensemble import TreeEnsemble, native_model_path, is_native_model_current
+from utils.feature_encoder import FeatureEncoder
+from utils.columnar_io import read_frame, iter_frames
+from utils.feature_engineering import premium_log
+from config.settings import PREDICTION_BATCH_WINDOW_MS, PREDICTION_BATCH_MAX_SIZE
+from config.settings import BATCH_PARALLEL_WORKERS, BATCH_PARALLEL_MIN_ROWS, BATCH_PARALLEL_SHARD_SIZE
+from config.settings import GENDER_MAP, VEHICLE_AGE_MAP, VEHICLE_DAMAGE_MAP
 
 # 設置日誌
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -43,6 +55,18 @@ class ModelService:
         'annual_premium_log'  # 自定義特徵
     ]
 
+    # 批量預測時每次送入模型的最大行數
+    BATCH_CHUNK_SIZE = 50000
+
+    # 流式CSV預測時每次讀取的行數
+    STREAM_CHUNK_SIZE = 10000
+
+    # 流式預測支持的輸出格式及其MIME類型
+    STREAM_FORMATS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv'
+    }
+
     def __init__(self, model_dir: str = None, model_type: str = 'xgboost'):
         """
         初始化模型服務
@@ -67,11 +91,33 @@ class ModelService:
         # 初始化數據服務
         self.data_service = DataService()
 
-        # 初始化模型
+        # 初始化模型；self.model 為 sklearn / xgboost 估計器，用於參數讀取和臨時參數預測，
+        # _scoring_model 為實際評分的模型（可用時為原生樹集成，否則與 self.model 相同）
         self.model = None
+        self._scoring_model = None
         self.feature_names = self.DEFAULT_FEATURES
         self.threshold = 0.5  # 默認決策閾值
 
+        # 單筆預測的低延遲路徑和特徵重要性緩存，在模型加載或訓練後構建
+        self._encoder = None
+        self._array_predictor = None
+        self._feature_importance = None
+
+        # 並發的單筆預測合併為一次模型調用，每批評分時才讀取當前的預測器
+        self._batcher = MicroBatcher(
+            lambda X: self._array_predictor.predict_proba(X),
+            window_ms=PREDICTION_BATCH_WINDOW_MS,
+            max_batch_size=PREDICTION_BATCH_MAX_SIZE,
+            name='model-batcher'
+        )
+
+        # 大批量評分的進程池，第一次並行評分時創建，模型變化後釋放
+        self._parallel_scorer = None
+
+        # 加載時模型和配置文件的 os.stat 簽名，其他 worker 重新訓練或更新閾值後據此重新加載
+        self._loaded_signature = None
+        self._reload_lock = threading.Lock()
+
         # 嘗試加載現有模型
         self._try_load_model()
 
@@ -79,15 +125,31 @@ class ModelService:
         """
         嘗試加載現有模型
         
+        joblib 估計器始終加載為 self.model，供 get_param 和臨時參數預測使用；
+        save_model 生成的原生樹集成目錄可用時只用於評分：節點數組以只讀內存映射方式打開，
+        加載只需讀取元數據，多個進程共享操作系統的頁緩存；目錄不存在或已過期時直接用估計器評分
+        
         Returns:
             是否成功加載
         """
         model_path = os.path.join(self.model_dir, f"{self.model_type}_model.pkl")
 
-        if os.path.exists(model_path):
+        # 簽名在加載之前讀取：加載期間文件再次變化時，下一次檢查會再重新加載
+        self._loaded_signature = self._artifact_signature()
+
+        if os.path.exists(model_path) or is_native_model_current(model_path):
             try:
-                # 加載模型
-                self.model = joblib.load(model_path)
+                # 加載估計器，其中的 NumPy 數組同樣以只讀內存映射方式加載
+                self.model = joblib.load(model_path, mmap_mode='r') if os.path.exists(model_path) else None
+                self._scoring_model = self.model
+                if is_native_model_current(model_path):
+                    try:
+                        self._scoring_model = TreeEnsemble.load(native_model_path(model_path), mmap_mode='r')
+                    except Exception as e:
+                        logger.warning(f"加載原生樹集成失敗，使用 joblib 模型評分: {str(e)}")
+                # 只有原生樹集成目錄時無法讀取參數，評分不受影響
+                if self.model is None:
+                    self.model = self._scoring_model
 
                 # 加載模型配置
                 config_path = os.path.join(self.model_dir, f"{self.model_type}_config.pkl")
@@ -96,6 +158,7 @@ class ModelService:
                     self.feature_names = config.get('feature_names', self.DEFAULT_FEATURES)
                     self.threshold = config.get('threshold', 0.5)
 
+                self._prepare_serving_state()
                 logger.info(f"成功加載現有模型: {model_path}")
                 return True
             except Exception as e:
@@ -104,6 +167,65 @@ class ModelService:
         logger.info("未找到現有模型或加載失敗")
         return False
 
+    def _artifact_signature(self) -> Tuple:
+        """
+        返回模型文件、原生樹集成元數據和配置文件的 (inode, 大小, 修改時間)，只做 os.stat
+        
+        Returns:
+            文件簽名，文件不存在時對應位置為 None
+        """
+        model_path = os.path.join(self.model_dir, f"{self.model_type}_model.pkl")
+        config_path = os.path.join(self.model_dir, f"{self.model_type}_config.pkl")
+        signature = []
+        for path in (model_path, os.path.join(native_model_path(model_path), 'meta.json'), config_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload_if_changed(self) -> bool:
+        """
+        模型或配置文件在加載後被修改（例如其他 worker 重新訓練或更新了閾值）時重新加載
+        
+        未變化時只做幾次 os.stat，可以在每個請求前調用
+        
+        Returns:
+            是否重新加載了模型
+        """
+        if self._artifact_signature() == self._loaded_signature:
+            return False
+
+        with self._reload_lock:
+            if self._artifact_signature() == self._loaded_signature:
+                return False
+            logger.info("模型文件已更新，重新加載模型")
+            return self._try_load_model()
+
+    def _prepare_serving_state(self) -> None:
+        """
+        模型加載或訓練後，構建單筆預測所需的狀態
+        
+        特徵名校驗只在這裡執行一次，之後單筆預測直接把固定順序的 float32 數組送入 booster
+        """
+        self._feature_importance = None
+        if self._parallel_scorer is not None:
+            self._parallel_scorer.close()
+            self._parallel_scorer = None
+        try:
+            # ModelService 的模型按 config.settings 中的映射編碼訓練（與 _prepare_features 一致）
+            self._encoder = FeatureEncoder(
+                features=self.feature_names,
+                derived_features=[],
+                category_maps={'gender': GENDER_MAP, 'vehicle_age': VEHICLE_AGE_MAP, 'vehicle_damage': VEHICLE_DAMAGE_MAP}
+            )
+            self._array_predictor = ArrayPredictor(self._scoring_model, self.feature_names)
+        except ValueError as e:
+            logger.warning(f"無法構建低延遲預測路徑，將使用數據框預測: {str(e)}")
+            self._encoder = None
+            self._array_predictor = None
+
     def _create_model(self) -> Any:
         """
         創建模型實例
@@ -153,6 +275,24 @@ class ModelService:
         else:
             raise ValueError(f"不支持的模型類型: {self.model_type}")
 
+    @staticmethod
+    def _encode_column(series: pd.Series, mapping: Dict[str, int], default: int) -> np.ndarray:
+        """
+        將分類列按映射編碼為整數，未知值和缺失值使用默認編碼
+        
+        類別型列（例如列式文件讀入的字符串列）只需對每個類別查找一次，再按類別碼取值
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            lookup = np.array([mapping.get(value, default) for value in series.cat.categories] + [default],
+                              dtype=np.int64)
+            return lookup[series.cat.codes.to_numpy()]
+        return series.map(mapping).fillna(default).to_numpy(dtype=np.int64)
+
+    def input_columns(self) -> List[str]:
+        """返回預測所需的原始輸入列（標準化名稱），派生特徵由 annual_premium 計算，id 用於回填結果"""
+        columns = [feature for feature in self.feature_names if feature != 'annual_premium_log']
+        return columns + [name for name in ('annual_premium', 'id') if name not in columns]
+
     def _prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         預處理特徵，將輸入數據轉換為模型可接受的格式
@@ -174,17 +314,15 @@ class ModelService:
             if feature not in processed_df.columns:
                 # 特殊處理annual_premium_log字段
                 if feature == 'annual_premium_log' and 'annual_premium' in processed_df.columns:
-                    # 如果annual_premium存在，則計算其自然對數
+                    # 如果annual_premium存在，則按訓練數據的定義計算 log(1 + 保費)
                     logger.info(f"從annual_premium計算{feature}字段")
-                    processed_df[feature] = processed_df['annual_premium'].apply(
-                        lambda x: np.log(x) if x > 0 else 0
-                    )
+                    processed_df[feature] = premium_log(processed_df['annual_premium'])
                 else:
                     # 對於其他缺失列，添加全為0的列
                     logger.warning(f"特徵 {feature} 在數據中不存在，已添加全為0的列")
                     processed_df[feature] = 0
 
-        # 確保分類特徵正確編碼
+        # 確保分類特徵正確編碼（輸入可能是類別型列，映射後統一轉為整數）
         if 'vehicle_age' in processed_df.columns:
             # 車齡編碼
             vehicle_age_map = {
@@ -192,8 +330,8 @@ class ModelService:
                 '1-2 Year': 1,
                 '> 2 Years': 2
             }
-            processed_df['vehicle_age'] = processed_df['vehicle_age'].map(
-                lambda x: vehicle_age_map.get(x, 1)  # 默認為中間值
+            processed_df['vehicle_age'] = self._encode_column(
+                processed_df['vehicle_age'], vehicle_age_map, 1  # 默認為中間值
             )
 
         if 'vehicle_damage' in processed_df.columns:
@@ -202,8 +340,8 @@ class ModelService:
                 'Yes': 1,
                 'No': 0
             }
-            processed_df['vehicle_damage'] = processed_df['vehicle_damage'].map(
-                lambda x: damage_map.get(x, 0)  # 默認為否
+            processed_df['vehicle_damage'] = self._encode_column(
+                processed_df['vehicle_damage'], damage_map, 0  # 默認為否
             )
 
         if 'gender' in processed_df.columns:
@@ -212,8 +350,8 @@ class ModelService:
                 'Male': 0,
                 'Female': 1
             }
-            processed_df['gender'] = processed_df['gender'].map(
-                lambda x: gender_map.get(x, 0)  # 默認為男性
+            processed_df['gender'] = self._encode_column(
+                processed_df['gender'], gender_map, 0  # 默認為男性
             )
 
         # 選擇所需的特徵列，按照模型訓練時的順序
@@ -251,6 +389,8 @@ class ModelService:
         # 訓練模型
         logger.info(f"開始訓練 {self.MODEL_TYPES[self.model_type]} 模型...")
         self.model.fit(X_train, y_train)
+        self._scoring_model = self.model
+        self._prepare_serving_state()
 
         # 評估模型
         val_metrics = self.evaluate(X_val, y_val)
@@ -283,6 +423,27 @@ class ModelService:
         if self.model is None:
             raise ValueError("模型尚未加載，請先訓練或加載模型")
 
+        # 決定閾值
+        if threshold is None:
+            # 優先使用model_params中的threshold
+            if model_params and 'threshold' in model_params:
+                threshold = float(model_params['threshold'])
+            else:
+                threshold = self.threshold
+
+        # 低延遲路徑：單筆字典數據且不需要臨時模型參數時，跳過數據框構建
+        uses_temp_params = bool(model_params) and any(key != 'threshold' for key in model_params)
+        if isinstance(data, dict) and self._array_predictor is not None and not uses_temp_params:
+            try:
+                probability = self._batcher.predict_one(self._encoder.encode_row(data))
+                return {
+                    "probability": probability,
+                    "prediction": int(probability >= threshold),
+                    "features_importance": self.get_feature_importance()
+                }
+            except Exception as e:
+                logger.warning(f"低延遲預測失敗，改用數據框預測: {str(e)}")
+
         # 將數據轉換為數據框
         if isinstance(data, dict):
             df = pd.DataFrame([data])
@@ -325,13 +486,7 @@ class ModelService:
                     pred_proba = self.model.predict_proba(X)[:, 1]
             else:
                 # 使用原始模型
-                # 確保模型有predict_proba方法
-                if hasattr(self.model, 'predict_proba'):
-                    pred_proba = self.model.predict_proba(X)[:, 1]
-                else:
-                    # 如果模型沒有predict_proba方法，則使用predict
-                    logger.warning("模型沒有predict_proba方法，使用predict")
-                    pred_proba = self.model.predict(X)
+                pred_proba = self._predict_proba_matrix(X)
         except Exception as e:
             logger.error(f"預測過程中出錯: {str(e)}")
             # 返回詳細錯誤信息
@@ -342,14 +497,6 @@ class ModelService:
                 "features_importance": self.get_feature_importance()
             }
 
-        # 決定閾值
-        if threshold is None:
-            # 優先使用model_params中的threshold
-            if model_params and 'threshold' in model_params:
-                threshold = float(model_params['threshold'])
-            else:
-                threshold = self.threshold
-
         # 二分類預測結果
         pred_class = (pred_proba >= threshold).astype(int)
 
@@ -365,6 +512,20 @@ class ModelService:
 
         return result
 
+    def warm_up(self, samples: List[Dict[str, Any]]) -> None:
+        """
+        用合成數據分別走一遍單筆和批量預測路徑，提前完成模型內部的初始化
+        
+        Args:
+            samples: 合成客戶數據列表
+        """
+        if self.model is None:
+            raise ValueError("模型未訓練或加載失敗")
+
+        for sample in samples:
+            self.predict(sample)
+        self.batch_predict(pd.DataFrame(samples))
+
     def get_param(self, param_name: str, default_value: Any = None) -> Any:
         """
         獲取模型參數值
@@ -385,25 +546,212 @@ class ModelService:
         except:
             return default_value
 
-    def batch_predict(self, data: pd.DataFrame, threshold: float = None) -> List[Dict[str, Any]]:
+    def _predict_proba_matrix(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        對特徵矩陣進行一次模型調用，返回正類概率
+        
+        Args:
+            X: 已準備好的特徵數據框
+            
+        Returns:
+            正類概率數組
+        """
+        if hasattr(self._scoring_model, 'predict_proba'):
+            return self._scoring_model.predict_proba(X)[:, 1]
+        return self._scoring_model.predict(X)
+
+    def _get_parallel_scorer(self) -> Optional[ParallelScorer]:
+        """
+        返回多進程評分器；模型尚未保存到磁盤（工作進程無法加載）時返回 None
+        """
+        if self._parallel_scorer is None:
+            model_path = os.path.join(self.model_dir, f"{self.model_type}_model.pkl")
+            if not (os.path.exists(model_path) or is_native_model_current(model_path)):
+                return None
+            self._parallel_scorer = ParallelScorer(
+                model_path,
+                self.feature_names,
+                n_workers=BATCH_PARALLEL_WORKERS,
+                shard_size=BATCH_PARALLEL_SHARD_SIZE
+            )
+        return self._parallel_scorer
+
+    def batch_predict(self, data: pd.DataFrame, threshold: float = None,
+                      chunk_size: int = None, parallel: bool = None) -> Dict[str, Any]:
         """
         批量預測
         
+        特徵只在整個數據框上準備一次，之後按塊調用 predict_proba，
+        每塊只有一次模型調用，避免逐行預測的開銷。
+        並行模式下特徵矩陣經內存映射文件分片交給進程池，每個工作進程只加載一次模型
+        
+        Args:
+            data: 批量客戶數據
+            threshold: 決策閾值，如果為None則使用默認閾值
+            chunk_size: 每次送入模型的行數，如果為None則使用 BATCH_CHUNK_SIZE
+            parallel: 是否使用多進程評分，如果為None則在行數達到 BATCH_PARALLEL_MIN_ROWS 時自動啟用
+            
+        Returns:
+            列式預測結果，包含 probabilities、predictions、threshold 和 total_count
+        """
+        if self.model is None:
+            raise ValueError("模型未訓練或加載失敗")
+
+        if threshold is None:
+            threshold = self.threshold
+
+        probabilities = self._score_frame(data, chunk_size, parallel)
+        predictions = (probabilities >= threshold).astype(np.int8)
+
+        return {
+            "probabilities": probabilities.tolist(),
+            "predictions": predictions.tolist(),
+            "threshold": float(threshold),
+            "total_count": len(probabilities)
+        }
+
+    def batch_predict_frame(self, data: pd.DataFrame, threshold: float = None,
+                            parallel: bool = None) -> pd.DataFrame:
+        """
+        批量預測，以列式數據框返回結果（用於 Parquet / Arrow 輸出，不經過 Python 列表）
+        
         Args:
             data: 批量客戶數據
             threshold: 決策閾值，如果為None則使用默認閾值
+            parallel: 是否使用多進程評分，如果為None則按行數自動決定
             
         Returns:
-            預測結果列表
+            包含 row、id（如果存在）、probability 和 prediction 的數據框
         """
         if self.model is None:
             raise ValueError("模型未訓練或加載失敗")
 
-        # 調用單一預測
-        result = self.predict(data, threshold)
+        if threshold is None:
+            threshold = self.threshold
+
+        probabilities = self._score_frame(data, None, parallel)
+        result = pd.DataFrame({
+            'row': np.arange(len(probabilities)),
+            'probability': probabilities,
+            'prediction': (probabilities >= threshold).astype(np.int8)
+        })
+        if 'id' in data.columns:
+            result.insert(1, 'id', data['id'].to_numpy())
+        return result
 
-        # 返回結果列表
-        return result["results"]
+    def _score_frame(self, data: pd.DataFrame, chunk_size: int = None, parallel: bool = None) -> np.ndarray:
+        """
+        對整個數據框評分，返回正類概率
+        
+        Args:
+            data: 批量客戶數據
+            chunk_size: 每次送入模型的行數，如果為None則使用 BATCH_CHUNK_SIZE
+            parallel: 是否使用多進程評分，如果為None則在行數達到 BATCH_PARALLEL_MIN_ROWS 時自動啟用
+            
+        Returns:
+            正類概率數組
+        """
+        chunk_size = chunk_size or self.BATCH_CHUNK_SIZE
+
+        # 一次性準備所有特徵
+        X = self._prepare_features(data)
+        n_rows = len(X)
+
+        if parallel is None:
+            parallel = BATCH_PARALLEL_WORKERS > 1 and n_rows >= BATCH_PARALLEL_MIN_ROWS
+        scorer = self._get_parallel_scorer() if parallel else None
+
+        if scorer is not None:
+            probabilities = scorer.predict_proba(X.to_numpy())
+            logger.info(f"並行批量預測完成，共 {n_rows} 行，{scorer.n_workers} 個進程")
+        else:
+            # 預先分配結果數組，按塊填充
+            probabilities = np.empty(n_rows, dtype=np.float64)
+            for start in range(0, n_rows, chunk_size):
+                end = min(start + chunk_size, n_rows)
+                probabilities[start:end] = self._predict_proba_matrix(X.iloc[start:end])
+            logger.info(f"批量預測完成，共 {n_rows} 行，分 {(n_rows + chunk_size - 1) // chunk_size} 塊")
+
+        return probabilities
+
+    def read_batch_file(self, file_path: str) -> pd.DataFrame:
+        """
+        讀取批量預測的輸入文件（CSV、Parquet 或 Arrow IPC），列式格式只讀取預測所需的列
+        
+        Args:
+            file_path: 文件路徑
+            
+        Returns:
+            列名已標準化的數據框
+        """
+        return read_frame(file_path, columns=self.input_columns())
+
+    def iter_csv_predictions(self, file_path: str, threshold: float = None,
+                             chunksize: int = None) -> Iterator[pd.DataFrame]:
+        """
+        按塊讀取CSV、Parquet 或 Arrow IPC 文件並逐塊預測
+        
+        每次只在內存中保留一個塊，峰值內存與文件大小無關；只讀取預測所需的列
+        
+        Args:
+            file_path: 輸入文件路徑
+            threshold: 決策閾值，如果為None則使用默認閾值
+            chunksize: 每塊讀取的行數，如果為None則使用 STREAM_CHUNK_SIZE
+            
+        Yields:
+            每塊的預測結果數據框，包含 row、id（如果存在）、probability 和 prediction
+        """
+        if self.model is None:
+            raise ValueError("模型未訓練或加載失敗")
+
+        if threshold is None:
+            threshold = self.threshold
+        chunksize = chunksize or self.STREAM_CHUNK_SIZE
+
+        # 特徵名稱在讀取時已標準化，與訓練數據一致
+        for chunk in iter_frames(file_path, chunksize, columns=self.input_columns()):
+            X = self._prepare_features(chunk)
+            probabilities = self._predict_proba_matrix(X)
+
+            result = pd.DataFrame({
+                'row': chunk.index.to_numpy(),
+                'probability': probabilities,
+                'prediction': (probabilities >= threshold).astype(np.int8)
+            })
+            if 'id' in chunk.columns:
+                result.insert(1, 'id', chunk['id'].to_numpy())
+
+            yield result
+
+    def stream_predict_csv(self, file_path: str, output_format: str = 'ndjson', threshold: float = None,
+                           chunksize: int = None) -> Iterator[str]:
+        """
+        流式預測，逐塊輸出序列化後的結果
+        
+        Args:
+            file_path: 輸入文件路徑（CSV、Parquet 或 Arrow IPC）
+            output_format: 輸出格式，可選值為 'ndjson', 'csv'
+            threshold: 決策閾值，如果為None則使用默認閾值
+            chunksize: 每塊讀取的行數
+            
+        Yields:
+            序列化後的結果文本片段
+        """
+        if output_format not in self.STREAM_FORMATS:
+            raise ValueError(f"不支持的輸出格式: {output_format}，可選值為: {list(self.STREAM_FORMATS.keys())}")
+
+        total_rows = 0
+        for i, result in enumerate(self.iter_csv_predictions(file_path, threshold, chunksize)):
+            total_rows += len(result)
+            if output_format == 'csv':
+                # 只在第一塊輸出表頭
+                yield result.to_csv(index=False, header=(i == 0))
+            else:
+                # 不同pandas版本對結尾換行的處理不同，統一補齊
+                lines = result.to_json(orient='records', lines=True)
+                yield lines if lines.endswith('\n') else lines + '\n'
+
+        logger.info(f"流式預測完成，共 {total_rows} 行")
 
     def evaluate(self, X: pd.DataFrame = None, y: pd.Series = None) -> Dict[str, float]:
         """
@@ -426,10 +774,7 @@ class ModelService:
             y = val_df['response']
 
         # 獲取預測概率
-        if hasattr(self.model, 'predict_proba'):
-            y_proba = self.model.predict_proba(X)[:, 1]
-        else:
-            y_proba = self.model.predict(X)
+        y_proba = self._predict_proba_matrix(X)
 
         # 根據閾值進行分類
         y_pred = (y_proba >= self.threshold).astype(int)
@@ -460,8 +805,21 @@ class ModelService:
         # 保存模型
         model_path = os.path.join(self.model_dir, f"{self.model_type}_model.pkl")
         joblib.dump(self.model, model_path)
+        self._save_native_model(model_path)
 
         # 保存模型配置
+        self.save_config()
+
+        logger.info(f"模型已保存到: {model_path}")
+        return model_path
+
+    def save_config(self) -> str:
+        """
+        保存模型配置（特徵名和閾值），其他 worker 通過文件簽名發現變化後重新加載
+        
+        Returns:
+            配置文件路徑
+        """
         config_path = os.path.join(self.model_dir, f"{self.model_type}_config.pkl")
         config = {
             'feature_names': self.feature_names,
@@ -470,8 +828,44 @@ class ModelService:
         }
         joblib.dump(config, config_path)
 
-        logger.info(f"模型已保存到: {model_path}")
-        return model_path
+        # 當前進程的狀態已是最新，不需要因自己寫入的文件重新加載
+        self._loaded_signature = self._artifact_signature()
+        return config_path
+
+    def set_threshold(self, threshold: float) -> float:
+        """
+        設置並保存決策閾值
+        
+        Args:
+            threshold: 決策閾值
+            
+        Returns:
+            設置後的閾值
+        """
+        self.threshold = float(threshold)
+        self.save_config()
+        return self.threshold
+
+    def _save_native_model(self, model_path: str) -> Optional[str]:
+        """
+        將模型轉換為可內存映射加載的原生樹集成目錄
+        
+        不支持轉換的模型（如隨機森林）只保留 joblib 文件，並刪除同名的舊目錄，避免加載到過期的模型
+        
+        Args:
+            model_path: joblib 模型文件路徑
+            
+        Returns:
+            原生樹集成目錄路徑，不支持轉換時返回 None
+        """
+        native_path = native_model_path(model_path)
+        try:
+            return TreeEnsemble.from_model(self.model).save(native_path)
+        except ValueError as e:
+            logger.info(f"模型不支持轉換為原生樹集成，僅保存 joblib 文件: {str(e)}")
+            if os.path.isdir(native_path):
+                shutil.rmtree(native_path)
+            return None
 
     def get_feature_importance(self) -> Dict[str, float]:
         """
@@ -483,7 +877,18 @@ class ModelService:
         if self.model is None:
             raise ValueError("模型未訓練或加載失敗")
 
-        # 獲取特徵重要性
+        # 特徵重要性只與模型有關，計算一次後緩存
+        if self._feature_importance is None:
+            self._feature_importance = self._compute_feature_importance()
+        return dict(self._feature_importance)
+
+    def _compute_feature_importance(self) -> Dict[str, float]:
+        """
+        從模型中計算特徵重要性
+        
+        Returns:
+            特徵重要性字典
+        """
         if hasattr(self.model, 'feature_importances_'):
             importances = self.model.feature_importances_
         elif self.model_type == 'xgboost':
@@ -529,10 +934,7 @@ class ModelService:
         y_val = val_df['response']
 
         # 獲取預測概率
-        if hasattr(self.model, 'predict_proba'):
-            y_proba = self.model.predict_proba(X_val)[:, 1]
-        else:
-            y_proba = self.model.predict(X_val)
+        y_proba = self._predict_proba_matrix(X_val)
 
         # 測試不同閾值
         thresholds = np.arange(0.05, 0.95, 0.05)
@@ -561,13 +963,7 @@ class ModelService:
         self.threshold = best_threshold
 
         # 保存更新後的配置
-        config_path = os.path.join(self.model_dir, f"{self.model_type}_config.pkl")
-        config = {
-            'feature_names': self.feature_names,
-            'threshold': self.threshold,
-            'model_type': self.model_type
-        }
-        joblib.dump(config, config_path)
+        self.save_config()
 
         logger.info(f"已找到最佳閾值: {self.threshold:.2f}，{metric}指標: {best_score:.4f}")
 
@@ -0,0 +1,148 @@
+import os
+import uuid
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from .array_predictor import ArrayPredictor
+from .tree_ensemble import load_model
+
+logger = logging.getLogger(__name__)
+
+# 工作進程中的預測器，由初始化函數在進程啟動時加載一次
+_worker_predictor = None
+
+
+def _default_shared_dir() -> str:
+    """返回存放共享數組的目錄：優先使用內存文件系統 /dev/shm"""
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def _limit_model_threads(model) -> None:
+    """將模型自身的線程數限制為 1，避免多個工作進程同時開滿所有核心"""
+    if hasattr(model, 'get_booster'):
+        try:
+            model.get_booster().set_param({'nthread': 1})
+        except Exception:
+            pass
+    if hasattr(model, 'set_params'):
+        try:
+            model.set_params(n_jobs=1)
+        except Exception:
+            pass
+
+
+def _init_worker(model_path: str, feature_names: List[str]) -> None:
+    """
+    工作進程初始化：加載一次模型並構建預測器
+
+    原生樹集成目錄以只讀內存映射方式打開，所有工作進程共享操作系統的頁緩存
+    """
+    global _worker_predictor
+    model = load_model(model_path, mmap_mode='r')
+    _limit_model_threads(model)
+    _worker_predictor = ArrayPredictor(model, feature_names)
+    logger.info(f"評分進程 {os.getpid()} 已加載模型: {model_path}")
+
+
+def _score_shard(input_path: str, output_path: str, start: int, end: int) -> int:
+    """
+    對共享特徵矩陣的一段行評分，結果直接寫入共享輸出數組的對應位置
+
+    任務參數只有文件路徑和行範圍，數據本身不經過 pickle
+
+    Returns:
+        處理的行數
+    """
+    X = np.load(input_path, mmap_mode='r')
+    out = np.load(output_path, mmap_mode='r+')
+    out[start:end] = _worker_predictor.predict_proba(X[start:end])
+    return end - start
+
+
+class ParallelScorer:
+    """
+    多進程批量評分器
+
+    特徵矩陣寫入內存映射文件後，按行切分為多個分片交給進程池；每個工作進程在初始化時加載一次模型，
+    只通過文件路徑和行範圍接收任務，結果寫回共享的輸出數組，天然保持輸入順序。
+    進程池在第一次使用時創建並保持復用，模型變化後調用 close 釋放。
+    """
+
+    def __init__(self, model_path: str, feature_names: List[str], n_workers: int = None,
+                 shard_size: int = 100000, shared_dir: str = None):
+        """
+        初始化評分器
+
+        Args:
+            model_path: 模型文件路徑（存在最新的原生樹集成目錄時優先加載該目錄）
+            feature_names: 特徵矩陣的列順序
+            n_workers: 工作進程數，為 None 時使用 CPU 核心數
+            shard_size: 每個任務的行數
+            shared_dir: 存放共享數組的目錄，為 None 時優先使用 /dev/shm
+        """
+        self.model_path = model_path
+        self.feature_names = list(feature_names)
+        self.n_workers = max(1, int(n_workers or os.cpu_count() or 1))
+        self.shard_size = max(1, int(shard_size))
+        self.shared_dir = shared_dir or _default_shared_dir()
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """按需創建進程池；使用 spawn 啟動，避免複製父進程中的後台線程和鎖"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.feature_names)
+            )
+        return self._pool
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        並行計算正類概率
+
+        Args:
+            X: 形狀為 (行數, 特徵數) 的特徵矩陣，列順序與 feature_names 一致
+
+        Returns:
+            正類概率數組，順序與輸入一致
+        """
+        n_rows = len(X)
+        token = uuid.uuid4().hex
+        input_path = os.path.join(self.shared_dir, f"scoring-{token}-input.npy")
+        output_path = os.path.join(self.shared_dir, f"scoring-{token}-output.npy")
+
+        try:
+            shared_X = np.lib.format.open_memmap(input_path, mode='w+', dtype=X.dtype, shape=X.shape)
+            shared_X[:] = X
+            shared_X.flush()
+            del shared_X
+
+            shared_out = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float64, shape=(n_rows,))
+            del shared_out
+
+            pool = self._get_pool()
+            futures = [
+                pool.submit(_score_shard, input_path, output_path, start, min(start + self.shard_size, n_rows))
+                for start in range(0, n_rows, self.shard_size)
+            ]
+            for future in futures:
+                future.result()
+
+            return np.array(np.load(output_path, mmap_mode='r'))
+        finally:
+            for path in (input_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self) -> None:
+        """關閉進程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
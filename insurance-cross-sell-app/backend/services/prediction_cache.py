@@ -0,0 +1,117 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# 未命中時返回的哨兵值，緩存的值本身可以是 None
+_MISSING = object()
+
+
+class PredictionCache:
+    """
+    進程內的預測結果緩存
+
+    按 LRU 順序淘汰，並為每個條目設置存活時間（TTL）。鍵通常是編碼後特徵向量的字節串，
+    同一客戶畫像的重複評分直接在進程內返回，不需要經過 Redis。線程安全。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        """
+        初始化緩存
+
+        Args:
+            maxsize: 最大條目數，超出時淘汰最久未使用的條目；小於等於 0 時禁用緩存
+            ttl: 條目存活秒數，小於等於 0 表示不過期
+        """
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """緩存是否啟用"""
+        return self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        獲取緩存值，命中時將條目移到最近使用的位置
+
+        Args:
+            key: 緩存鍵
+            default: 未命中或已過期時的返回值
+
+        Returns:
+            緩存值或 default
+        """
+        if not self.enabled:
+            return default
+
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        寫入緩存值，超出容量時淘汰最久未使用的條目
+
+        Args:
+            key: 緩存鍵
+            value: 緩存值
+        """
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清空緩存（模型或閾值變化時調用），計數器保留"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        返回緩存統計信息
+
+        Returns:
+            dict: 容量、條目數、命中/未命中次數、命中率、淘汰和過期次數
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -3,123 +3,336 @@ import numpy as np
 import joblib
 import os
 import json
-import pickle
-import redis
-import hashlib
+import threading
 from sklearn.preprocessing import LabelEncoder
 import time
 
 from config.settings import MODEL_PATH, THRESHOLD, REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, REDIS_TTL, REDIS_ENABLED
+from config.settings import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, SERVING_STATE_PATH
+from config.settings import CACHE_WRITE_QUEUE_SIZE, CACHE_WRITE_BATCH_SIZE, CACHE_WRITE_FLUSH_INTERVAL
+from config.settings import PREDICTION_BATCH_WINDOW_MS, PREDICTION_BATCH_MAX_SIZE
+from config.settings import (REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT, REDIS_MAX_CONNECTIONS, REDIS_BREAKER_FAILURES,
+                             REDIS_BREAKER_RESET_TIMEOUT, REDIS_BREAKER_MAX_RESET_TIMEOUT)
+from services.array_predictor import ArrayPredictor
+from services.cache_codec import encode_prediction, decode_prediction, encode_vector, decode_vector
+from services.cache_writer import WriteBehindCache
+from services.micro_batcher import MicroBatcher
+from services.cache_keys import model_fingerprint, model_key, fingerprint_patterns, prediction_keys
+from services.prediction_cache import PredictionCache
+from services.redis_client import CircuitBreaker, ResilientRedis
+from services.tree_ensemble import load_model, native_model_path, is_native_model_current
+from utils.feature_encoder import feature_encoder
+from utils.data_processor import create_sample_data, preprocess_customer_data
 
 # 初始化 Redis 連接
 _redis_client = None
 
+# Redis 熔斷器，緩存統計中報告其狀態
+_redis_breaker = CircuitBreaker(
+    failure_threshold=REDIS_BREAKER_FAILURES,
+    reset_timeout=REDIS_BREAKER_RESET_TIMEOUT,
+    max_reset_timeout=REDIS_BREAKER_MAX_RESET_TIMEOUT
+)
+
 def get_redis_client():
     """
     獲取 Redis 連接客戶端
+    
+    客戶端使用連接池並經過熔斷器。熔斷器打開期間返回 None，調用方跳過緩存直接預測，
+    Redis 故障時不會在每個請求上重新連接和等待超時
     """
     global _redis_client
-    if _redis_client is None and REDIS_ENABLED:
-        try:
-            _redis_client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
-                decode_responses=False,
-                socket_timeout=5
-            )
-            # 測試連接
-            _redis_client.ping()
-        except Exception as e:
-            print(f"無法連接到 Redis: {str(e)}")
-            _redis_client = None
-    return _redis_client
+    if not REDIS_ENABLED:
+        return None
+    if _redis_client is None:
+        _redis_client = ResilientRedis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            password=REDIS_PASSWORD,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            breaker=_redis_breaker
+        )
+    return _redis_client if _redis_client.available else None
+
+
+def set_redis_client(client):
+    """
+    替換 Redis 客戶端，例如注入包裝了 fakeredis 的 ResilientRedis 進行測試
+    
+    Args:
+        client: ResilientRedis 實例，為 None 時下次調用 get_redis_client 重新創建
+    """
+    global _redis_client
+    _redis_client = client
 
 # 全局變量
 _model = None
 _feature_importances = None
+_predictor = None
+_threshold = THRESHOLD
 
+# 模型指紋（模型文件內容哈希 + 閾值），所有緩存鍵都以它為前綴，模型加載時確定
+_fingerprint = None
 
-def _load_model():
+# 加載模型時模型文件和服務狀態文件的 os.stat 簽名，變化時（其他 worker 重新發佈）重新加載
+_loaded_signature = None
+
+# 加載和替換模型時持有的鎖
+_model_lock = threading.Lock()
+
+# 示例模型的特徵重要性
+_DUMMY_IMPORTANCES = np.array([0.145, 0.176, 0.284, 0.158, 0.092, 0.049, 0.021, 0.032, 0.043])
+
+# 進程內預測緩存，在 Redis 之前查找
+_prediction_cache = PredictionCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+# Redis 後台寫入隊列，預測結果的寫回不佔用請求線程
+_cache_writer = WriteBehindCache(
+    get_redis_client,
+    ttl=REDIS_TTL,
+    maxsize=CACHE_WRITE_QUEUE_SIZE,
+    batch_size=CACHE_WRITE_BATCH_SIZE,
+    flush_interval=CACHE_WRITE_FLUSH_INTERVAL
+)
+
+# 並發的單筆預測合併為一次模型調用，每批評分時才讀取當前的預測器
+_batcher = MicroBatcher(
+    lambda X: _predictor.predict_proba(X),
+    window_ms=PREDICTION_BATCH_WINDOW_MS,
+    max_batch_size=PREDICTION_BATCH_MAX_SIZE,
+    name='prediction-batcher'
+)
+
+
+def _model_artifact_path():
+    """返回實際加載的模型文件路徑：原生樹集成目錄可用時優先使用"""
+    if is_native_model_current(MODEL_PATH):
+        return native_model_path(MODEL_PATH)
+    return MODEL_PATH
+
+
+def _artifact_signature():
     """
-    懶加載模型，優先從 Redis 緩存中加載
+    返回模型文件、原生樹集成元數據和服務狀態文件的 (inode, 大小, 修改時間)，只做 os.stat
+    
+    Returns:
+        tuple: 文件簽名，文件不存在時對應位置為 None
     """
-    global _model, _feature_importances
+    signature = []
+    for path in (MODEL_PATH, os.path.join(native_model_path(MODEL_PATH), 'meta.json'), SERVING_STATE_PATH):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _needs_reload():
+    """判斷模型尚未加載，或模型文件、發佈的閾值在加載後已變化"""
+    return _model is None or _artifact_signature() != _loaded_signature
+
+
+def _published_threshold():
+    """
+    讀取服務狀態文件中發佈的閾值，沒有發佈過時返回當前進程的閾值
+    
+    Returns:
+        float: 決策閾值
+    """
+    try:
+        with open(SERVING_STATE_PATH, 'r', encoding='utf-8') as f:
+            return float(json.load(f)['threshold'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return _threshold
+
+
+def _publish_threshold(threshold):
+    """
+    將閾值原子地寫入服務狀態文件，其他 worker 在下一次請求時通過 os.stat 發現並重新加載
+    
+    Args:
+        threshold: 決策閾值
+    """
+    tmp_path = f"{SERVING_STATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'threshold': threshold}, f)
+    os.replace(tmp_path, SERVING_STATE_PATH)
+
+
+def _swap_model(threshold):
+    """
+    加載模型並替換當前的服務狀態（調用方持有 _model_lock）
     
-    # 檢查 Redis 中是否有模型
+    新狀態全部構建完成後才替換全局變量，指紋最後更新：
+    以新指紋生成的緩存鍵一定對應新模型的結果
+    
+    Args:
+        threshold: 新的決策閾值
+        
+    Returns:
+        str: 替換前的指紋
+    """
+    global _model, _feature_importances, _predictor, _threshold, _fingerprint, _loaded_signature
+
+    # 簽名在加載之前讀取：加載期間文件再次變化時，下一次請求會再重新加載
+    signature = _artifact_signature()
+
+    try:
+        # 從保存的模型文件中加載，優先使用原生樹集成目錄
+        model = load_model(MODEL_PATH)
+        fingerprint = model_fingerprint(_model_artifact_path(), {'threshold': threshold})
+
+        # 特徵名校驗只在加載時執行一次，之後直接以數組預測
+        try:
+            predictor = ArrayPredictor(model, feature_encoder.feature_names)
+        except ValueError as e:
+            print(f"無法構建低延遲預測路徑，將使用數據框預測: {str(e)}")
+            predictor = None
+
+        # 如果模型有feature_importances_屬性，則提取特徵重要性
+        if hasattr(model, 'feature_importances_'):
+            importances = model.feature_importances_
+        elif hasattr(model, 'feature_importance_'):
+            importances = model.feature_importance_
+        else:
+            # 如果模型沒有特徵重要性屬性，創建一個示例
+            importances = _DUMMY_IMPORTANCES
+    except Exception as e:
+        # 如果無法加載模型，使用示例數據（用於開發和測試）
+        print(f"警告: 無法加載模型，使用示例預測 ({str(e)})")
+        model = "dummy_model"
+        predictor = None
+        importances = _DUMMY_IMPORTANCES
+        fingerprint = model_fingerprint(MODEL_PATH, {'threshold': threshold, 'model': 'dummy'})
+
+    # 特徵重要性優先使用 Redis 中同一指紋下的緩存，否則寫入緩存
     redis_client = get_redis_client()
     if redis_client:
+        importances_key = model_key(fingerprint, 'feature_importances')
         try:
-            # 嘗試從 Redis 加載特徵重要性
-            cached_importances = redis_client.get('model:feature_importances')
-            if cached_importances:
-                _feature_importances = pickle.loads(cached_importances)
+            cached_importances = decode_vector(redis_client.get(importances_key))
+            if cached_importances is not None:
+                importances = cached_importances
                 print("從 Redis 緩存加載特徵重要性")
+            else:
+                redis_client.setex(importances_key, REDIS_TTL, encode_vector(importances))
+                print("特徵重要性已保存到 Redis 緩存")
         except Exception as e:
-            print(f"從 Redis 加載特徵重要性失敗: {str(e)}")
+            print(f"從 Redis 同步特徵重要性失敗: {str(e)}")
 
-    # 如果模型或特徵重要性未從 Redis 加載，則從文件加載
-    if _model is None:
+    previous = _fingerprint
+    _predictor = predictor
+    _model = model
+    _feature_importances = importances
+    _threshold = threshold
+    _fingerprint = fingerprint
+    _loaded_signature = signature
+    return previous
+
+
+def _load_model():
+    """
+    懶加載模型：第一次調用時加載，之後模型文件或發佈的閾值變化時重新加載
+    
+    每次調用只做幾次 os.stat，其他 worker 重新訓練或更新閾值後，本進程在下一次請求時切換到新指紋
+    """
+    # 模型已加載且文件未變化時直接返回，避免每次預測都訪問 Redis
+    if not _needs_reload():
+        return
+
+    with _model_lock:
+        if _needs_reload():
+            previous = _swap_model(_published_threshold())
+            if previous != _fingerprint:
+                _prediction_cache.clear()
+
+
+def _collect_stale_keys(fingerprint):
+    """
+    刪除 Redis 中某個舊指紋下的所有緩存鍵
+    
+    Args:
+        fingerprint: 舊模型指紋
+    """
+    # 先等待後台隊列中已提交的舊條目寫完，避免回收之後再被寫入
+    _cache_writer.flush(timeout=5)
+
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+
+    for pattern in fingerprint_patterns(fingerprint):
         try:
-            # 從保存的模型文件中加載
-            _model = joblib.load(MODEL_PATH)
-
-            # 如果模型有feature_importances_屬性，則提取特徵重要性
-            if hasattr(_model, 'feature_importances_'):
-                _feature_importances = _model.feature_importances_
-            elif hasattr(_model, 'feature_importance_'):
-                _feature_importances = _model.feature_importance_
-            else:
-                # 如果模型沒有特徵重要性屬性，創建一個示例
-                _feature_importances = np.array([0.145, 0.176, 0.284, 0.158, 0.092, 0.049, 0.021, 0.032, 0.043])
-            
-            # 將特徵重要性保存到 Redis
-            if redis_client and _feature_importances is not None:
-                try:
-                    redis_client.setex(
-                        'model:feature_importances',
-                        REDIS_TTL,
-                        pickle.dumps(_feature_importances)
-                    )
-                    print("特徵重要性已保存到 Redis 緩存")
-                except Exception as e:
-                    print(f"保存特徵重要性到 Redis 失敗: {str(e)}")
-                    
+            deleted = redis_client.delete_matching(pattern)
+            print(f"已回收 {deleted} 個舊模型緩存鍵: {pattern}")
         except Exception as e:
-            # 如果無法加載模型，使用示例數據（用於開發和測試）
-            print(f"警告: 無法加載模型，使用示例預測 ({str(e)})")
-            _model = "dummy_model"
-            _feature_importances = np.array([0.145, 0.176, 0.284, 0.158, 0.092, 0.049, 0.021, 0.032, 0.043])
+            print(f"回收舊模型緩存鍵失敗 ({pattern}): {str(e)}")
 
 
-def make_prediction(data):
+def reload_model(threshold=None):
     """
-    對預處理後的數據進行預測，優先從 Redis 緩存中獲取結果
+    重新加載模型（例如重新訓練後），並可同時更新閾值
+    
+    指紋變化後新請求立即使用新的緩存命名空間，進程內緩存清空，
+    舊指紋下的 Redis 鍵在後台線程中以 SCAN + UNLINK 回收，無需清空整個 Redis 數據庫。
+    新閾值寫入 SERVING_STATE_PATH，其他 worker 通過文件簽名發現變化並各自重新加載
     
     Args:
-        data: 預處理後的特徵數據
+        threshold: 新的決策閾值，為 None 時保持已發佈的閾值
         
     Returns:
-        (probability, prediction): 預測概率和預測結果的元組
+        str: 新的模型指紋
     """
-    # 生成輸入數據的緩存鍵
-    input_hash = hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
-    cache_key = f'prediction:{input_hash}'
+    with _model_lock:
+        if threshold is None:
+            threshold = _published_threshold()
+        else:
+            threshold = float(threshold)
+            try:
+                _publish_threshold(threshold)
+            except OSError as e:
+                print(f"發佈閾值失敗，僅在當前進程生效: {str(e)}")
+        previous = _swap_model(threshold)
+        fingerprint = _fingerprint
+
+    if previous != fingerprint:
+        _prediction_cache.clear()
+        if previous is not None:
+            threading.Thread(target=_collect_stale_keys, args=(previous,), daemon=True,
+                             name='cache-gc').start()
+        print(f"模型指紋已更新: {previous} -> {fingerprint}")
+
+    return fingerprint
+
+
+def _to_feature_row(data):
+    """
+    將預處理後的特徵轉換為固定順序的 float32 數組
     
-    # 嘗試從 Redis 緩存中獲取結果
-    redis_client = get_redis_client()
-    if redis_client:
-        try:
-            cached_result = redis_client.get(cache_key)
-            if cached_result:
-                probability, prediction = pickle.loads(cached_result)
-                print(f"從 Redis 緩存獲取預測結果: {probability}, {prediction}")
-                return probability, prediction
-        except Exception as e:
-            print(f"從 Redis 獲取預測結果失敗: {str(e)}")
+    Args:
+        data: 預處理後的特徵字典
+        
+    Returns:
+        np.ndarray: 列順序與 feature_encoder.feature_names 一致的特徵行
+    """
+    return np.array([data.get(name, 0.0) for name in feature_encoder.feature_names], dtype=np.float32)
+
+
+def _score(data, row=None):
+    """
+    直接使用模型對預處理後的數據評分，不經過緩存
     
-    # 如果緩存中沒有，加載模型並進行預測
+    Args:
+        data: 預處理後的特徵數據
+        row: 可選的特徵行，列順序與 feature_encoder.feature_names 一致，避免重複構建
+        
+    Returns:
+        (probability, prediction): 預測概率和預測結果的元組
+    """
     _load_model()
 
     # 如果是開發環境中的示例模型，返回示例預測
@@ -128,7 +341,12 @@ def make_prediction(data):
         seed = sum([float(val) for val in data.values()]) % 100
         np.random.seed(int(seed))
         probability = np.clip(np.random.normal(0.35, 0.2), 0.05, 0.95)
-        prediction = 1 if probability > THRESHOLD else 0
+        prediction = 1 if probability > _threshold else 0
+    elif _predictor is not None:
+        # 低延遲路徑：固定特徵順序的數組直接送入 booster，不構建 DataFrame；
+        # 並發請求在微批窗口內合併為一次模型調用
+        probability = _batcher.predict_one(row if row is not None else _to_feature_row(data))
+        prediction = 1 if probability > _threshold else 0
     else:
         # 轉換成DataFrame格式
         X = pd.DataFrame([data])
@@ -149,23 +367,204 @@ def make_prediction(data):
                 return probability, prediction
 
         # 根據閾值確定預測結果
-        prediction = 1 if probability > THRESHOLD else 0
+        prediction = 1 if probability > _threshold else 0
+
+    return probability, prediction
+
+
+def _score_batch(data_list, features=None):
+    """
+    對多筆預處理後的數據一次性評分，不經過緩存
+    
+    Args:
+        data_list: 預處理後的特徵數據列表
+        features: 可選的特徵矩陣，列順序與 feature_encoder.feature_names 一致，避免重複構建
+        
+    Returns:
+        list: (probability, prediction) 元組列表，順序與輸入一致
+    """
+    _load_model()
+
+    # 示例模型按單筆的偽隨機規則評分，保證與 make_prediction 的結果一致
+    if _model == "dummy_model":
+        return [_score(data) for data in data_list]
+
+    if _predictor is not None:
+        # 整個批次組成一個矩陣，只調用一次模型
+        X = features if features is not None else np.stack([_to_feature_row(data) for data in data_list])
+        probabilities = _predictor.predict_proba(X)
+    else:
+        try:
+            probabilities = _model.predict_proba(pd.DataFrame(data_list))[:, 1]
+        except Exception:
+            # 模型不支持批量概率預測時逐筆評分
+            return [_score(data) for data in data_list]
+
+    return [(float(probability), 1 if probability > _threshold else 0) for probability in probabilities]
+
+
+def warm_up(n_samples=3):
+    """
+    預加載模型並用合成數據評分幾次，避免第一個請求承擔加載和初始化開銷
+    
+    Args:
+        n_samples: 合成預測的次數
+        
+    Returns:
+        bool: 是否加載了真實模型（False 表示使用示例模型）
+    """
+    _load_model()
+    sample = create_sample_data()
+    for i in range(n_samples):
+        _score(preprocess_customer_data(dict(sample, age=sample['age'] + 10 * i)))
+
+    return _model != "dummy_model"
+
+
+def make_prediction(data):
+    """
+    對預處理後的數據進行預測，優先從 Redis 緩存中獲取結果
     
-    # 將結果保存到 Redis 緩存
+    Args:
+        data: 預處理後的特徵數據
+        
+    Returns:
+        (probability, prediction): 預測概率和預測結果的元組
+    """
+    _load_model()
+
+    # 緩存鍵由固定順序、量化後的特徵向量生成，並按模型版本和閾值劃分命名空間
+    row = _to_feature_row(data)
+    local_keys, cache_keys = prediction_keys(row, _fingerprint)
+    local_key, cache_key = local_keys[0], cache_keys[0]
+
+    # 先查進程內緩存，重複的客戶畫像不需要訪問 Redis
+    cached = _prediction_cache.get(local_key)
+    if cached is not None:
+        return cached
+    
+    # 嘗試從 Redis 緩存中獲取結果
+    redis_client = get_redis_client()
     if redis_client:
         try:
-            redis_client.setex(
-                cache_key,
-                REDIS_TTL,
-                pickle.dumps((probability, prediction))
-            )
-            print(f"預測結果已保存到 Redis 緩存: {probability}, {prediction}")
+            cached_result = decode_prediction(redis_client.get(cache_key))
+            if cached_result is not None:
+                probability, prediction = cached_result
+                print(f"從 Redis 緩存獲取預測結果: {probability}, {prediction}")
+                _prediction_cache.set(local_key, (probability, prediction))
+                return probability, prediction
         except Exception as e:
-            print(f"保存預測結果到 Redis 失敗: {str(e)}")
+            print(f"從 Redis 獲取預測結果失敗: {str(e)}")
+    
+    # 如果緩存中沒有，加載模型並進行預測
+    probability, prediction = _score(data, row)
+    _prediction_cache.set(local_key, (probability, prediction))
+
+    # 將結果交給後台隊列寫入 Redis，不等待寫入完成
+    if redis_client:
+        _cache_writer.submit({cache_key: encode_prediction(probability, prediction)})
 
     return probability, prediction
 
 
+def make_batch_prediction(data_list):
+    """
+    對多筆預處理後的數據進行預測，批量使用進程內緩存和 Redis 緩存
+    
+    先查進程內緩存；其餘的行用一次 MGET 從 Redis 讀取；仍未命中的行合併為一次模型調用評分，
+    結果交給後台隊列批量寫回 Redis。請求路徑上無論批次多大，最多一次 Redis 往返。
+    
+    Args:
+        data_list: 預處理後的特徵數據列表
+        
+    Returns:
+        list: (probability, prediction) 元組列表，順序與輸入一致
+    """
+    if not data_list:
+        return []
+
+    _load_model()
+    results = [None] * len(data_list)
+
+    # 整批特徵只構建一次，同時用於生成緩存鍵和評分
+    features = np.stack([_to_feature_row(data) for data in data_list])
+    local_keys, redis_keys = prediction_keys(features, _fingerprint)
+
+    # 進程內緩存
+    pending = []
+    for i, local_key in enumerate(local_keys):
+        cached = _prediction_cache.get(local_key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    if not pending:
+        return results
+
+    # Redis 緩存：相同輸入只查詢一次
+    cache_keys = {i: redis_keys[i] for i in pending}
+    redis_client = get_redis_client()
+    if redis_client:
+        unique_keys = list(dict.fromkeys(cache_keys.values()))
+        try:
+            cached_values = dict(zip(unique_keys, redis_client.mget(unique_keys)))
+            still_pending = []
+            for i in pending:
+                cached_result = decode_prediction(cached_values.get(cache_keys[i]))
+                if cached_result is not None:
+                    results[i] = cached_result
+                    _prediction_cache.set(local_keys[i], results[i])
+                else:
+                    still_pending.append(i)
+            pending = still_pending
+        except Exception as e:
+            print(f"從 Redis 批量獲取預測結果失敗: {str(e)}")
+
+    if not pending:
+        return results
+
+    # 未命中的行一次性評分
+    scored = _score_batch([data_list[i] for i in pending], features[pending])
+    to_cache = {}
+    for i, result in zip(pending, scored):
+        results[i] = result
+        _prediction_cache.set(local_keys[i], result)
+        to_cache[cache_keys[i]] = encode_prediction(*result)
+
+    # 後台隊列以管道批量寫回 Redis
+    if redis_client:
+        _cache_writer.submit(to_cache)
+
+    return results
+
+
+def get_threshold():
+    """
+    獲取當前的決策閾值
+    
+    Returns:
+        float: 決策閾值
+    """
+    return _threshold
+
+
+def get_cache_stats():
+    """
+    獲取進程內預測緩存的統計信息
+    
+    Returns:
+        dict: 容量、條目數、命中/未命中次數和命中率等，以及後台寫入隊列、微批合併和 Redis 熔斷器狀態
+    """
+    stats = _prediction_cache.stats()
+    stats['fingerprint'] = _fingerprint
+    stats['write_behind'] = _cache_writer.stats()
+    stats['micro_batch'] = _batcher.stats()
+    if REDIS_ENABLED:
+        stats['redis'] = _redis_breaker.stats()
+    return stats
+
+
 def get_feature_importance(data):
     """
     獲取特徵的重要性及其對當前預測的貢獻
@@ -213,6 +612,21 @@ def get_feature_importance(data):
     return result
 
 
+def _sample_metrics():
+    """返回模型性能指標（這裡應該從評估結果文件中讀取，這裡使用示例數據）"""
+    return {
+        'accuracy': 0.842,
+        'precision': 0.723,
+        'recall': 0.675,
+        'f1_score': 0.698,
+        'roc_auc': 0.856,
+        'confusion_matrix': [
+            [9830, 1170],
+            [642, 1358]
+        ]
+    }
+
+
 def get_model_metrics():
     """
     獲取模型性能指標，優先從 Redis 緩存中獲取
@@ -220,34 +634,26 @@ def get_model_metrics():
     Returns:
         dict: 模型性能指標
     """
+    _load_model()
+    metrics_key = model_key(_fingerprint, 'metrics')
+
     # 嘗試從 Redis 緩存中獲取模型指標
     redis_client = get_redis_client()
     if redis_client:
         try:
-            cached_metrics = redis_client.get('model:metrics')
+            cached_metrics = redis_client.get(metrics_key)
             if cached_metrics:
                 return json.loads(cached_metrics)
         except Exception as e:
             print(f"從 Redis 獲取模型指標失敗: {str(e)}")
     
-    # 這裡應該從評估結果文件中讀取，這裡使用示例數據
-    metrics = {
-        'accuracy': 0.842,
-        'precision': 0.723,
-        'recall': 0.675,
-        'f1_score': 0.698,
-        'roc_auc': 0.856,
-        'confusion_matrix': [
-            [9830, 1170],
-            [642, 1358]
-        ]
-    }
+    metrics = _sample_metrics()
     
     # 將指標保存到 Redis 緩存
     if redis_client:
         try:
             redis_client.setex(
-                'model:metrics',
+                metrics_key,
                 REDIS_TTL * 10,  # 模型指標緩存時間更長
                 json.dumps(metrics)
             )
@@ -0,0 +1,298 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(redis.ConnectionError):
+    """熔斷器打開（或半開狀態下的試探請求尚未結束）時拒絕執行的 Redis 命令"""
+
+
+class CircuitBreaker:
+    """
+    熔斷器
+
+    連續失敗達到閾值後打開，打開期間直接拒絕請求；等待時間過後進入半開狀態放行一次試探請求，
+    成功則關閉，失敗則重新打開並將等待時間加倍（不超過上限）。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 5.0, max_reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化熔斷器
+
+        Args:
+            failure_threshold: 連續失敗多少次後打開
+            reset_timeout: 首次打開後等待多少秒再試探
+            max_reset_timeout: 退避等待時間的上限（秒）
+            clock: 時間函數，測試時可以替換
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.max_reset_timeout = float(max_reset_timeout)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self._current_timeout = self.reset_timeout
+        self._retry_at = 0.0
+        self._trial_in_flight = False
+
+    def is_available(self) -> bool:
+        """
+        判斷當前是否可能允許請求，不佔用半開狀態的試探名額，供調用方決定是否跳過緩存
+
+        Returns:
+            關閉狀態、等待時間已過的打開狀態，或半開狀態下沒有進行中的試探時為 True
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return self._clock() >= self._retry_at
+        return not self._trial_in_flight
+
+    def allow_request(self) -> bool:
+        """
+        判斷當前是否允許請求，在執行命令前調用；半開狀態下放行的試探請求結束後
+        必須調用 record_success、record_failure 或 release 之一
+
+        Returns:
+            是否允許；打開狀態下只做一次時間比較
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() < self._retry_at:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            # 半開狀態只放行一個試探請求
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """記錄一次成功，關閉熔斷器並重置退避時間"""
+        if self.state == self.CLOSED and self.failures == 0:
+            return
+
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Redis 連接已恢復，熔斷器關閉")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._current_timeout = self.reset_timeout
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """記錄一次失敗，達到閾值或試探失敗時打開熔斷器"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # 試探失敗，退避時間加倍
+                self._current_timeout = min(self._current_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """試探請求既未成功也未因連接失敗結束（例如其他異常或被取消）時釋放試探名額，狀態不變"""
+        if self.state != self.HALF_OPEN:
+            return
+
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _open(self) -> None:
+        """打開熔斷器（調用方持有鎖）"""
+        self.state = self.OPEN
+        self.opened_count += 1
+        self._trial_in_flight = False
+        self._retry_at = self._clock() + self._current_timeout
+        logger.warning(f"Redis 連續失敗 {self.failures} 次，熔斷器打開，{self._current_timeout:.1f} 秒後重試")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回熔斷器狀態"""
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened_count': self.opened_count,
+            'retry_in': max(0.0, self._retry_at - self._clock()) if self.state == self.OPEN else 0.0
+        }
+
+
+def _record_outcome(breaker: CircuitBreaker, outcome: Optional[bool]) -> None:
+    """
+    將一次 Redis 訪問的結果記錄到熔斷器
+
+    Args:
+        breaker: 熔斷器
+        outcome: True 為成功，False 為連接失敗，None 為其他異常（只釋放試探名額）
+    """
+    if outcome is True:
+        breaker.record_success()
+    elif outcome is False:
+        breaker.record_failure()
+    else:
+        breaker.release()
+
+
+class ResilientRedis:
+    """
+    帶連接池和熔斷器的 Redis 客戶端
+
+    所有命令經由熔斷器轉發到底層客戶端：連接錯誤和超時計為失敗，熔斷器打開期間 available 為 False，
+    調用方據此跳過緩存，Redis 故障時每個請求只多一次狀態判斷。
+    半開狀態的試探名額在執行命令時才佔用，並在命令結束時（包括其他異常）於 finally 中記錄或釋放。
+    底層客戶端可以注入（例如 fakeredis.FakeRedis），便於在沒有 Redis 服務時測試。
+    """
+
+    def __init__(self, client: Optional[Any] = None, breaker: Optional[CircuitBreaker] = None,
+                 host: str = 'localhost', port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 socket_timeout: float = 5.0, socket_connect_timeout: float = 1.0, max_connections: int = 50):
+        """
+        初始化客戶端
+
+        Args:
+            client: 已創建的 Redis 客戶端，為 None 時基於連接池創建
+            breaker: 熔斷器，為 None 時使用默認參數創建
+            host: Redis 主機
+            port: Redis 端口
+            db: Redis 數據庫編號
+            password: Redis 密碼
+            socket_timeout: 命令超時秒數
+            socket_connect_timeout: 建立連接的超時秒數
+            max_connections: 連接池的最大連接數
+        """
+        if client is None:
+            pool = redis.ConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                max_connections=max_connections
+            )
+            client = redis.Redis(connection_pool=pool, decode_responses=False)
+
+        self.client = client
+        self.breaker = breaker or CircuitBreaker()
+
+    @property
+    def available(self) -> bool:
+        """熔斷器是否可能允許訪問 Redis，只讀取狀態，不佔用半開狀態的試探名額"""
+        return self.breaker.is_available()
+
+    def _call(self, fn: Callable[[], Any]) -> Any:
+        """
+        經由熔斷器執行一次 Redis 訪問：連接錯誤和超時計為失敗，服務端返回的錯誤計為成功（連接正常），
+        其他異常只釋放試探名額
+
+        Raises:
+            CircuitOpenError: 熔斷器不允許訪問
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Redis 熔斷器已打開")
+
+        outcome = None
+        try:
+            result = fn()
+            outcome = True
+            return result
+        except (redis.ConnectionError, redis.TimeoutError):
+            outcome = False
+            raise
+        except redis.RedisError:
+            outcome = True
+            raise
+        finally:
+            _record_outcome(self.breaker, outcome)
+
+    def setex_many(self, items: Dict[Any, Any], ttl: int) -> None:
+        """
+        在一個非事務管道中批量寫入帶過期時間的鍵，只需一次網絡往返
+
+        Args:
+            items: 鍵到值的映射
+            ttl: 過期秒數
+
+        Raises:
+            redis.RedisError: 寫入失敗（已計入熔斷器）
+        """
+        if not items:
+            return
+
+        def run_pipeline():
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, ttl, value)
+            return pipe.execute()
+
+        self._call(run_pipeline)
+
+    def delete_matching(self, pattern: str, batch_size: int = 500) -> int:
+        """
+        用 SCAN 增量遍歷並以 UNLINK 批量刪除匹配的鍵，不會像 KEYS 那樣阻塞 Redis，
+        內存在 Redis 後台線程中釋放
+
+        Args:
+            pattern: SCAN MATCH 模式，例如 'prediction:<指紋>:*'
+            batch_size: 每次 SCAN 的建議數量和每次 UNLINK 的鍵數
+
+        Returns:
+            刪除的鍵數
+
+        Raises:
+            redis.RedisError: 訪問失敗（已計入熔斷器）
+        """
+        def run_scan():
+            deleted = 0
+            batch = []
+            for key in self.client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self.client.unlink(*batch)
+            return deleted
+
+        return self._call(run_scan)
+
+    def execute(self, command: str, *args, **kwargs) -> Any:
+        """
+        經由熔斷器執行 Redis 命令
+
+        Args:
+            command: 命令名，例如 'get'、'mget'、'setex'
+            *args: 命令參數
+            **kwargs: 命令關鍵字參數
+
+        Returns:
+            命令結果
+
+        Raises:
+            redis.RedisError: 命令失敗（已計入熔斷器）
+        """
+        return self._call(lambda: getattr(self.client, command)(*args, **kwargs))
+
+    def __getattr__(self, command: str) -> Callable[..., Any]:
+        """將 get、mget、setex 等 Redis 命令轉發到 execute"""
+        if command.startswith('_'):
+            raise AttributeError(command)
+        return lambda *args, **kwargs: self.execute(command, *args, **kwargs)
@@ -0,0 +1,544 @@
+import os
+import json
+import logging
+import argparse
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 缺失值處理方式，與 LightGBM 的 MissingType 一致
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# LightGBM 判斷數值為零的閾值（kZeroThreshold）
+_ZERO_THRESHOLD = 1e-35
+
+# 磁盤格式版本，格式變更時遞增；版本 2 增加了推理數組，加載時無需重新計算
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+
+class TreeEnsemble:
+    """
+    原生樹集成推理引擎
+
+    將訓練好的 LightGBM / XGBoost booster 轉換為扁平的 NumPy 數組（特徵索引、閾值、左右子節點、葉子值），
+    所有樹的節點連續存放。預測時按深度逐層向量化地推進整批樣本在所有樹中的位置，
+    不經過 sklearn 包裝層，服務端也無需導入 lightgbm 或 xgboost。
+    """
+
+    # 保存到磁盤的數組
+    ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'default_left', 'missing_type', 'roots')
+
+    # 推理時使用的派生數組（屬性名 -> 文件名），一併保存，內存映射加載時直接使用而無需在堆上重新計算
+    INFERENCE_ARRAY_NAMES = {
+        '_feature': 'inference_feature',
+        '_left': 'inference_left',
+        '_threshold': 'inference_threshold',
+        '_default_right': 'inference_default_right'
+    }
+
+    # 每次向量化推進的最大行數，控制 (行數 × 樹數) 中間數組的內存
+    ROW_BLOCK_SIZE = 1024
+
+    def __init__(self, arrays: Dict[str, np.ndarray], feature_names: List[str], max_depth: int,
+                 sigmoid: float = 1.0, average_output: bool = False, base_score: float = 0.0,
+                 float32_input: bool = False, feature_importances: Optional[List[float]] = None,
+                 inference_arrays: Optional[Dict[str, np.ndarray]] = None):
+        """
+        初始化樹集成
+
+        Args:
+            arrays: 節點數組字典，鍵為 ARRAY_NAMES
+            feature_names: 特徵名列表，與特徵索引對應
+            max_depth: 所有樹的最大深度
+            sigmoid: 二分類目標的 sigmoid 參數
+            average_output: 是否對所有樹的輸出取平均（隨機森林模式）
+            base_score: 加到原始分數上的初始值（XGBoost 的 base_score 對應的 margin）
+            float32_input: 是否先將輸入轉換為 float32 再比較閾值（XGBoost 按 float32 比較）
+            feature_importances: 原模型的特徵重要性，為 None 時按分裂次數計算
+            inference_arrays: 已保存的推理數組，鍵為 INFERENCE_ARRAY_NAMES，為 None 時從節點數組計算
+        """
+        for name in self.ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+
+        self.feature_names = list(feature_names)
+        self.max_depth = int(max_depth)
+        self.sigmoid = float(sigmoid)
+        self.average_output = bool(average_output)
+        self.base_score = float(base_score)
+        self.float32_input = bool(float32_input)
+        self._feature_importances = (None if feature_importances is None
+                                     else np.asarray(feature_importances, dtype=np.float64))
+        self.n_trees = len(self.roots)
+
+        # 與 sklearn 接口一致的屬性，便於 ArrayPredictor 校驗特徵
+        self.feature_names_in_ = np.array(self.feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names)
+        self.n_classes_ = 2
+
+        # 推理時使用的派生數組：每個內部節點的右子節點緊跟在左子節點之後，
+        # 因此下一節點 = 左子節點 + 是否向右。葉子節點的左子節點指向自身、閾值為 +inf，
+        # 推進固定 max_depth 步後所有樣本都會停在葉子上，無需逐步判斷是否到達葉子
+        is_leaf = self.feature < 0
+        internal = ~is_leaf
+        if not np.array_equal(self.right[internal], self.left[internal] + 1):
+            raise ValueError("樹集成節點佈局無效：右子節點必須緊跟在左子節點之後")
+
+        if inference_arrays is not None:
+            for name in self.INFERENCE_ARRAY_NAMES:
+                setattr(self, name, inference_arrays[name])
+        else:
+            node_ids = np.arange(len(self.feature))
+            self._feature = np.where(is_leaf, 0, self.feature).astype(np.intp)
+            self._left = np.where(is_leaf, node_ids, self.left).astype(np.intp)
+            self._threshold = np.where(is_leaf, np.inf, self.threshold)
+            self._default_right = ~self.default_left.astype(np.bool_)
+        self._roots = np.asarray(self.roots, dtype=np.intp)
+
+        # 所有節點都不把 NaN 作為缺失值時，NaN 一律按 0 處理，可以在推進前一次性替換；
+        # 沒有任何節點需要缺失值分支時，推進只需要比較閾值
+        missing_type = np.asarray(self.missing_type)[internal]
+        self._has_nan_missing = bool(np.any(missing_type == MISSING_NAN))
+        self._has_missing_branch = bool(np.any(missing_type != MISSING_NONE))
+        self._has_zero_missing = bool(np.any(missing_type == MISSING_ZERO))
+
+        # 推理數組只讀：gunicorn preload 後各 worker 共享同一份內存頁，誤寫會直接報錯而不是觸發寫時複製
+        for array in (self._feature, self._left, self._threshold, self._default_right, self._roots):
+            array.setflags(write=False)
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        """
+        特徵重要性
+
+        轉換時保存了原模型的特徵重要性則直接返回，否則按分裂次數計算，
+        與 LightGBM 默認的 importance_type='split' 一致
+        """
+        if self._feature_importances is not None:
+            return self._feature_importances
+        return np.bincount(self.feature[self.feature >= 0], minlength=self.n_features_in_)
+
+    @classmethod
+    def from_model(cls, model: Any) -> 'TreeEnsemble':
+        """
+        根據模型類型選擇轉換方式
+
+        Args:
+            model: LightGBM 或 XGBoost 模型（sklearn 包裝或原生 booster）
+
+        Returns:
+            TreeEnsemble 實例
+
+        Raises:
+            ValueError: 不支持的模型類型
+        """
+        if isinstance(model, cls):
+            return model
+        if hasattr(model, 'get_booster') or hasattr(model, 'save_raw'):
+            return cls.from_xgboost(model)
+        if hasattr(model, 'booster_') or hasattr(model, 'dump_model'):
+            return cls.from_lightgbm(model)
+        raise ValueError(f"不支持轉換的模型類型: {type(model).__name__}")
+
+    @classmethod
+    def from_lightgbm(cls, model: Any) -> 'TreeEnsemble':
+        """
+        從 LightGBM 模型轉換
+
+        Args:
+            model: LGBMClassifier 或 lightgbm.Booster
+
+        Returns:
+            TreeEnsemble 實例
+
+        Raises:
+            ValueError: 模型不是二分類或包含不支持的分裂類型
+        """
+        booster = getattr(model, 'booster_', model)
+        best_iteration = getattr(model, 'best_iteration_', None) or None
+        dump = booster.dump_model(num_iteration=best_iteration)
+
+        objective = dump.get('objective', '')
+        if not objective.startswith('binary') or dump.get('num_class', 1) != 1:
+            raise ValueError(f"僅支持二分類模型，當前目標: {objective}")
+
+        sigmoid = 1.0
+        for token in objective.split()[1:]:
+            if token.startswith('sigmoid:'):
+                sigmoid = float(token.split(':', 1)[1])
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        default_left, missing_type, roots = [], [], []
+        max_depth = 0
+
+        def allocate(count):
+            start = len(feature)
+            for values, default in ((feature, -1), (threshold, 0.0), (left, -1), (right, -1), (value, 0.0),
+                                    (default_left, False), (missing_type, MISSING_NONE)):
+                values.extend([default] * count)
+            return start
+
+        for tree_info in dump['tree_info']:
+            root = allocate(1)
+            roots.append(root)
+            # 迭代遍歷，左右子節點連續分配，(節點, 索引, 深度)
+            stack = [(tree_info['tree_structure'], root, 0)]
+            while stack:
+                node, index, depth = stack.pop()
+
+                if 'leaf_value' in node:
+                    value[index] = node['leaf_value']
+                    max_depth = max(max_depth, depth)
+                    continue
+
+                if node.get('decision_type', '<=') != '<=':
+                    raise ValueError(f"不支持的分裂類型: {node.get('decision_type')}")
+
+                child = allocate(2)
+                feature[index] = node['split_feature']
+                threshold[index] = float(node['threshold'])
+                left[index] = child
+                right[index] = child + 1
+                default_left[index] = bool(node.get('default_left', True))
+                missing_type[index] = _MISSING_TYPES.get(node.get('missing_type', 'None'), MISSING_NONE)
+
+                stack.append((node['left_child'], child, depth + 1))
+                stack.append((node['right_child'], child + 1, depth + 1))
+
+        arrays = {
+            'feature': np.asarray(feature, dtype=np.int32),
+            'threshold': np.asarray(threshold, dtype=np.float64),
+            'left': np.asarray(left, dtype=np.int32),
+            'right': np.asarray(right, dtype=np.int32),
+            'value': np.asarray(value, dtype=np.float64),
+            'default_left': np.asarray(default_left, dtype=np.bool_),
+            'missing_type': np.asarray(missing_type, dtype=np.int8),
+            'roots': np.asarray(roots, dtype=np.int32)
+        }
+
+        return cls(arrays, dump['feature_names'], max_depth, sigmoid=sigmoid,
+                   average_output=bool(dump.get('average_output', False)))
+
+    @classmethod
+    def from_xgboost(cls, model: Any) -> 'TreeEnsemble':
+        """
+        從 XGBoost 模型轉換
+
+        XGBoost 的分裂規則是 x < 閾值 走左子節點（按 float32 比較），轉換時將閾值替換為
+        float32 下的前一個可表示值，統一為 x <= 閾值 的比較；缺失值走節點記錄的默認方向。
+
+        Args:
+            model: XGBClassifier 或 xgboost.Booster
+
+        Returns:
+            TreeEnsemble 實例
+
+        Raises:
+            ValueError: 模型不是二分類或包含類別型分裂
+        """
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"僅支持 binary:logistic 模型，當前目標: {objective}")
+
+        gbtree = learner['gradient_booster']
+        if 'model' not in gbtree:
+            raise ValueError(f"僅支持 gbtree 模型，當前: {gbtree.get('name')}")
+        trees = gbtree['model']['trees']
+
+        # 使用早停時只取最佳迭代之前的樹，與 sklearn 包裝層的 predict_proba 一致
+        best_iteration = booster.attr('best_iteration')
+        if best_iteration is not None:
+            num_parallel_tree = int(gbtree['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees = trees[:(int(best_iteration) + 1) * num_parallel_tree]
+
+        # base_score 是概率，轉換為 margin；不同版本分別保存為 "5E-1" 或 "[5E-1]"
+        base_probability = float(learner['learner_model_param']['base_score'].strip('[]'))
+        base_score = float(np.log(base_probability / (1.0 - base_probability)))
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        default_left, missing_type, roots = [], [], []
+        max_depth = 0
+
+        def allocate(count):
+            start = len(feature)
+            for values, default in ((feature, -1), (threshold, 0.0), (left, -1), (right, -1), (value, 0.0),
+                                    (default_left, False), (missing_type, MISSING_NONE)):
+                values.extend([default] * count)
+            return start
+
+        for tree in trees:
+            if any(tree.get('split_type', [])):
+                raise ValueError("不支持類別型分裂")
+
+            children_left = tree['left_children']
+            children_right = tree['right_children']
+            conditions = tree['split_conditions']
+
+            root = allocate(1)
+            roots.append(root)
+            # 迭代遍歷，左右子節點連續分配，(XGBoost 節點號, 索引, 深度)
+            stack = [(0, root, 0)]
+            while stack:
+                node, index, depth = stack.pop()
+
+                if children_left[node] == -1:
+                    # 葉子節點的 split_conditions 保存葉子值
+                    value[index] = conditions[node]
+                    max_depth = max(max_depth, depth)
+                    continue
+
+                child = allocate(2)
+                feature[index] = tree['split_indices'][node]
+                threshold[index] = float(np.nextafter(np.float32(conditions[node]), np.float32(-np.inf)))
+                left[index] = child
+                right[index] = child + 1
+                default_left[index] = bool(tree['default_left'][node])
+                missing_type[index] = MISSING_NAN
+
+                stack.append((children_left[node], child, depth + 1))
+                stack.append((children_right[node], child + 1, depth + 1))
+
+        arrays = {
+            'feature': np.asarray(feature, dtype=np.int32),
+            'threshold': np.asarray(threshold, dtype=np.float64),
+            'left': np.asarray(left, dtype=np.int32),
+            'right': np.asarray(right, dtype=np.int32),
+            'value': np.asarray(value, dtype=np.float64),
+            'default_left': np.asarray(default_left, dtype=np.bool_),
+            'missing_type': np.asarray(missing_type, dtype=np.int8),
+            'roots': np.asarray(roots, dtype=np.int32)
+        }
+
+        n_features = int(learner['learner_model_param']['num_feature'])
+        feature_names = learner.get('feature_names') or [f"f{i}" for i in range(n_features)]
+        importances = getattr(model, 'feature_importances_', None)
+
+        return cls(arrays, feature_names, max_depth, base_score=base_score, float32_input=True,
+                   feature_importances=None if importances is None else list(map(float, importances)))
+
+    def predict_raw(self, X: np.ndarray) -> np.ndarray:
+        """
+        計算原始分數（所有樹葉子值之和）
+
+        Args:
+            X: 形狀為 (行數, 特徵數) 的數組
+
+        Returns:
+            原始分數數組
+        """
+        if self.float32_input:
+            X = np.asarray(X, dtype=np.float32)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"模型需要 {self.n_features_in_} 個特徵，但輸入有 {X.shape[1]} 個")
+
+        raw = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.ROW_BLOCK_SIZE):
+            block = X[start:start + self.ROW_BLOCK_SIZE]
+            raw[start:start + len(block)] = self._predict_block(block)
+
+        if self.average_output:
+            raw /= self.n_trees
+        if self.base_score:
+            raw += self.base_score
+        return raw
+
+    def _predict_block(self, X: np.ndarray) -> np.ndarray:
+        """對一塊樣本在所有樹上同時推進，返回每行的葉子值之和"""
+        if not self._has_nan_missing:
+            # 與 LightGBM NumericalDecision 一致：非 NaN 缺失模式下 NaN 視為 0
+            X = np.nan_to_num(X, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+        # 只有存在零值缺失節點或本塊包含 NaN 時才需要缺失值分支
+        has_missing = self._has_missing_branch and (self._has_zero_missing or bool(np.isnan(X).any()))
+
+        n_features = X.shape[1]
+        flat = np.ascontiguousarray(X).ravel()
+        offsets = (np.arange(len(X)) * n_features)[:, None]
+        nodes = np.broadcast_to(self._roots, (len(X), self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            values = flat.take(offsets + self._feature.take(nodes))
+
+            if has_missing:
+                missing_type = self.missing_type.take(nodes)
+                is_missing = np.zeros(values.shape, dtype=np.bool_)
+                if self._has_nan_missing:
+                    is_nan = np.isnan(values)
+                    values = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, values)
+                    is_missing |= (missing_type == MISSING_NAN) & is_nan
+                is_missing |= (missing_type == MISSING_ZERO) & (np.abs(values) <= _ZERO_THRESHOLD)
+                go_right = np.where(is_missing, self._default_right.take(nodes), values > self._threshold.take(nodes))
+            else:
+                go_right = values > self._threshold.take(nodes)
+
+            nodes = self._left.take(nodes) + go_right
+
+        return self.value.take(nodes).sum(axis=1)
+
+    def predict_positive(self, X: np.ndarray) -> np.ndarray:
+        """
+        預測正類概率
+
+        Args:
+            X: 形狀為 (行數, 特徵數) 的數組
+
+        Returns:
+            正類概率數組
+        """
+        return 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(X)))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        預測類別概率，與 sklearn 的 predict_proba 接口一致
+
+        Args:
+            X: 形狀為 (行數, 特徵數) 的數組
+
+        Returns:
+            形狀為 (行數, 2) 的概率數組
+        """
+        positive = self.predict_positive(X)
+        return np.column_stack([1.0 - positive, positive])
+
+    def save(self, path: str) -> str:
+        """
+        保存為目錄，每個數組（包括推理數組）一個 .npy 文件，元數據保存為 meta.json
+
+        Args:
+            path: 輸出目錄
+
+        Returns:
+            輸出目錄路徑
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        for name, file_name in self.INFERENCE_ARRAY_NAMES.items():
+            np.save(os.path.join(path, f"{file_name}.npy"), getattr(self, name))
+
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'feature_names': self.feature_names,
+            'max_depth': self.max_depth,
+            'sigmoid': self.sigmoid,
+            'average_output': self.average_output,
+            'base_score': self.base_score,
+            'float32_input': self.float32_input,
+            'feature_importances': (None if self._feature_importances is None
+                                    else self._feature_importances.tolist()),
+            'n_trees': self.n_trees
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"樹集成已保存到: {path}（{self.n_trees} 棵樹，{len(self.feature)} 個節點）")
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> 'TreeEnsemble':
+        """
+        從目錄加載
+
+        Args:
+            path: save() 生成的目錄
+            mmap_mode: 傳給 np.load 的內存映射模式，例如 'r'
+
+        Returns:
+            TreeEnsemble 實例
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('format_version') not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(f"不支持的樹集成格式版本: {meta.get('format_version')}")
+
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in cls.ARRAY_NAMES}
+
+        # 版本 1 沒有保存推理數組，由構造函數重新計算
+        inference_arrays = None
+        if meta['format_version'] >= 2:
+            inference_arrays = {name: np.load(os.path.join(path, f"{file_name}.npy"), mmap_mode=mmap_mode)
+                                for name, file_name in cls.INFERENCE_ARRAY_NAMES.items()}
+
+        return cls(arrays, meta['feature_names'], meta['max_depth'],
+                   sigmoid=meta['sigmoid'], average_output=meta['average_output'],
+                   base_score=meta.get('base_score', 0.0), float32_input=meta.get('float32_input', False),
+                   feature_importances=meta.get('feature_importances'), inference_arrays=inference_arrays)
+
+
+def native_model_path(model_path: str) -> str:
+    """
+    返回模型文件對應的原生樹集成目錄，例如 final_model.joblib -> final_model_trees
+
+    Args:
+        model_path: joblib 模型文件路徑
+
+    Returns:
+        原生樹集成目錄路徑
+    """
+    return f"{os.path.splitext(model_path)[0]}_trees"
+
+
+def is_native_model_current(model_path: str) -> bool:
+    """
+    判斷原生樹集成目錄是否可用：目錄存在，且不早於同名的 joblib 模型文件
+
+    Args:
+        model_path: joblib 模型文件路徑
+
+    Returns:
+        是否可以使用原生樹集成目錄
+    """
+    meta_path = os.path.join(native_model_path(model_path), 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    if os.path.exists(model_path) and os.path.getmtime(meta_path) < os.path.getmtime(model_path):
+        logger.warning(f"原生樹集成早於模型文件，忽略: {native_model_path(model_path)}")
+        return False
+    return True
+
+
+def load_model(model_path: str, mmap_mode: Optional[str] = 'r') -> Any:
+    """
+    加載模型，優先使用原生樹集成目錄，不存在時回退到 joblib
+
+    Args:
+        model_path: joblib 模型文件路徑
+        mmap_mode: 原生樹集成數組（以及 joblib 模型中 NumPy 數組）的內存映射模式
+
+    Returns:
+        TreeEnsemble 或 joblib 反序列化的模型
+    """
+    native_path = native_model_path(model_path)
+    if is_native_model_current(model_path):
+        try:
+            return TreeEnsemble.load(native_path, mmap_mode=mmap_mode)
+        except Exception as e:
+            logger.warning(f"加載原生樹集成失敗，回退到 joblib: {str(e)}")
+
+    import joblib
+    return joblib.load(model_path, mmap_mode=mmap_mode)
+
+
+if __name__ == '__main__':
+    # 將 joblib 保存的 LightGBM / XGBoost 模型轉換為原生樹集成目錄（轉換時需要對應的庫，服務時不需要）
+    parser = argparse.ArgumentParser(description='將 LightGBM / XGBoost 模型轉換為原生樹集成格式')
+    parser.add_argument('model', help='joblib 模型文件路徑，例如 ml_models/final_model.joblib')
+    parser.add_argument('--output', default=None, help='輸出目錄（默認: <模型名>_trees）')
+    args = parser.parse_args()
+
+    import joblib
+    ensemble = TreeEnsemble.from_model(joblib.load(args.model))
+    ensemble.save(args.output or native_model_path(args.model))
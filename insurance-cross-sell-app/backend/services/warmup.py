@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+from typing import Dict, Any
+
+from utils.data_processor import create_sample_data
+
+logger = logging.getLogger(__name__)
+
+# 預熱狀態，/api/health 根據 ready 判斷實例是否可以接收流量
+# state: pending（未開始）、running（進行中）、ready（全部組件成功）、failed（有組件失敗）
+_status = {
+    "state": "pending",
+    "ready": False,
+    "started_at": None,
+    "duration_ms": None,
+    "components": {}
+}
+_lock = threading.Lock()
+
+
+def _run_component(name: str, fn) -> bool:
+    """
+    執行單個組件的預熱，失敗時記錄錯誤但不中斷其他組件
+
+    Returns:
+        bool: 組件是否預熱成功；fn 拋出異常或返回 False 時視為失敗
+    """
+    start = time.perf_counter()
+    try:
+        if fn() is False:
+            raise RuntimeError("未加載真實模型")
+        state = {"status": "ok"}
+    except Exception as e:
+        logger.error(f"{name} 預熱失敗: {str(e)}")
+        state = {"status": "error", "error": str(e)}
+    state["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    _status["components"][name] = state
+    return state["status"] == "ok"
+
+
+def _sample_records(n_samples: int):
+    """基於 create_sample_data() 生成不同年齡段的合成客戶數據"""
+    sample = create_sample_data()
+    return [dict(sample, age=sample['age'] + 10 * i) for i in range(n_samples)]
+
+
+def warm_up(app, n_samples: int = 3) -> Dict[str, Any]:
+    """
+    在應用啟動時預加載模型和編碼器，並執行幾次合成預測
+
+    各組件的預熱互不影響，單個組件失敗只記錄錯誤並繼續預熱其他組件；
+    只有全部組件都成功時才標記為 ready，否則標記為 failed，/api/health 保持 503。
+    已經 ready 時直接返回，failed 後再次調用會重新預熱。
+
+    Args:
+        app: Flask 應用實例
+        n_samples: 每個組件的合成預測次數
+
+    Returns:
+        dict: 預熱狀態
+    """
+    with _lock:
+        if _status["ready"]:
+            return get_status()
+
+        _status["state"] = "running"
+        _status["started_at"] = time.time()
+        _status["components"] = {}
+        start = time.perf_counter()
+        results = []
+
+        try:
+            records = _sample_records(n_samples)
+
+            # API 路由使用的模型服務（單筆和批量兩條路徑）
+            from api.routes import data_service, model_service
+            results.append(_run_component("model_service", lambda: model_service.warm_up(records)))
+
+            # 預測服務使用的模型和預編譯編碼器，使用示例模型時視為失敗
+            from services import prediction_service
+            results.append(_run_component("prediction_service", lambda: prediction_service.warm_up(n_samples)))
+
+            # 配置了標籤編碼器時，同時預熱基於訓練腳本編碼的模型
+            if app.config.get('LABEL_ENCODERS_PATH'):
+                from models.prediction_model import prediction_model
+
+                def warm_prediction_model():
+                    with app.app_context():
+                        prediction_model.warm_up(n_samples)
+
+                results.append(_run_component("prediction_model", warm_prediction_model))
+
+            # gunicorn preload_app 時在 master 中預加載參考數據集，fork 後由所有 worker 共享
+            if app.config.get('PRELOAD_DATA'):
+                results.append(_run_component("data_service", data_service.preload))
+        except Exception as e:
+            logger.error(f"模型預熱失敗: {str(e)}")
+            results.append(False)
+
+        _status["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _status["ready"] = all(results)
+        _status["state"] = "ready" if _status["ready"] else "failed"
+        if _status["ready"]:
+            logger.info(f"模型預熱完成，耗時 {_status['duration_ms']} ms")
+        else:
+            failed = [name for name, state in _status["components"].items() if state["status"] != "ok"]
+            logger.error(f"模型預熱失敗，實例保持未就緒: {failed}")
+
+        return get_status()
+
+
+def start_warm_up(app, n_samples: int = 3) -> threading.Thread:
+    """
+    在後台線程中執行 warm_up，應用立即開始接收請求，預熱完成前 /api/health 返回 503
+
+    gunicorn preload_app 時不能使用：worker 必須在預熱完成後才 fork
+
+    Args:
+        app: Flask 應用實例
+        n_samples: 每個組件的合成預測次數
+
+    Returns:
+        threading.Thread: 預熱線程
+    """
+    _status["state"] = "running"
+    thread = threading.Thread(target=warm_up, args=(app, n_samples), daemon=True, name='warmup')
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    """返回預熱是否已完成"""
+    return _status["ready"]
+
+
+def get_status() -> Dict[str, Any]:
+    """返回預熱狀態的副本"""
+    return {
+        "state": _status["state"],
+        "ready": _status["ready"],
+        "started_at": _status["started_at"],
+        "duration_ms": _status["duration_ms"],
+        "components": {name: dict(state) for name, state in _status["components"].items()}
+    }
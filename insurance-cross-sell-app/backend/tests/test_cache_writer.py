@@ -0,0 +1,44 @@
+from services.cache_writer import WriteBehindCache
+
+
+class FakeRedis:
+    """記錄寫入內容的 Redis 客戶端替身"""
+
+    def __init__(self):
+        self.data = {}
+
+    def setex_many(self, items, ttl):
+        self.data.update(items)
+
+
+def test_flush_after_duplicate_keys():
+    client = FakeRedis()
+    cache = WriteBehindCache(lambda: client, ttl=60, flush_interval=0.5)
+
+    cache.submit({'a': b'1'})
+    cache.submit({'a': b'2'})
+    cache.flush()
+
+    assert cache._queue.unfinished_tasks == 0
+    assert client.data == {'a': b'2'}
+
+
+def test_client_error_does_not_stop_writer():
+    client = FakeRedis()
+    calls = []
+
+    def get_client():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+        return client
+
+    cache = WriteBehindCache(get_client, ttl=60, flush_interval=0.01)
+
+    cache.submit({'a': b'1'})
+    cache.flush()
+    cache.submit({'b': b'2'})
+    cache.flush()
+
+    assert cache.failed == 1
+    assert client.data == {'b': b'2'}
@@ -0,0 +1,211 @@
+import io
+import os
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+# pyarrow 是可選依賴：未安裝時只支持 CSV
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 支持的列式格式及其MIME類型
+COLUMNAR_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file'
+}
+
+# 文件擴展名到格式的映射
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow'
+}
+
+
+def normalize_column(name: str) -> str:
+    """特徵名稱標準化（全部小寫並使用下劃線分隔），與訓練數據一致"""
+    return name.lower().replace(' ', '_')
+
+
+def detect_format(file_path: str) -> str:
+    """
+    根據擴展名判斷文件格式
+
+    Args:
+        file_path: 文件路徑
+
+    Returns:
+        'csv'、'parquet' 或 'arrow'
+
+    Raises:
+        ValueError: 不支持的擴展名，或需要 pyarrow 但未安裝
+    """
+    file_format = FILE_FORMATS.get(os.path.splitext(file_path)[1].lower())
+    if file_format is None:
+        raise ValueError(f"不支持的文件格式: {file_path}，可選擴展名為: {list(FILE_FORMATS.keys())}")
+    if file_format != 'csv' and pa is None:
+        raise ValueError(f"讀寫 {file_format} 文件需要安裝 pyarrow")
+    return file_format
+
+
+def _select_columns(names: Iterable[str], columns: Optional[List[str]]) -> Optional[List[str]]:
+    """返回文件中標準化後名稱屬於 columns 的列，columns 為 None 時返回 None（讀取全部列）"""
+    if columns is None:
+        return None
+    wanted = {normalize_column(name) for name in columns}
+    return [name for name in names if normalize_column(name) in wanted]
+
+
+def _csv_usecols(columns: Optional[List[str]]):
+    """返回 pd.read_csv 的 usecols 參數，按標準化名稱篩選列"""
+    if columns is None:
+        return None
+    wanted = {normalize_column(name) for name in columns}
+    return lambda name: normalize_column(name) in wanted
+
+
+def _to_frame(table) -> pd.DataFrame:
+    """
+    將 Arrow 表轉換為數據框：數值列直接轉換為 NumPy 數組，字符串列轉換為類別型，
+    不為每個值創建 Python 字符串對象
+    """
+    df = table.to_pandas(strings_to_categorical=True, split_blocks=True, self_destruct=True)
+    df.columns = [normalize_column(col) for col in df.columns]
+    return df
+
+
+def _open_arrow(file_path: str):
+    """以內存映射方式打開 Arrow IPC 文件"""
+    return pa_ipc.open_file(pa.memory_map(file_path, 'r'))
+
+
+def read_frame(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    讀取 CSV、Parquet 或 Arrow IPC 文件
+
+    列式格式只讀取需要的列；列名統一標準化
+
+    Args:
+        file_path: 文件路徑
+        columns: 需要的列（按標準化名稱匹配），為 None 時讀取全部列
+
+    Returns:
+        數據框
+    """
+    file_format = detect_format(file_path)
+    if file_format == 'parquet':
+        names = pq.read_schema(file_path).names
+        return _to_frame(pq.read_table(file_path, columns=_select_columns(names, columns)))
+    if file_format == 'arrow':
+        table = _open_arrow(file_path).read_all()
+        selected = _select_columns(table.column_names, columns)
+        return _to_frame(table.select(selected) if selected is not None else table)
+
+    df = pd.read_csv(file_path, usecols=_csv_usecols(columns))
+    df.columns = [normalize_column(col) for col in df.columns]
+    return df
+
+
+def iter_frames(file_path: str, chunksize: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    按塊讀取 CSV、Parquet 或 Arrow IPC 文件，每次只在內存中保留一個塊
+
+    每塊的索引是該塊在文件中的行號
+
+    Args:
+        file_path: 文件路徑
+        chunksize: 每塊行數（列式格式按記錄批次讀取，塊大小以文件中的批次為準但不超過該值）
+        columns: 需要的列（按標準化名稱匹配），為 None 時讀取全部列
+
+    Yields:
+        每塊的數據框
+    """
+    file_format = detect_format(file_path)
+    if file_format == 'csv':
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, usecols=_csv_usecols(columns)):
+            chunk.columns = [normalize_column(col) for col in chunk.columns]
+            yield chunk
+        return
+
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(file_path)
+        selected = _select_columns(parquet_file.schema_arrow.names, columns)
+        batches = parquet_file.iter_batches(batch_size=chunksize, columns=selected)
+    else:
+        reader = _open_arrow(file_path)
+        selected = _select_columns(reader.schema.names, columns)
+        batches = (
+            batch.slice(offset, chunksize)
+            for batch in (reader.get_batch(i) for i in range(reader.num_record_batches))
+            for offset in range(0, batch.num_rows, chunksize)
+        )
+
+    start = 0
+    for batch in batches:
+        if file_format == 'arrow' and selected is not None:
+            batch = batch.select(selected)
+        df = _to_frame(pa.Table.from_batches([batch]))
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+
+
+def count_rows(file_path: str) -> int:
+    """
+    統計文件的數據行數：列式格式直接讀取元數據，CSV 按塊統計換行符（不含表頭），不解析字段
+
+    Args:
+        file_path: 文件路徑
+
+    Returns:
+        數據行數
+    """
+    file_format = detect_format(file_path)
+    if file_format == 'parquet':
+        return pq.ParquetFile(file_path).metadata.num_rows
+    if file_format == 'arrow':
+        reader = _open_arrow(file_path)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    lines = 0
+    last = b'\n'
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(0, lines - 1)
+
+
+def write_frame(df: pd.DataFrame, file_format: str) -> bytes:
+    """
+    將數據框序列化為列式格式
+
+    Args:
+        df: 數據框，數值列直接從 NumPy 數組轉換
+        file_format: 'parquet' 或 'arrow'
+
+    Returns:
+        序列化後的字節
+    """
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支持的輸出格式: {file_format}，可選值為: {list(COLUMNAR_FORMATS.keys())}")
+    if pa is None:
+        raise ValueError(f"輸出 {file_format} 格式需要安裝 pyarrow")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    if file_format == 'parquet':
+        pq.write_table(table, sink, compression='snappy')
+    else:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
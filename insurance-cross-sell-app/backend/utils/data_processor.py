@@ -1,23 +1,18 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 import logging
-import math
 
-logger = logging.getLogger(__name__)
+from utils.feature_encoder import feature_encoder
 
-# 緩存標籤編碼器，避免每次請求都重新創建
-_label_encoders = {
-    'gender': LabelEncoder().fit(['Male', 'Female']),
-    'vehicle_age': LabelEncoder().fit(['< 1 Year', '1-2 Year', '> 2 Years']),
-    'vehicle_damage': LabelEncoder().fit(['Yes', 'No'])
-}
+logger = logging.getLogger(__name__)
 
 
 def preprocess_customer_data(customer_data):
     """
     預處理客戶數據，轉換為模型所需的格式
     
+    編碼由預編譯的 feature_encoder 完成，欄位順序固定為 feature_encoder.feature_names
+    
     Args:
         customer_data (dict): 原始客戶數據
         
@@ -25,64 +20,29 @@ def preprocess_customer_data(customer_data):
         dict: 預處理後的特徵數據
     """
     try:
-        # 創建特徵字典的副本
-        processed_data = customer_data.copy()
-
-        # 1. 標準化欄位名稱（轉換為大寫形式，與模型一致）
-        processed_data = {k.lower(): v for k, v in processed_data.items()}
-
-        # 2. 對分類特徵進行標籤編碼
-        for feature, encoder in _label_encoders.items():
-            if feature in processed_data:
-                try:
-                    processed_data[feature] = encoder.transform([processed_data[feature]])[0]
-                except ValueError as e:
-                    logger.error(f"標籤編碼錯誤 ({feature}): {e}")
-                    # 如果編碼失敗，使用預設值
-                    processed_data[feature] = 0
-
-        # 3. 特徵工程：添加年齡組特徵
-        if 'age' in processed_data:
-            processed_data['age_group'] = _get_age_group(processed_data['age'])
-
-        # 4. 特徵工程：添加年保費對數特徵
-        if 'annual_premium' in processed_data:
-            processed_data['annual_premium_log'] = math.log1p(processed_data['annual_premium'])
-
-        # 5. 移除不需要的特徵（如果有的話）
-        if 'id' in processed_data:
-            del processed_data['id']
-
-        # 6. 確保所有數值都是浮點數，避免數據類型問題
-        for key, value in processed_data.items():
-            if isinstance(value, (int, float)):
-                processed_data[key] = float(value)
-
-        return processed_data
+        return feature_encoder.to_dict(feature_encoder.encode_row(customer_data))
 
     except Exception as e:
         logger.error(f"數據預處理錯誤: {e}")
         raise ValueError(f"數據預處理錯誤: {e}")
 
 
-def _get_age_group(age):
+def encode_customer_data(customer_data):
     """
-    將年齡轉換為年齡組
+    將客戶數據直接編碼為 float32 特徵行
     
     Args:
-        age (int): 年齡
+        customer_data (dict): 原始客戶數據
         
     Returns:
-        int: 年齡組編碼
+        np.ndarray: 特徵行，列順序與 feature_encoder.feature_names 一致
     """
-    if age < 25:
-        return 0  # 青年
-    elif age < 40:
-        return 1  # 中年
-    elif age < 60:
-        return 2  # 中老年
-    else:
-        return 3  # 老年
+    try:
+        return feature_encoder.encode_row(customer_data)
+
+    except Exception as e:
+        logger.error(f"數據預處理錯誤: {e}")
+        raise ValueError(f"數據預處理錯誤: {e}")
 
 
 def process_batch_data(batch_data):
@@ -109,6 +69,24 @@ def process_batch_data(batch_data):
     return processed_batch, errors
 
 
+def encode_batch_data(batch_data):
+    """
+    將多個客戶數據一次性編碼為 float32 特徵矩陣
+    
+    Args:
+        batch_data (list | pd.DataFrame): 客戶數據列表或原始數據框
+        
+    Returns:
+        np.ndarray: 特徵矩陣，形狀為 (行數, 特徵數)
+    """
+    try:
+        return feature_encoder.encode_batch(batch_data)
+
+    except Exception as e:
+        logger.error(f"批量數據預處理錯誤: {e}")
+        raise ValueError(f"批量數據預處理錯誤: {e}")
+
+
 def create_sample_data():
     """
     創建示例客戶數據，用於測試和開發
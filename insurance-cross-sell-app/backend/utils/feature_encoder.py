@@ -0,0 +1,246 @@
+import os
+import math
+import logging
+from bisect import bisect_right
+from typing import Dict, Any, List, Iterable, Optional, Tuple, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config.settings import GENDER_MAP, VEHICLE_AGE_MAP, VEHICLE_DAMAGE_MAP, FEATURES, DERIVED_FEATURES
+from config.settings import LABEL_ENCODERS_PATH
+from utils import feature_engineering
+from utils.feature_engineering import AGE_GROUP_BINS, AGE_GROUP_LABELS
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureEncoder:
+    """
+    預編譯的特徵編碼器
+
+    在初始化時一次性構建欄位索引和類別查找表，之後每次編碼只做字典查找和數組賦值，
+    直接寫入預先分配的 float32 NumPy 行（單筆）或矩陣（批量）。
+    單筆和批量編碼共用同一套查找表，輸出完全一致。
+    """
+
+    def __init__(self, features: List[str] = None, derived_features: List[str] = None,
+                 category_maps: Dict[str, Dict[str, int]] = None, default_code: int = 0,
+                 age_group_codes: Iterable[int] = None):
+        """
+        初始化特徵編碼器
+
+        Args:
+            features: 原始特徵列表，默認使用 config.settings.FEATURES
+            derived_features: 派生特徵列表，默認使用 config.settings.DERIVED_FEATURES
+            category_maps: 類別特徵的標籤映射，默認使用配置中的 GENDER_MAP 等
+            default_code: 未知類別值的默認編碼
+            age_group_codes: 各年齡段（按 AGE_GROUP_LABELS 順序）對應的編碼，默認為 0-3
+        """
+        features = FEATURES if features is None else features
+        derived_features = DERIVED_FEATURES if derived_features is None else derived_features
+        self.feature_names = list(features) + list(derived_features)
+        self.n_features = len(self.feature_names)
+        self.default_code = float(default_code)
+
+        # 內部統一使用小寫欄位名，兼容 'Age_Group' 這類訓練腳本中的寫法
+        self._names = [name.lower() for name in self.feature_names]
+        self._age_group_codes = np.asarray(
+            list(age_group_codes) if age_group_codes is not None else range(len(AGE_GROUP_LABELS)),
+            dtype=np.float32
+        )
+
+        if category_maps is None:
+            category_maps = {
+                'gender': GENDER_MAP,
+                'vehicle_age': VEHICLE_AGE_MAP,
+                'vehicle_damage': VEHICLE_DAMAGE_MAP
+            }
+
+        # 類別查找表：原始標籤和已編碼的值都映射到 float 編碼，重複編碼結果不變
+        self._lookup_tables = {}
+        for feature, mapping in category_maps.items():
+            table = {code: float(code) for code in mapping.values()}
+            table.update({label: float(code) for label, code in mapping.items()})
+            self._lookup_tables[feature.lower()] = table
+
+        # 欄位名 -> (列索引, 查找表)，同時收錄原始、小寫、首字母大寫等常見寫法，避免逐次轉換大小寫
+        self._slots = {}
+        for col, (feature, name) in enumerate(zip(self.feature_names, self._names)):
+            slot = (col, self._lookup_tables.get(name))
+            for alias in (feature, name, name.upper(), '_'.join(p.capitalize() for p in name.split('_'))):
+                self._slots[alias] = slot
+
+        self._age_col = self._column('age')
+        self._age_group_col = self._column('age_group')
+        self._premium_col = self._column('annual_premium')
+        self._premium_log_col = self._column('annual_premium_log')
+
+    def _column(self, name: str) -> Optional[int]:
+        """返回特徵的列索引，不存在時返回 None"""
+        return self._names.index(name) if name in self._names else None
+
+    def _lookup_slot(self, key: str):
+        """查找欄位對應的列，先直接查找，未命中時再嘗試小寫形式"""
+        slot = self._slots.get(key)
+        if slot is None and isinstance(key, str):
+            slot = self._slots.get(key.lower())
+        return slot
+
+    def encode_row(self, data: Dict[str, Any], out: np.ndarray = None) -> np.ndarray:
+        """
+        將單筆原始客戶數據編碼為特徵行
+
+        Args:
+            data: 原始客戶數據字典
+            out: 可選的輸出數組，長度為 n_features，用於寫入預先分配的矩陣行
+
+        Returns:
+            float32 特徵行，列順序與 feature_names 一致
+        """
+        row = np.zeros(self.n_features, dtype=np.float32) if out is None else out
+        if out is not None:
+            row.fill(0)
+
+        age = None
+        premium = None
+        for key, value in data.items():
+            slot = self._lookup_slot(key)
+            if slot is None:
+                continue
+            col, table = slot
+            if table is not None:
+                encoded = table.get(value)
+                if encoded is None:
+                    logger.error(f"標籤編碼錯誤 ({key}): 未知的值 {value!r}")
+                    encoded = self.default_code
+                row[col] = encoded
+                continue
+            row[col] = value
+            if col == self._age_col:
+                age = value
+            elif col == self._premium_col:
+                premium = value
+
+        # 派生特徵（與 utils.feature_engineering 的向量化定義一致的標量版本）
+        if self._age_group_col is not None and age is not None:
+            row[self._age_group_col] = self._age_group_codes[bisect_right(AGE_GROUP_BINS, age)]
+        if self._premium_log_col is not None and premium is not None:
+            row[self._premium_log_col] = math.log1p(max(premium, 0.0))
+
+        return row
+
+    def encode_batch(self, records: Union[Iterable[Dict[str, Any]], pd.DataFrame]) -> np.ndarray:
+        """
+        將多筆原始客戶數據編碼為特徵矩陣
+
+        Args:
+            records: 客戶數據字典列表，或原始數據框
+
+        Returns:
+            float32 特徵矩陣，形狀為 (行數, n_features)
+        """
+        if isinstance(records, pd.DataFrame):
+            return self.encode_frame(records)
+
+        records = list(records)
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float32)
+        for i, data in enumerate(records):
+            self.encode_row(data, out=matrix[i])
+        return matrix
+
+    def encode_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        按列向量化編碼數據框
+
+        Args:
+            df: 原始數據框
+
+        Returns:
+            float32 特徵矩陣，形狀為 (行數, n_features)
+        """
+        matrix = np.zeros((len(df), self.n_features), dtype=np.float32)
+
+        age = None
+        premium = None
+        for column in df.columns:
+            slot = self._lookup_slot(column)
+            if slot is None:
+                continue
+            col, table = slot
+            series = df[column]
+            if table is not None:
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    # 類別型列只需對每個類別查找一次，再按類別碼取值；缺失值的類別碼 -1 取到末尾的默認編碼
+                    lookup = np.array([table.get(value, self.default_code) for value in series.cat.categories]
+                                      + [self.default_code], dtype=np.float32)
+                    matrix[:, col] = lookup[series.cat.codes.to_numpy()]
+                else:
+                    matrix[:, col] = series.map(table).fillna(self.default_code).to_numpy(dtype=np.float32)
+                continue
+            values = series.to_numpy(dtype=np.float64)
+            matrix[:, col] = values
+            if col == self._age_col:
+                age = values
+            elif col == self._premium_col:
+                premium = values
+
+        if self._age_group_col is not None and age is not None:
+            matrix[:, self._age_group_col] = self._age_group_codes[feature_engineering.age_group_codes(age)]
+        if self._premium_log_col is not None and premium is not None:
+            matrix[:, self._premium_log_col] = feature_engineering.premium_log(premium)
+
+        return matrix
+
+    def to_dict(self, row: np.ndarray) -> Dict[str, float]:
+        """將特徵行轉換回 {特徵名: 值} 字典"""
+        return dict(zip(self.feature_names, row.tolist()))
+
+
+# 訓練腳本（step_5）中 LabelEncoder 的編碼：類別按字母順序編號（Female=0, Male=1；'1-2 Year'=0, '< 1 Year'=1）
+LABEL_ENCODER_MAPS = {
+    feature: {label: code for code, label in enumerate(sorted(mapping))}
+    for feature, mapping in (('gender', GENDER_MAP), ('vehicle_age', VEHICLE_AGE_MAP),
+                             ('vehicle_damage', VEHICLE_DAMAGE_MAP))
+}
+
+
+def label_encoder_maps(label_encoders: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, int]], Optional[List[int]]]:
+    """
+    將訓練腳本保存的 LabelEncoder 轉換為查找表
+
+    Args:
+        label_encoders: {特徵名: 已擬合的 LabelEncoder}
+
+    Returns:
+        (類別查找表, 各年齡段按 AGE_GROUP_LABELS 順序的編碼)，沒有年齡段編碼器時後者為 None
+    """
+    category_maps = {}
+    age_group_codes = None
+    for col, encoder in label_encoders.items():
+        mapping = {label: code for code, label in enumerate(encoder.classes_)}
+        if col.lower() == 'age_group':
+            age_group_codes = [mapping[label] for label in AGE_GROUP_LABELS]
+        else:
+            category_maps[col] = mapping
+    return category_maps, age_group_codes
+
+
+def _build_serving_encoder() -> FeatureEncoder:
+    """
+    構建預測服務使用的編碼器，編碼必須與訓練 MODEL_PATH 模型時的 LabelEncoder 一致
+
+    優先使用保存的標籤編碼器；文件不存在或無法讀取時使用 LabelEncoder 的字母順序編碼
+    """
+    if os.path.exists(LABEL_ENCODERS_PATH):
+        try:
+            category_maps, age_group_codes = label_encoder_maps(joblib.load(LABEL_ENCODERS_PATH))
+            return FeatureEncoder(category_maps=category_maps, age_group_codes=age_group_codes)
+        except Exception as e:
+            logger.warning(f"讀取標籤編碼器失敗，使用字母順序編碼: {str(e)}")
+    return FeatureEncoder(category_maps=LABEL_ENCODER_MAPS)
+
+
+# 創建單例實例，查找表只在導入時構建一次
+feature_encoder = _build_serving_encoder()
@@ -0,0 +1,83 @@
+"""
+派生特徵計算
+
+訓練（DataService）、批量評分（ModelService）和在線服務（FeatureEncoder）共用同一套定義，
+全部按列向量化計算，保證各處得到的特徵完全一致。
+"""
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# 年齡分組邊界：<25 青年(0)，<40 中年(1)，<60 中老年(2)，其餘 老年(3)
+AGE_GROUP_BINS = (25, 40, 60)
+AGE_GROUP_LABELS = ('青年', '中年', '中老年', '老年')
+
+ArrayLike = Union[np.ndarray, pd.Series, list]
+
+
+def age_group_codes(age: ArrayLike) -> np.ndarray:
+    """
+    計算年齡段編碼（按 AGE_GROUP_LABELS 順序）
+
+    Args:
+        age: 年齡數組
+
+    Returns:
+        int8 編碼數組；缺失的年齡與原始腳本一致歸入最後一組
+    """
+    age = np.asarray(age, dtype=np.float64)
+    codes = np.digitize(age, AGE_GROUP_BINS).astype(np.int8)
+    codes[np.isnan(age)] = len(AGE_GROUP_BINS)
+    return codes
+
+
+def age_group(age: ArrayLike) -> pd.Categorical:
+    """
+    計算年齡段標籤
+
+    Args:
+        age: 年齡數組
+
+    Returns:
+        類別型標籤，類別順序為 AGE_GROUP_LABELS
+    """
+    return pd.Categorical.from_codes(age_group_codes(age), categories=list(AGE_GROUP_LABELS))
+
+
+def premium_log(premium: ArrayLike) -> np.ndarray:
+    """
+    計算對數保費 log(1 + 保費)，非正保費記為 0
+
+    Args:
+        premium: 年保費數組
+
+    Returns:
+        float64 數組（統一以 float64 計算，不受輸入精度影響）
+    """
+    return np.log1p(np.maximum(np.asarray(premium, dtype=np.float64), 0.0))
+
+
+def add_derived_features(df: pd.DataFrame, age_column: str = 'Age',
+                         premium_column: str = 'Annual_Premium') -> pd.DataFrame:
+    """
+    在數據框上原地添加 annual_premium_log 和 age_group 列
+
+    對數保費的精度與保費列一致（例如 float32 的保費列得到 float32 的對數保費）
+
+    Args:
+        df: 數據框
+        age_column: 年齡列名
+        premium_column: 年保費列名
+
+    Returns:
+        添加派生列後的同一個數據框
+    """
+    if premium_column in df.columns:
+        dtype = df[premium_column].dtype
+        log_dtype = dtype if np.issubdtype(dtype, np.floating) else np.float64
+        df['annual_premium_log'] = premium_log(df[premium_column]).astype(log_dtype, copy=False)
+    if age_column in df.columns:
+        df['age_group'] = age_group(df[age_column])
+    return df
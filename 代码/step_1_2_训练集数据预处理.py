@@ -10,32 +10,39 @@ output_path = r"E:\software\Jetbrains\Python Project\25_1__ML_learn\项目练习
 
 os.makedirs(output_path, exist_ok=True)
 
-# ✅ 原始数据读取
-df = pd.read_csv(data_path)
+# ✅ 列顺序只从表头读取：保留原始列顺序 + 只添加新特征（附加列）
+original_columns = list(pd.read_csv(data_path, nrows=0).columns)
+final_columns = original_columns + ["Annual_Premium_Log", "Age_Group"]
 
-# ✅ 新增特征：Annual_Premium_Log
-df["Annual_Premium_Log"] = np.log1p(df["Annual_Premium"])
+# ✅ 年龄段标签（<25 青年，<40 中年，<60 中老年，其余 老年；缺失年龄与原 age_group 函数一致归入 老年）
+age_group_labels = ["青年", "中年", "中老年"]
 
-# ✅ 新增特征：Age_Group
-def age_group(age):
-    if age < 25:
-        return "青年"
-    elif age < 40:
-        return "中年"
-    elif age < 60:
-        return "中老年"
-    else:
-        return "老年"
-df["Age_Group"] = df["Age"].apply(age_group)
+# ✅ 分块读取原始数据、添加新特征并追加写入，内存占用只与块大小有关，可以处理超过内存的数据集
+# 绘图和统计只需要 4 列，以紧凑类型保留（Age 使用 float32，缺失年龄保留为 NaN；Age_Group 使用类别型，类别按字符串排序，与原先分组输出顺序一致）
+chunksize = 100_000
+plot_columns = ["Age", "Annual_Premium", "Annual_Premium_Log", "Age_Group"]
+plot_parts = []
+with open(os.path.join(output_path, "train_处理后数据.csv"), "w", encoding="utf-8-sig", newline="") as f:
+    for i, chunk in enumerate(pd.read_csv(data_path, chunksize=chunksize)):
+        # ✅ 新增特征：Annual_Premium_Log
+        chunk["Annual_Premium_Log"] = np.log1p(chunk["Annual_Premium"])
 
-# ✅ 保留原始列顺序 + 只添加新特征（附加列）
-original_columns = list(pd.read_csv(data_path, nrows=1).columns)
-new_columns = [col for col in df.columns if col not in original_columns]
-final_columns = original_columns + new_columns
-df = df[final_columns]
+        # ✅ 新增特征：Age_Group（按区间一次性映射，不逐行调用函数）
+        age = chunk["Age"]
+        chunk["Age_Group"] = np.select([age < 25, age < 40, age < 60], age_group_labels, default="老年")
 
-# ✅ 保存增强后的数据
-df.to_csv(os.path.join(output_path, "train_处理后数据.csv"), index=False, encoding="utf-8-sig")
+        # ✅ 追加保存增强后的数据（只在第一块写表头）
+        chunk[final_columns].to_csv(f, index=False, header=(i == 0))
+
+        plot_parts.append(pd.DataFrame({
+            "Age": chunk["Age"].astype("float32"),
+            "Annual_Premium": chunk["Annual_Premium"],
+            "Annual_Premium_Log": chunk["Annual_Premium_Log"].astype("float32"),
+            "Age_Group": pd.Categorical(chunk["Age_Group"], categories=sorted(age_group_labels + ["老年"]))
+        }))
+
+df = pd.concat(plot_parts, ignore_index=True)[plot_columns]
+del plot_parts
 
 # ✅ 可视化：Annual_Premium 原始分布
 plt.figure(figsize=(10, 5))
@@ -73,5 +80,5 @@ plt.savefig(os.path.join(output_path, "AgeGroup_vs_AnnualPremium.png"))
 plt.close()
 
 # ✅ 年龄段保费统计表
-group_stats = df.groupby("Age_Group")["Annual_Premium"].agg(["mean", "median", "count", "std"]).reset_index()
+group_stats = df.groupby("Age_Group", observed=True)["Annual_Premium"].agg(["mean", "median", "count", "std"]).reset_index()
 group_stats.to_csv(os.path.join(output_path, "train_年龄段_保费统计表.csv"), index=False, encoding="utf-8-sig")
@@ -15,19 +15,12 @@ train_df = pd.read_csv(train_path)
 # 1️⃣ 新增对数保费特征
 train_df["Annual_Premium_Log"] = np.log1p(train_df["Annual_Premium"])
 
-# 2️⃣ 年龄段映射函数
-def age_group(age):
-    if age < 25:
-        return "青年"
-    elif age < 40:
-        return "中年"
-    elif age < 60:
-        return "中老年"
-    else:
-        return "老年"
+# 2️⃣ 年龄段标签（<25 青年，<40 中年，<60 中老年，其余 老年；缺失年龄与原 age_group 函数一致归入 老年）
+age_group_labels = ["青年", "中年", "中老年"]
 
-# 应用年龄段标签
-train_df["Age_Group"] = train_df["Age"].apply(age_group)
+# 按区间一次性映射年龄段标签，不逐行调用函数
+age = train_df["Age"]
+train_df["Age_Group"] = np.select([age < 25, age < 40, age < 60], age_group_labels, default="老年")
 
 # 3️⃣ 保存增强后的训练集数据
 train_df.to_csv(os.path.join(output_path, "test_处理后数据.csv"), index=False, encoding="utf-8-sig")